@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""Benchmarks voor de drukke paden van de app en de paginagenerators.
+
+Maakt een synthetische fotomap (plaatsen x foto's x afmetingen, plus een
+paar mappen buiten de pool) en een bijpassend verhaal.html, en meet:
+
+- het vinden van foto's (de ``PhotoCatalog`` van bingo.py, koud en warm, en uit
+  ``pool_manifest.json`` zonder en met bestaand manifest);
+- ``get_base64_image`` over alle foto's, en de print-variant via de
+  ``DerivativeStore`` zoals de app die inline zet;
+- de printbare kaart-HTML voor 35 en 200 kaarten;
+- het geïmporteerde verhaal (inlezen, delen en ``simulate_story``) voor
+  35, 500 en 50.000 spelers;
+- het opgemaakte verhaal als bundel (zip met verkleinde foto's), koud en warm;
+- ``generate_indexes.main`` (eerste keer en ongewijzigd) en
+  ``generate_gallery_html.main``.
+
+Elke meting wordt ``--repeat`` keer herhaald; daarna volgt één extra run
+onder ``tracemalloc`` voor het piekgeheugen (Python-allocaties, inclusief
+NumPy). De uitvoer is JSON, zodat runs met ``--compare`` naast elkaar gezet
+kunnen worden.
+
+    python benchmark.py --places 40 --photos 12 --output bench.json
+    python benchmark.py --output nieuw.json --compare bench.json
+"""
+import argparse
+import base64
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, List, Optional
+
+import numpy as np
+from PIL import Image
+
+import generate_gallery_html
+import generate_indexes
+from dealing import build_day_pool, deal_cards, printed_card
+from derivatives import DerivativeStore
+from image_cache import EncodedImageCache, get_base64_image
+from photo_catalog import PhotoCatalog
+from pool_manifest import MANIFEST_NAME, PoolManifest
+from print_cards import build_print_html
+from simulation import simulate_story
+from site_build import THUMB_DIRNAME
+from story_beautify import beautify_story, write_bundle
+from story_import import PathIndex, compile_story, iter_chunks
+
+PRINT_CARD_COUNTS = (35, 200)
+PLAYER_COUNTS = (35, 500, 50_000)
+DAY_POOL_SIZE = 15
+# Staat in een --workdir die door dit script is gemaakt; een andere map wordt nooit leeggemaakt
+WORKDIR_MARKER = '.bingo-benchmark'
+
+
+def make_pool(base_dir: str, places: int, photos: int, size: tuple, other_dirs: int = 2, seed: int = 0) -> List[str]:
+    """Schrijf een synthetische fotomap; geeft de relatieve paden van de poolfoto's in verhaalvolgorde terug."""
+    rng = np.random.default_rng(seed)
+    w, h = size
+    # Kleurverloop met wat ruis: comprimeert ongeveer als een echte foto
+    gx = np.linspace(0, 1, w, dtype=np.float32)[None, :, None]
+    gy = np.linspace(0, 1, h, dtype=np.float32)[:, None, None]
+
+    def write(path: str) -> None:
+        tint = rng.uniform(40, 215, size=3).astype(np.float32)
+        base = tint * (0.6 + 0.4 * gx) * (0.6 + 0.4 * gy)
+        noise = rng.normal(0, 12, size=(h, w, 3)).astype(np.float32)
+        Image.fromarray(np.clip(base + noise, 0, 255).astype(np.uint8)).save(path, quality=85)
+
+    story: List[str] = []
+    descs = {'_default': 'Foto\'s uit {plaats}.'}
+    for p in range(places):
+        name = f"{p + 1:02d}_plaats{p + 1}"
+        place_dir = os.path.join(base_dir, 'pool', name)
+        os.makedirs(place_dir, exist_ok=True)
+        descs[name] = f"Beschrijving van plaats {p + 1}."
+        for i in range(photos):
+            fname = f"foto_{i + 1:03d}.jpg"
+            write(os.path.join(place_dir, fname))
+            story.append(os.path.join('pool', name, fname))
+    for d in range(other_dirs):
+        other_dir = os.path.join(base_dir, f"overig{d + 1}")
+        os.makedirs(other_dir, exist_ok=True)
+        for i in range(max(1, photos // 2)):
+            write(os.path.join(other_dir, f"foto_{i + 1:03d}.jpg"))
+    with open(os.path.join(base_dir, 'beschrijvingen.json'), 'w', encoding='utf-8') as f:
+        json.dump(descs, f, ensure_ascii=False, indent=2)
+    return story
+
+
+def make_story_html(story: List[str], extra_links: int = 20) -> str:
+    """verhaal.html met links in verhaalvolgorde, tussen gewone tekst en een paar links buiten de pool."""
+    parts = ["<html><body><h1>Verhaal</h1>"]
+    for i, rel in enumerate(story):
+        parts.append(f'<p>Alinea {i} met wat tekst over de foto. <a class="foto" href="{rel}">'
+                     f'<img src="{rel}" alt="{os.path.basename(rel)}"></a></p>')
+        if extra_links and i % max(1, len(story) // extra_links) == 0:
+            parts.append(f'<p><a href="https://example.org/{i}">externe link</a></p>')
+    parts.append("</body></html>")
+    return "\n".join(parts)
+
+
+class Bench:
+    def __init__(self, repeat: int, memory: bool = True):
+        self.repeat = repeat
+        self.memory = memory
+        self.results: List[dict] = []
+
+    def run(self, name: str, fn: Callable[[], object], setup: Optional[Callable[[], None]] = None,
+            repeat: Optional[int] = None, **params) -> None:
+        """Meet ``fn``; ``setup`` draait vóór elke run en telt niet mee."""
+        times = []
+        for _ in range(repeat or self.repeat):
+            if setup:
+                setup()
+            start = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - start)
+        peak = None
+        if self.memory:
+            if setup:
+                setup()
+            tracemalloc.start()
+            try:
+                fn()
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+        result = {
+            'name': name,
+            'params': params,
+            'runs': len(times),
+            'min_s': min(times),
+            'median_s': statistics.median(times),
+            'mean_s': statistics.fmean(times),
+            'peak_bytes': peak,
+        }
+        self.results.append(result)
+        mem = f"{peak / 2**20:8.1f} MiB" if peak is not None else ""
+        print(f"{name:<32} {result['median_s'] * 1000:10.1f} ms  (min {result['min_s'] * 1000:.1f}) {mem}", file=sys.stderr)
+
+
+def _quiet(fn: Callable[[], object]) -> Callable[[], object]:
+    def call():
+        with contextlib.redirect_stdout(io.StringIO()):
+            return fn()
+    return call
+
+
+def run_suite(base_dir: str, story_html: str, bench: Bench, seed: int = 0) -> None:
+    # --- Foto's vinden
+    def discover():
+        return PhotoCatalog(base_dir, exclude=('static',), skip_dirnames=(THUMB_DIRNAME,)).snapshot()
+    bench.run('discovery_cold', discover)
+    catalog = PhotoCatalog(base_dir, exclude=('static',), skip_dirnames=(THUMB_DIRNAME,))
+    snap = catalog.snapshot()
+    bench.run('discovery_warm', catalog.snapshot, photos=len(snap.all_photos))
+
+    # Nieuwe catalogus uit pool_manifest.json: zonder manifest (alles meten) en met (koude start van de app)
+    manifest_path = os.path.join(base_dir, MANIFEST_NAME)
+
+    def drop_manifest():
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(manifest_path)
+
+    def discover_manifest():
+        return PhotoCatalog(base_dir, manifest=PoolManifest(base_dir)).snapshot()
+    bench.run('discovery_manifest_build', discover_manifest, setup=drop_manifest, photos=len(snap.all_photos))
+    bench.run('discovery_manifest_cold', discover_manifest, photos=len(snap.all_photos))
+    priority, other = list(snap.priority_photos), list(snap.other_photos)
+    paths = [os.path.join(base_dir, rel) for rel in snap.all_photos]
+
+    # --- Coderen
+    bench.run('get_base64_image', lambda: [get_base64_image(p) for p in paths], photos=len(paths))
+    store_dir = os.path.join(base_dir, '.bench_derivatives')
+
+    def fresh_store():
+        shutil.rmtree(store_dir, ignore_errors=True)
+    store = DerivativeStore(store_dir)
+    bench.run('print_variant_cold', lambda: [store.get_bytes(p, 'print') for p in paths], setup=fresh_store,
+              repeat=1, photos=len(paths))
+
+    # --- Printbare kaarten (variant al op schijf, zoals na de eerste keer in de app)
+    for p in paths:
+        store.get_bytes(p, 'print')
+    for count in PRINT_CARD_COUNTS:
+        def build(count=count):
+            cache = EncodedImageCache()
+
+            def encode(rel):
+                path = os.path.join(base_dir, rel)
+                return cache.get_or_encode(path, 'print', lambda: base64.b64encode(store.get_bytes(path, 'print')).decode())
+            cards = ((f"Kaart {i + 1}", printed_card(priority, other, seed, i)) for i in range(count))
+            return build_print_html(cards, encode)
+        bench.run(f'print_html_{count}', build, cards=count)
+
+    # --- Geïmporteerd verhaal
+    story_bytes = story_html.encode('utf-8')
+    index = PathIndex(snap.all_photos)
+
+    def parse():
+        return compile_story(iter_chunks(io.BytesIO(story_bytes)), index).steps
+    bench.run('story_parse', parse, bytes=len(story_bytes))
+    folder_steps = parse()
+    # Opgemaakt verhaal als bundel: eerst zonder varianten op schijf, daarna met
+    story_store_dir = os.path.join(base_dir, '.bench_story')
+
+    def fresh_story_store():
+        shutil.rmtree(story_store_dir, ignore_errors=True)
+
+    def beautify():
+        chunks = iter_chunks(io.BytesIO(story_bytes))
+        return write_bundle(beautify_story(chunks, index, base_dir, DerivativeStore(story_store_dir), bundle=True))
+    bench.run('story_beautify_cold', beautify, setup=fresh_story_store, repeat=1, bytes=len(story_bytes))
+    bench.run('story_beautify_warm', beautify, bytes=len(story_bytes))
+    for players in PLAYER_COUNTS:
+        def simulate(players=players):
+            rng = random.Random(seed)
+            day_pool = build_day_pool(priority, other, DAY_POOL_SIZE, rng)
+            return simulate_story(deal_cards(day_pool, players, rng), folder_steps)
+        bench.run(f'simulate_story_{players}', simulate, players=players, steps=len(folder_steps))
+
+    # --- Paginagenerators
+    pool_dir = os.path.join(base_dir, 'pool')
+
+    def clean_pages():
+        for name in os.listdir(pool_dir):
+            place_dir = os.path.join(pool_dir, name)
+            if os.path.isdir(place_dir):
+                shutil.rmtree(os.path.join(place_dir, THUMB_DIRNAME), ignore_errors=True)
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(os.path.join(place_dir, 'index.html'))
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(os.path.join(pool_dir, '.index_manifest.json'))
+    indexes = _quiet(lambda: generate_indexes.main(['--base', base_dir]))
+    bench.run('generate_indexes_cold', indexes, setup=clean_pages)
+    bench.run('generate_indexes_unchanged', indexes)
+
+    def clean_gallery():
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(os.path.join(base_dir, 'pool_galerij.html'))
+    bench.run('generate_gallery_html', _quiet(lambda: generate_gallery_html.main(['--base', base_dir])), setup=clean_gallery)
+
+
+def compare(results: List[dict], old_path: str) -> None:
+    with open(old_path, 'r', encoding='utf-8') as f:
+        old = {r['name']: r for r in json.load(f)['results']}
+    print(f"\nVergelijking met {old_path} (mediaan nieuw / oud):", file=sys.stderr)
+    for r in results:
+        before = old.get(r['name'])
+        if not before:
+            continue
+        ratio = r['median_s'] / before['median_s'] if before['median_s'] else float('nan')
+        mem = ""
+        if r.get('peak_bytes') and before.get('peak_bytes'):
+            mem = f"  geheugen x{r['peak_bytes'] / before['peak_bytes']:.2f}"
+        print(f"{r['name']:<32} x{ratio:.2f}{mem}", file=sys.stderr)
+
+
+def _size(text: str) -> tuple:
+    w, _, h = text.lower().partition('x')
+    return int(w), int(h)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Meet de drukke paden van de bingo-app op een synthetische fotomap.")
+    parser.add_argument('--places', type=int, default=20, help="Aantal plaatsmappen in de pool (standaard: 20)")
+    parser.add_argument('--photos', type=int, default=8, help="Foto's per plaats (standaard: 8)")
+    parser.add_argument('--image-size', type=_size, default=(1200, 900), help="Afmetingen van de foto's, bijv. 1600x1200 (standaard: 1200x900)")
+    parser.add_argument('--other-dirs', type=int, default=2, help="Mappen met foto's buiten de pool (standaard: 2)")
+    parser.add_argument('--repeat', type=int, default=3, help="Aantal runs per meting (standaard: 3)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-memory', action='store_true', help="Sla de extra run voor het piekgeheugen over")
+    parser.add_argument('--workdir', type=str, default=None, help="Map voor de synthetische pool (blijft staan; standaard een tijdelijke map)")
+    parser.add_argument('--output', type=str, default=None, help="JSON-bestand voor de resultaten (standaard: stdout)")
+    parser.add_argument('--compare', type=str, default=None, help="Eerdere JSON-uitvoer om mee te vergelijken")
+    args = parser.parse_args(argv)
+
+    base_dir = args.workdir or tempfile.mkdtemp(prefix='bingo-bench-')
+    if args.workdir:
+        if os.path.isdir(base_dir) and os.listdir(base_dir) and not os.path.exists(os.path.join(base_dir, WORKDIR_MARKER)):
+            parser.error(f"{base_dir} is niet leeg en niet door benchmark.py gemaakt")
+        shutil.rmtree(base_dir, ignore_errors=True)
+        os.makedirs(base_dir)
+        open(os.path.join(base_dir, WORKDIR_MARKER), 'w').close()
+    try:
+        t0 = time.perf_counter()
+        story = make_pool(base_dir, args.places, args.photos, args.image_size, args.other_dirs, args.seed)
+        story_html = make_story_html(story)
+        with open(os.path.join(base_dir, 'verhaal.html'), 'w', encoding='utf-8') as f:
+            f.write(story_html)
+        print(f"Synthetische pool in {base_dir}: {args.places} plaatsen x {args.photos} foto's "
+              f"({args.image_size[0]}x{args.image_size[1]}) in {time.perf_counter() - t0:.1f} s", file=sys.stderr)
+
+        bench = Bench(args.repeat, memory=not args.no_memory)
+        run_suite(base_dir, story_html, bench, args.seed)
+    finally:
+        if not args.workdir:
+            shutil.rmtree(base_dir, ignore_errors=True)
+
+    # ru_maxrss is in KiB op Linux; procespools (generate_indexes, simulaties) tellen als kinderen
+    scale = 1 if sys.platform == 'darwin' else 1024
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'numpy': np.__version__,
+            'params': {
+                'places': args.places, 'photos': args.photos, 'image_size': list(args.image_size),
+                'other_dirs': args.other_dirs, 'repeat': args.repeat, 'seed': args.seed,
+            },
+            'max_rss_bytes': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale,
+            'max_rss_children_bytes': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale,
+        },
+        'results': bench.results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if args.compare:
+        compare(bench.results, args.compare)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
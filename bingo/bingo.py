@@ -1,8 +1,33 @@
 import streamlit as st
 import random
+import secrets
 import os
 import base64
+import hashlib
+import io
+import json
+import mimetypes
 from datetime import date
+from urllib.parse import urlsplit
+from photo_catalog import PhotoCatalog
+from pool_manifest import PoolManifest
+from derivatives import DerivativeStore
+from image_server import ImageUrls, serve_static
+from image_cache import DEFAULT_MAX_BYTES, EncodedImageCache, get_base64_image
+from print_cards import build_print_html, write_print_pdf
+from deal_optimizer import GameTargets, optimize_deal
+from card_serials import (KIND_INTERACTIVE, KIND_LABELS, KIND_PRINTED, MAX_BATCH, CardSerial, card_verdict,
+                          day_number, decode_serial, encode_serial, optimized_serial, pool_fingerprint,
+                          regenerate_batch, regenerate_card)
+from dealing import build_day_pool, card_order, day_selection, deal_cards, distinct_photos, printed_card, session_seed
+from simulation import MILESTONES, monte_carlo, simulate_story
+from live_game import LiveGame
+from photo_hashes import DuplicateIndex
+from story_import import PathIndex, compile_story, iter_chunks
+from story_beautify import beautify_story, write_bundle
+import timing
+from timing import span
+from site_build import build_site, model_from_manifest
 
 # 1. Pagina instellingen
 st.set_page_config(page_title="Rietman Familie Bingo", layout="centered")
@@ -19,36 +44,227 @@ hide_style = """
 """
 st.markdown(hide_style, unsafe_allow_html=True)
 
-def get_base64_image(image_path):
-    try:
-        with open(image_path, "rb") as f:
-            return base64.b64encode(f.read()).decode()
-    except Exception:
-        return None
+def _session_recorder():
+    # Elke sessie heeft eigen tijdmetingen (alleen met BINGO_TIMING=1)
+    return st.session_state.setdefault('timing_recorder', timing.Recorder())
+
+if timing.ENABLED:
+    timing.set_resolver(_session_recorder)
 
 st.title("📸 Rietman Familie Bingo")
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 IMAGE_DIR = BASE_DIR
+# Streamlit serveert deze map onder app/static/ (server.enableStaticServing in .streamlit/config.toml)
+STATIC_DIR = os.path.join(BASE_DIR, 'static')
+
+@st.cache_resource
+def get_photo_catalog():
+    # Eén catalogus per proces, gedeeld door alle sessies. De scan komt uit pool_manifest.json, zodat een
+    # koude start alleen gewijzigde mappen leest; de static- en thumbs-mappen bevatten geen spelfoto's
+    return PhotoCatalog(IMAGE_DIR, manifest=PoolManifest(IMAGE_DIR))
+
+@st.cache_resource
+def get_duplicate_index():
+    # Hashes staan in .cache/photo_hashes.json en worden alleen voor nieuwe of gewijzigde foto's opnieuw berekend
+    return DuplicateIndex(IMAGE_DIR)
+
+@st.cache_data(max_entries=2)
+def get_duplicates(generation, _all_photos):
+    # (dubbele foto -> vertegenwoordiger, clusters); opnieuw bij een nieuwe catalogusversie
+    index = get_duplicate_index()
+    # Grootte, mtime en SHA-1 komen uit het fotomanifest; alleen de dHash wordt nog berekend
+    index.update(_all_photos, known=get_photo_catalog().manifest.photos)
+    return dict(index.canonical), list(index.clusters)
+
+@st.cache_resource
+def get_derivative_store():
+    # Varianten staan in de static-map, zodat de browser ze via een URL kan ophalen en cachen
+    return DerivativeStore(os.path.join(STATIC_DIR, 'img'))
+
+@st.cache_resource
+def get_image_urls():
+    return ImageUrls(get_derivative_store(), STATIC_DIR)
+
+@st.cache_resource
+def start_image_server(port):
+    # Eigen endpoint met 'Cache-Control: immutable'; aan te zetten met BINGO_IMAGE_PORT. Luistert op
+    # hetzelfde adres als de app (server.address; niet ingesteld = alle adressen, net als Streamlit)
+    return serve_static(STATIC_DIR, port, host=st.get_option('server.address') or '')
+
+def get_app_scheme():
+    # Zoals de browser de app ziet; achter een proxy staat dat in X-Forwarded-Proto
+    proto = st.context.headers.get('X-Forwarded-Proto')
+    if proto:
+        return proto.split(',')[0].strip().lower()
+    return urlsplit(st.context.url or '').scheme or 'http'
+
+def get_image_base_url():
+    """Basis-URL voor afbeeldingen uit de static-map, of None als die niet geserveerd wordt."""
+    port = os.environ.get('BINGO_IMAGE_PORT')
+    # De eigen server spreekt alleen http; onder https zou dat gemengde inhoud zijn, dan via Streamlit
+    if port and get_app_scheme() == 'http':
+        start_image_server(int(port))
+        host = urlsplit(f"//{st.context.headers.get('Host') or 'localhost'}").hostname or 'localhost'
+        if ':' in host:
+            host = f"[{host}]"
+        return f"http://{host}:{port}"
+    if st.get_option('server.enableStaticServing'):
+        base_path = st.get_option('server.baseUrlPath').strip('/')
+        return f"/{base_path}/app/static" if base_path else "/app/static"
+    return None
+
+@st.cache_resource
+def get_image_cache():
+    # Plafond instelbaar via BINGO_IMAGE_CACHE_MB
+    max_mb = os.environ.get('BINGO_IMAGE_CACHE_MB')
+    return EncodedImageCache(int(max_mb) * 1024 * 1024 if max_mb else DEFAULT_MAX_BYTES)
+
+def get_base64_variant(image_path, variant):
+    # Verkleinde JPEG-variant; val terug op het origineel als Pillow het bestand niet kan lezen
+    def encode():
+        with span('encode_base64', variant=variant):
+            try:
+                return base64.b64encode(get_derivative_store().get_bytes(image_path, variant)).decode()
+            except Exception:
+                return get_base64_image(image_path)
+    return get_image_cache().get_or_encode(image_path, variant, encode)
+
+def get_image_src(image_path, variant, base_url):
+    # Vaste URL met inhoudshash als die er is; anders (of als de variant mislukt) inline base64
+    if base_url:
+        rel = get_image_urls().path_for(image_path, variant)
+        if rel:
+            return f"{base_url}/{rel}"
+    b64 = get_base64_variant(image_path, variant)
+    return f"data:image/jpeg;base64,{b64}" if b64 else None
+
+# Scripts en geluiden van de kaart, lokaal in static/ (werkt ook zonder internet)
+CARD_ASSETS = {
+    'confetti': 'assets/confetti.js',
+    'click': 'assets/click.wav',
+    'win': 'assets/win.wav',
+}
+
+@st.cache_data(max_entries=16)
+def _asset_src(name, base_url, mtime_ns):
+    path = os.path.join(STATIC_DIR, CARD_ASSETS[name])
+    with open(path, 'rb') as f:
+        data = f.read()
+    if base_url:
+        # Inhoudshash in de URL: de browser mag het bestand onbeperkt bewaren
+        return f"{base_url}/{CARD_ASSETS[name]}?v={hashlib.sha256(data).hexdigest()[:12]}"
+    mime = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    return f"data:{mime};base64,{base64.b64encode(data).decode()}"
+
+def get_asset_src(name, base_url):
+    return _asset_src(name, base_url, os.stat(os.path.join(STATIC_DIR, CARD_ASSETS[name])).st_mtime_ns)
+
+@st.cache_data(max_entries=2)
+def find_map_image(base_dir, dir_mtime_ns):
+    # Zoek naast bingo.py naar een bestand dat met 'landkaart' begint; alleen opnieuw als de map wijzigt
+    for fname in sorted(os.listdir(base_dir)):
+        low = fname.lower()
+        if low.startswith('landkaart') and low.endswith(('.png', '.jpg', '.jpeg', '.webp')):
+            return os.path.join(base_dir, fname)
+    return None
+
+def get_map_layers(map_path, base_url):
+    """(CSS voor de wazige placeholder, <picture> met de passende breedte) voor de landkaart."""
+    if base_url:
+        resp = get_image_urls().responsive_for(map_path)
+        if not resp:
+            return "", ""
+        sources = "".join(
+            f'<source type="image/{fmt}" srcset="{resp.srcset(fmt, base_url + "/")}" sizes="100vw">'
+            for fmt in ('webp', 'jpeg') if resp.srcset(fmt)
+        )
+        img_src = f"{base_url}/{resp.fallback().path}"
+    else:
+        try:
+            resp = get_derivative_store().get_responsive(map_path)
+        except Exception:
+            return "", ""
+        def encode():
+            with open(resp.fallback().path, 'rb') as f:
+                return base64.b64encode(f.read()).decode()
+        sources = ""
+        img_src = f"data:image/jpeg;base64,{get_image_cache().get_or_encode(map_path, 'map', encode)}"
+    placeholder = f"background-image: url('data:image/jpeg;base64,{resp.placeholder}');"
+    picture = (f'<picture class="map-full">{sources}<img src="{img_src}" alt="" decoding="async" '
+               f'width="{resp.width}" height="{resp.height}" onload="this.classList.add(\'loaded\')"></picture>')
+    return placeholder, picture
+
+@st.cache_resource(max_entries=2)
+def get_path_index(generation, _all_photos):
+    # Genormaliseerde paden en achterstukken van de catalogus, om links uit verhaal.html te koppelen
+    return PathIndex(_all_photos)
+
+@st.cache_data(max_entries=8)
+def get_story(digest, generation, _uploaded, _all_photos, _duplicates):
+    # Per bestandshash (en catalogusgeneratie): opnieuw uploaden van hetzelfde verhaal leest niets opnieuw in
+    _uploaded.seek(0)
+    with span('story_parse', bytes=_uploaded.size):
+        return compile_story(iter_chunks(_uploaded), get_path_index(generation, _all_photos), _duplicates)
+
+@st.cache_data(max_entries=2)
+def get_pretty_story(digest, generation, bundle, _uploaded, _all_photos):
+    # Eén keer lezen per bestand (en catalogusgeneratie); de verkleinde foto's komen uit de static-map
+    _uploaded.seek(0)
+    with span('beautify_story', bytes=_uploaded.size, bundle=bundle):
+        story = beautify_story(iter_chunks(_uploaded), get_path_index(generation, _all_photos), BASE_DIR,
+                               get_derivative_store(), bundle=bundle)
+        return story.html.encode('utf-8'), write_bundle(story) if bundle else None, story.figures, story.optimized
+
+@st.cache_data(max_entries=4)
+def get_pool_fingerprint(generation, _priority, _other):
+    return pool_fingerprint(_priority, _other)
+
+def _fmt_verdict(verdict):
+    if verdict.full:
+        return "VOLLE KAART"
+    parts = []
+    if verdict.h: parts.append(f"Horizontaal x{verdict.h}")
+    if verdict.v: parts.append(f"Verticaal x{verdict.v}")
+    if verdict.d: parts.append(f"Diagonaal x{verdict.d}")
+    return f"{verdict.total} rij(en): " + ", ".join(parts)
+
+@st.cache_resource
+def get_live_game():
+    # Eén live spel per proces; alle sessies lezen en schrijven dezelfde stand. Spelleider is wie de
+    # app opent met ?host=<token>; het token komt uit BINGO_HOST_TOKEN of wordt hier gemaakt en gelogd
+    token = os.environ.get('BINGO_HOST_TOKEN') or secrets.token_urlsafe(12)
+    if not os.environ.get('BINGO_HOST_TOKEN'):
+        print(f"Live spel: open de app met ?host={token} om spelleider te zijn", flush=True)
+    return LiveGame(token)
+
+# Hoe vaak een spelerssessie kijkt of de spelleider een nieuwe plaats heeft aangeroepen
+LIVE_POLL_SECONDS = float(os.environ.get('BINGO_LIVE_POLL_SECONDS', 2))
+
+def _fmt_announcement(a):
+    place = os.path.basename(a.place)
+    return f"Stap {a.step} ({place}): {a.kind} — {len(a.winners)} winnaar(s)"
+
+@st.cache_data(max_entries=4)
+def get_day_selection(day_seed, generation, _priority, _other):
+    # Eén dagselectie per datum (en catalogusversie), gedeeld door alle sessies
+    return day_selection(_priority, _other, day_seed)
 
 if not os.path.exists(IMAGE_DIR):
     st.error("Basismap niet gevonden.")
 else:
-    all_photos = []
-    for root, dirs, files in os.walk(IMAGE_DIR):
-        # Sla bestanden in de root (de map van bingo.py) zelf over; neem alleen subfolders mee
-        if os.path.abspath(root) == os.path.abspath(IMAGE_DIR):
-            continue
-        for f in files:
-            if f.lower().endswith((".png", ".jpg", ".jpeg", ".webp")):
-                rel_path = os.path.relpath(os.path.join(root, f), IMAGE_DIR)
-                all_photos.append(rel_path)
-    all_photos = sorted(all_photos)
+    # De catalogus scant alleen opnieuw als een map gewijzigd is
+    with span('discovery'):
+        catalog = get_photo_catalog().snapshot()
+    all_photos = list(catalog.all_photos)
+
+    # (Bijna-)dubbele foto's tellen als één foto: alleen de vertegenwoordiger wordt gedeeld
+    with span('duplicates'):
+        duplicates, duplicate_clusters = get_duplicates(catalog.generation, catalog.all_photos)
 
     # Geef voorrang aan submap 'pool'
-    priority_folder = os.path.join('pool')
-    priority_photos = [p for p in all_photos if p.split(os.sep)[0] == 'pool']
-    other_photos = [p for p in all_photos if p.split(os.sep)[0] != 'pool']
+    priority_photos = distinct_photos(catalog.priority_photos, duplicates)
+    other_photos = distinct_photos(catalog.other_photos, duplicates)
 
     if len(all_photos) < 9:
         st.warning(f"Voeg minimaal 9 foto's toe.")
@@ -58,417 +274,521 @@ else:
         # ook na een refresh.
         today_seed = date.today().strftime("%Y%m%d")
         
+        # Eén generator per sessie; de globale random-module wordt niet meer gebruikt
+        if 'rng' not in st.session_state:
+            st.session_state.card_seed = session_seed()
+            st.session_state.rng = random.Random(st.session_state.card_seed)
+
         if 'my_cards' not in st.session_state:
-            # We zetten de random generator even 'vast' op de datum van vandaag
-            random.seed(today_seed)
-            # Kies eerst uit prioritaire foto's, vul aan uit overige
-            pri = priority_photos.copy()
-            oth = other_photos.copy()
-            random.shuffle(pri)
-            random.shuffle(oth)
-            combined = (pri + oth)[:max(9, 9)]
-            if len(pri) >= 9:
-                pool = pri
-            else:
-                pool = pri + oth
-            if len(pool) < 9:
+            # Dezelfde 9 foto's voor iedereen vandaag, één keer per datum berekend
+            selected_photos = get_day_selection(today_seed, catalog.generation, tuple(priority_photos), tuple(other_photos))
+            if len(selected_photos) < 9:
                 st.warning("Onvoldoende afbeeldingen om 9 kaarten te vullen.")
                 st.stop()
-            selected_photos = pool[:9]
             # Schud ze daarna voor deze specifieke gebruiker (zodat niet iedereen dezelfde kaart heeft)
-            random.seed()  # Zet random weer 'vrij'
-            random.shuffle(selected_photos)
-            st.session_state.my_cards = selected_photos
-
-        paths = [os.path.join(BASE_DIR, name) for name in st.session_state.my_cards]
-        b64_list = []
-        for p in paths:
-            b64 = get_base64_image(p)
-            if b64:
-                b64_list.append(b64)
-
-        # Zoek naar een 'landkaart' afbeelding (bestandsnaam begint met 'landkaart')
-        map_b64 = None
-        try:
-            # Zoek in de hoofdfolder (naast bingo.py) naar een bestand dat met 'landkaart' begint
-            for fname in os.listdir(BASE_DIR):
-                low = fname.lower()
-                if low.startswith('landkaart') and low.endswith(('.png', '.jpg', '.jpeg', '.webp')):
-                    map_path = os.path.join(BASE_DIR, fname)
-                    map_b64 = get_base64_image(map_path)
-                    break
-        except Exception:
-            map_b64 = None
-
-        if not map_b64:
-            st.warning("Landkaart niet gevonden. Plaats een bestand 'landkaart.jpg' (of .png/.jpeg/.webp) naast bingo.py.")
-
-        overlay_style = ""
-        if map_b64:
-            overlay_style = f"background-image: url('data:image/jpeg;base64,{map_b64}');"
-        
-        html_code = f"""
-        <html>
-        <head>
-            <meta name="viewport" content="width=device-width, initial-scale=1.0, maximum-scale=1.0, user-scalable=no">
-            <script src="https://cdn.jsdelivr.net/npm/canvas-confetti@1.6.0/dist/confetti.browser.min.js"></script>
-            <style>
-                body {{ margin: 0; background: transparent; font-family: 'Segoe UI', sans-serif; display: flex; justify-content: center; align-items: center; min-height: 100vh; overflow: hidden; }}
-                #overlay {{
-                    position: fixed; top: 0; left: 0; width: 100%; height: 100%;
-                    background: #ffffff; z-index: 100; display: flex; flex-direction: column;
-                    justify-content: center; align-items: center; text-align: center;
-                    background-size: cover; background-position: center; background-repeat: no-repeat;
-                    backdrop-filter: none;
-                }}
-                .btn-container {{ display: flex; flex-direction: column; gap: 15px; width: 280px; }}
-                .overlay-shade {{ background: rgba(255,255,255,0.6); padding: 20px; border-radius: 16px; box-shadow: 0 4px 12px rgba(0,0,0,0.12); }}
-                .start-btn {{ padding: 20px; font-size: 18px; cursor: pointer; background: linear-gradient(135deg, #42a5f5, #1e88e5); color: white; border: none; border-radius: 15px; font-weight: bold; box-shadow: 0 4px 10px rgba(0,0,0,0.1); }}
-                .start-btn.silent {{ background: #757575; }}
+            st.session_state.my_cards = card_order(selected_photos, st.session_state.card_seed)
+            # Kaartnummer: hiermee kan de spelleider de kaart later narekenen
+            st.session_state.card_serial = encode_serial(CardSerial(
+                KIND_INTERACTIVE, day_number(date.today()), st.session_state.card_seed, 0,
+                get_pool_fingerprint(catalog.generation, tuple(priority_photos), tuple(other_photos)),
+            ))
+
+        # Afbeeldingen via URL: bij een rerun gaat alleen de HTML (een paar KB) opnieuw over de lijn
+        image_base_url = get_image_base_url()
+        # De kaart-HTML wordt één keer per sessie en kaartset gebouwd. Bij een rerun (door een widget
+        # verderop) is hij byte-gelijk, zodat het iframe niet opnieuw geladen wordt en de browser
+        # de afbeeldingen niet opnieuw decodeert.
+        card_key = (st.session_state.card_serial, tuple(st.session_state.my_cards), image_base_url)
+        if st.session_state.get('card_html_key') != card_key:
+            with span('card_html'):
+                paths = [os.path.join(BASE_DIR, name) for name in st.session_state.my_cards]
+                src_list = []
+                with span('card_images', count=len(paths)):
+                    for p in paths:
+                        src = get_image_src(p, 'card', image_base_url)
+                        if src:
+                            src_list.append(src)
+
+                # Landkaart: eerst een wazige placeholder van een paar honderd bytes, daarna de breedte die bij het scherm past
+                overlay_style, map_picture = "", ""
+                try:
+                    with span('landkaart'):
+                        map_path = find_map_image(BASE_DIR, os.stat(BASE_DIR).st_mtime_ns)
+                        if map_path:
+                            overlay_style, map_picture = get_map_layers(map_path, image_base_url)
+                except Exception:
+                    overlay_style, map_picture = "", ""
+
+                html_code = f"""
+                <html>
+                <head>
+                    <meta name="viewport" content="width=device-width, initial-scale=1.0, maximum-scale=1.0, user-scalable=no">
+                    <script src="{get_asset_src('confetti', image_base_url)}" defer></script>
+                    <style>
+                        body {{ margin: 0; background: transparent; font-family: 'Segoe UI', sans-serif; display: flex; justify-content: center; align-items: center; min-height: 100vh; overflow: hidden; }}
+                        #overlay {{
+                            position: fixed; top: 0; left: 0; width: 100%; height: 100%;
+                            background: #ffffff; z-index: 100; display: flex; flex-direction: column;
+                            justify-content: center; align-items: center; text-align: center;
+                            background-size: cover; background-position: center; background-repeat: no-repeat;
+                            backdrop-filter: none;
+                        }}
+                        #overlay::before {{ content: ''; position: absolute; inset: 0; background: inherit; filter: blur(12px); transform: scale(1.1); }}
+                        .map-full img {{ position: absolute; inset: 0; opacity: 0; transition: opacity 0.4s; }}
+                        .map-full img.loaded {{ opacity: 1; }}
+                        .btn-container {{ display: flex; flex-direction: column; gap: 15px; width: 280px; }}
+                        .overlay-shade {{ position: relative; background: rgba(255,255,255,0.6); padding: 20px; border-radius: 16px; box-shadow: 0 4px 12px rgba(0,0,0,0.12); }}
+                        .start-btn {{ padding: 20px; font-size: 18px; cursor: pointer; background: linear-gradient(135deg, #42a5f5, #1e88e5); color: white; border: none; border-radius: 15px; font-weight: bold; box-shadow: 0 4px 10px rgba(0,0,0,0.1); }}
+                        .start-btn.silent {{ background: #757575; }}
                 
-                #game-container {{ display: none; flex-direction: column; align-items: center; width: 95vw; max-width: 400px; }}
-                .grid {{ display: grid; grid-template-columns: repeat(3, 1fr); gap: 10px; width: 100%; margin-bottom: 15px; }}
-                .item {{ position: relative; aspect-ratio: 1/1; border-radius: 12px; overflow: hidden; border: 3px solid #fff; cursor: pointer; box-shadow: 0 4px 8px rgba(0,0,0,0.1); }}
-                img {{ width: 100%; height: 100%; object-fit: cover; pointer-events: none; }}
+                        #game-container {{ display: none; flex-direction: column; align-items: center; width: 95vw; max-width: 400px; }}
+                        .grid {{ display: grid; grid-template-columns: repeat(3, 1fr); gap: 10px; width: 100%; margin-bottom: 15px; }}
+                        .item {{ position: relative; aspect-ratio: 1/1; border-radius: 12px; overflow: hidden; border: 3px solid #fff; cursor: pointer; box-shadow: 0 4px 8px rgba(0,0,0,0.1); }}
+                        img {{ width: 100%; height: 100%; object-fit: cover; pointer-events: none; }}
                 
-                .cross {{ position: absolute; top: 0; left: 0; width: 100%; height: 100%; display: none; pointer-events: none; z-index: 10; }}
-                .cross::before, .cross::after {{ content: ''; position: absolute; top: 50%; left: 10%; width: 80%; height: 12px; background: rgba(230, 0, 0, 0.85); border-radius: 6px; }}
-                .cross::before {{ transform: translateY(-50%) rotate(45deg); }}
-                .cross::after {{ transform: translateY(-50%) rotate(-45deg); }}
+                        .cross {{ position: absolute; top: 0; left: 0; width: 100%; height: 100%; display: none; pointer-events: none; z-index: 10; }}
+                        .cross::before, .cross::after {{ content: ''; position: absolute; top: 50%; left: 10%; width: 80%; height: 12px; background: rgba(230, 0, 0, 0.85); border-radius: 6px; }}
+                        .cross::before {{ transform: translateY(-50%) rotate(45deg); }}
+                        .cross::after {{ transform: translateY(-50%) rotate(-45deg); }}
                 
-                .selected .cross {{ display: block; }}
-                .selected img {{ filter: grayscale(100%) brightness(0.4); }}
+                        .selected .cross {{ display: block; }}
+                        .selected img {{ filter: grayscale(100%) brightness(0.4); }}
                 
-                .instruction {{ 
-                    color: #333; font-size: 14px; text-align: center; background: #f0f2f6; 
-                    padding: 12px; border-radius: 12px; border: 1px solid #ddd; line-height: 1.4;
-                }}
-            </style>
-        </head>
-        <body>
-            <div id="overlay" style="{overlay_style}">
-                <div class="overlay-shade">
-                    <h3 style="color: #333; margin-bottom: 25px;">Rietman Familie Bingo</h3>
-                    <div class="btn-container">
-                        <button class="start-btn" onclick="startBingo(true)">Speel met Geluid 🔊</button>
-                        <button class="start-btn silent" onclick="startBingo(false)">Stil Spelen 🔇</button>
+                        .instruction {{ 
+                            color: #333; font-size: 14px; text-align: center; background: #f0f2f6; 
+                            padding: 12px; border-radius: 12px; border: 1px solid #ddd; line-height: 1.4;
+                        }}
+                    </style>
+                </head>
+                <body>
+                    <div id="overlay" style="{overlay_style}">
+                        {map_picture}
+                        <div class="overlay-shade">
+                            <h3 style="color: #333; margin-bottom: 25px;">Rietman Familie Bingo</h3>
+                            <div class="btn-container">
+                                <button class="start-btn" onclick="startBingo(true)">Speel met Geluid 🔊</button>
+                                <button class="start-btn silent" onclick="startBingo(false)">Stil Spelen 🔇</button>
+                            </div>
+                        </div>
+                    </div>
+
+                    <div id="game-container">
+                        <div class="grid" id="bingoGrid">
+                            {"".join([f'<div class="item" onclick="toggle(this, event)"><img src="{src}"><div class="cross"></div></div>' for src in src_list])}
+                        </div>
+                        <div class="instruction">
+                            🎁 1 rij = Bingo! | 🏅 2 rijen = Prijs | 🏆 Volle kaart = Hoofdprijs!
+                        </div>
                     </div>
-                </div>
-            </div>
-
-            <div id="game-container">
-                <div class="grid" id="bingoGrid">
-                    {"".join([f'<div class="item" onclick="toggle(this, event)"><img src="data:image/jpeg;base64,{b}"><div class="cross"></div></div>' for b in b64_list])}
-                </div>
-                <div class="instruction">
-                    🎁 1 rij = Bingo! | 🏅 2 rijen = Prijs | 🏆 Volle kaart = Hoofdprijs!
-                </div>
-            </div>
-
-            <audio id="clickSound" src="https://assets.mixkit.co/active_storage/sfx/2013/2013-preview.mp3"></audio>
-            <audio id="winSound" src="https://assets.mixkit.co/active_storage/sfx/1435/1435-preview.mp3"></audio>
-
-            <script>
-                const clickSnd = document.getElementById('clickSound');
-                const winSnd = document.getElementById('winSound');
-                let soundEnabled = true;
-                let winPhase = 0; 
-
-                function startBingo(s) {{
-                    soundEnabled = s;
-                    if(s) {{ clickSnd.play().then(()=>{{clickSnd.pause();}}).catch(()=>{{" "}}); }}
-                    document.getElementById('overlay').style.display = 'none';
-                    document.getElementById('game-container').style.display = 'flex';
-                }}
-
-                function countFullLines() {{
-                    const items = document.querySelectorAll('.item');
-                    const selected = Array.from(items).map(el => el.classList.contains('selected'));
-                    const winPatterns = [
-                        [0,1,2], [3,4,5], [6,7,8], [0,3,6], [1,4,7], [2,5,8], [0,4,8], [2,4,6]
-                    ];
-                    let lines = 0;
-                    winPatterns.forEach(p => {{ if(p.every(idx => selected[idx])) lines++; }});
-                    return lines;
-                }}
-
-                function toggle(el, ev) {{
-                    const isSel = !el.classList.contains('selected');
-                    el.classList.toggle('selected');
+
+                    <audio id="clickSound" src="{get_asset_src('click', image_base_url)}" preload="auto"></audio>
+                    <audio id="winSound" src="{get_asset_src('win', image_base_url)}" preload="auto"></audio>
+
+                    <script>
+                        const clickSnd = document.getElementById('clickSound');
+                        const winSnd = document.getElementById('winSound');
+                        let soundEnabled = true;
+                        let winPhase = 0; 
+                        // Live spel waar de afgestreepte vakjes bij horen (zie applyLive)
+                        let liveGame = null;
+
+                        // Afgestreepte vakjes blijven bewaard in de browser (per kaartnummer), zodat
+                        // herladen van de pagina of het iframe het spel niet wist.
+                        const STATE_KEY = 'rietman-bingo:{st.session_state.card_serial}';
+                        function saveState() {{
+                            const marked = Array.from(document.querySelectorAll('.item'))
+                                .map((el, idx) => el.classList.contains('selected') ? idx : -1).filter(idx => idx >= 0);
+                            try {{ localStorage.setItem(STATE_KEY, JSON.stringify({{ marked: marked, winPhase: winPhase, game: liveGame }})); }} catch (e) {{}}
+                        }}
+                        function restoreState() {{
+                            let saved = null;
+                            try {{ saved = JSON.parse(localStorage.getItem(STATE_KEY) || 'null'); }} catch (e) {{}}
+                            if(!saved) return;
+                            const items = document.querySelectorAll('.item');
+                            (saved.marked || []).forEach(idx => {{ if(items[idx]) items[idx].classList.add('selected'); }});
+                            winPhase = saved.winPhase || 0;
+                            liveGame = saved.game ?? null;
+                        }}
+
+                        // Geluiden worden meteen opgehaald en bij 'Speel met Geluid' één keer gedecodeerd,
+                        // zodat de eerste tik geen vertraging heeft. Zonder Web Audio vallen we terug op <audio>.
+                        const soundData = {{}};
+                        [['click', clickSnd], ['win', winSnd]].forEach(([name, el]) => {{
+                            soundData[name] = fetch(el.src).then(r => r.arrayBuffer()).catch(() => null);
+                        }});
+                        let audioCtx = null;
+                        const soundBuffers = {{}};
+
+                        function loadSounds() {{
+                            const AC = window.AudioContext || window.webkitAudioContext;
+                            if(!AC || audioCtx) return;
+                            audioCtx = new AC();
+                            Object.keys(soundData).forEach(name => {{
+                                soundData[name]
+                                    .then(buf => buf ? audioCtx.decodeAudioData(buf) : null)
+                                    .then(decoded => {{ if(decoded) soundBuffers[name] = decoded; }})
+                                    .catch(() => {{}});
+                            }});
+                        }}
+
+                        function playSound(name, el) {{
+                            if(!soundEnabled) return;
+                            if(audioCtx && soundBuffers[name]) {{
+                                const src = audioCtx.createBufferSource();
+                                src.buffer = soundBuffers[name];
+                                src.connect(audioCtx.destination);
+                                src.start(0);
+                                return;
+                            }}
+                            el.currentTime = 0;
+                            el.play().catch(() => {{}});
+                        }}
+
+                        function startBingo(s) {{
+                            soundEnabled = s;
+                            if(s) {{
+                                loadSounds();
+                                if(audioCtx && audioCtx.state === 'suspended') audioCtx.resume();
+                                clickSnd.play().then(()=>{{clickSnd.pause();}}).catch(()=>{{" "}});
+                            }}
+                            document.getElementById('overlay').style.display = 'none';
+                            document.getElementById('game-container').style.display = 'flex';
+                        }}
+
+                        function countFullLines() {{
+                            const items = document.querySelectorAll('.item');
+                            const selected = Array.from(items).map(el => el.classList.contains('selected'));
+                            const winPatterns = [
+                                [0,1,2], [3,4,5], [6,7,8], [0,3,6], [1,4,7], [2,5,8], [0,4,8], [2,4,6]
+                            ];
+                            let lines = 0;
+                            winPatterns.forEach(p => {{ if(p.every(idx => selected[idx])) lines++; }});
+                            return lines;
+                        }}
+
+                        function toggle(el, ev) {{
+                            const isSel = !el.classList.contains('selected');
+                            el.classList.toggle('selected');
                     
-                    if(isSel) {{
-                        if(soundEnabled) {{ clickSnd.currentTime=0; clickSnd.play(); }}
-                        confetti({{ particleCount: 15, origin: {{ x: ev.clientX/window.innerWidth, y: ev.clientY/window.innerHeight }} }});
-                    }}
-
-                    const fullLines = countFullLines();
-                    const totalSelected = document.querySelectorAll('.selected').length;
-
-                    if(winPhase === 0 && fullLines >= 1) {{
-                        winPhase = 1;
-                        triggerWin("BINGO! Je hebt 1 RIJ vol! 🎁");
-                    }} else if(winPhase === 1 && fullLines >= 2) {{
-                        winPhase = 2;
-                        triggerWin("BINGO! Je hebt 2 RIJEN vol! 🏅");
-                    }} else if(winPhase === 2 && totalSelected === 9) {{
-                        winPhase = 3;
-                        if(soundEnabled) winSnd.play();
-                        var end = Date.now() + 5000;
-                        (function frame() {{
-                            confetti({{ particleCount: 10, angle: 60, spread: 55, origin: {{ x: 0 }}, colors: ['#FFD700', '#FFFFFF'] }});
-                            confetti({{ particleCount: 10, angle: 120, spread: 55, origin: {{ x: 1 }}, colors: ['#FFD700', '#FFFFFF'] }});
-                            if (Date.now() < end) requestAnimationFrame(frame);
-                        }}());
-                        setTimeout(() => alert("HOOFDPRIJS!!! De hele kaart is vol! 🏆👑"), 1000);
-                    }}
-                }}
-
-                function triggerWin(msg) {{
-                    if(soundEnabled) winSnd.play();
-                    confetti({{ particleCount: 100, spread: 70, origin: {{ y: 0.6 }} }});
-                    setTimeout(() => alert(msg), 500);
-                }}
-            </script>
-        </body>
-        </html>
-        """
-        st.components.v1.html(html_code, height=640)
+                            if(isSel) {{
+                                playSound('click', clickSnd);
+                                confetti({{ particleCount: 15, origin: {{ x: ev.clientX/window.innerWidth, y: ev.clientY/window.innerHeight }} }});
+                            }}
+
+                            checkWins();
+                            saveState();
+                        }}
+
+                        function checkWins() {{
+                            const fullLines = countFullLines();
+                            const totalSelected = document.querySelectorAll('.selected').length;
+
+                            if(winPhase === 0 && fullLines >= 1) {{
+                                winPhase = 1;
+                                triggerWin("BINGO! Je hebt 1 RIJ vol! 🎁");
+                            }} else if(winPhase === 1 && fullLines >= 2) {{
+                                winPhase = 2;
+                                triggerWin("BINGO! Je hebt 2 RIJEN vol! 🏅");
+                            }} else if(winPhase === 2 && totalSelected === 9) {{
+                                winPhase = 3;
+                                playSound('win', winSnd);
+                                var end = Date.now() + 5000;
+                                (function frame() {{
+                                    confetti({{ particleCount: 10, angle: 60, spread: 55, origin: {{ x: 0 }}, colors: ['#FFD700', '#FFFFFF'] }});
+                                    confetti({{ particleCount: 10, angle: 120, spread: 55, origin: {{ x: 1 }}, colors: ['#FFD700', '#FFFFFF'] }});
+                                    if (Date.now() < end) requestAnimationFrame(frame);
+                                }}());
+                                setTimeout(() => alert("HOOFDPRIJS!!! De hele kaart is vol! 🏆👑"), 1000);
+                            }}
+                        }}
+
+                        function triggerWin(msg) {{
+                            playSound('win', winSnd);
+                            confetti({{ particleCount: 100, spread: 70, origin: {{ y: 0.6 }} }});
+                            setTimeout(() => alert(msg), 500);
+                        }}
+
+                        // Live spel: de server zet de afgestreepte posities in localStorage (zie live_player_panel)
+                        const LIVE_KEY = 'rietman-bingo-live:{st.session_state.card_serial}';
+                        function applyLive(raw) {{
+                            let live = null;
+                            try {{ live = JSON.parse(raw || 'null'); }} catch (e) {{}}
+                            if(!live) return;
+                            const items = document.querySelectorAll('.item');
+                            let changed = false;
+                            // Nieuw live spel: de kruisjes van het vorige spel gaan weg
+                            const newGame = liveGame !== null && live.game !== liveGame;
+                            if(newGame) {{
+                                items.forEach(el => el.classList.remove('selected'));
+                                winPhase = 0;
+                            }}
+                            const firstGame = liveGame === null;
+                            liveGame = live.game;
+                            (live.marked || []).forEach(idx => {{
+                                if(items[idx] && !items[idx].classList.contains('selected')) {{
+                                    items[idx].classList.add('selected');
+                                    changed = true;
+                                }}
+                            }});
+                            if(changed) {{
+                                playSound('click', clickSnd);
+                                checkWins();
+                            }}
+                            if(changed || newGame || firstGame) saveState();
+                        }}
+                        window.addEventListener('storage', e => {{ if(e.key === LIVE_KEY) applyLive(e.newValue); }});
+
+                        restoreState();
+                        try {{ applyLive(localStorage.getItem(LIVE_KEY)); }} catch (e) {{}}
+                    </script>
+                </body>
+                </html>
+                """
+                st.session_state.card_html = html_code
+                st.session_state.card_has_map = bool(map_picture)
+                st.session_state.card_html_key = card_key
+
+        if not st.session_state.card_has_map:
+            st.warning("Landkaart niet gevonden. Plaats een bestand 'landkaart.jpg' (of .png/.jpeg/.webp) naast bingo.py.")
+
+        st.components.v1.html(st.session_state.card_html, height=640)
+        st.caption(f"Kaartnummer: {st.session_state.card_serial}")
+
+        # Live spel: de kaart wordt aangemeld; de sessie kijkt elke paar seconden of er iets is aangeroepen
+        @st.fragment(run_every=LIVE_POLL_SECONDS)
+        def live_player_panel():
+            serial = st.session_state.card_serial
+            game = get_live_game()
+            # Ook een teken van leven: zonder poll valt de kaart na een tijd uit het spel
+            game.join(serial, st.session_state.my_cards)
+            view = game.player_view(serial)
+            if st.session_state.get('live_version') != view.version:
+                # Alleen bij een nieuwe versie (ook na 'Nieuw live spel', dan zonder posities) de stand naar de
+                # kaart schrijven; de kaart luistert naar deze sleutel (storage-event) en leest hem bij laden
+                st.session_state.live_version = view.version
+                live_key = f"rietman-bingo-live:{serial}"
+                payload = json.dumps({'game': view.game_id, 'marked': list(view.marked)})
+                st.components.v1.html(
+                    f"<script>try {{ localStorage.setItem({json.dumps(live_key)}, {json.dumps(payload)}); }} catch (e) {{}}</script>",
+                    height=0,
+                )
+            if not view.called:
+                return
+            st.caption("Live aangeroepen: " + " → ".join(os.path.basename(p) for p in view.called))
+            seen = st.session_state.get('live_seen', (view.game_id, 0))
+            if seen[0] != view.game_id:
+                seen = (view.game_id, 0)
+            for i, a in enumerate(view.announcements):
+                text = _fmt_announcement(a)
+                if serial in a.winners:
+                    st.success(f"Jouw kaart! {text}")
+                    if i >= seen[1]:
+                        st.toast(f"🎉 {a.kind} — jij bent winnaar!")
+                else:
+                    st.info(text)
+            st.session_state.live_seen = (view.game_id, len(view.announcements))
+        live_player_panel()
 
         st.divider()
-        st.subheader("🖨️ Printbare kaarten genereren")
-        num_cards = st.number_input("Aantal kaarten (1 per pagina)", min_value=1, max_value=200, value=35, step=1)
-        if st.button("Genereer printbare kaarten"):
-            # Helper: maak een functie om 9 foto's te kiezen volgens prioriteitslogica
-            def pick_nine():
-                # hergebruik dezelfde pri/oth lijsten
-                local_pri = priority_photos.copy()
-                local_oth = other_photos.copy()
-                random.shuffle(local_pri)
-                random.shuffle(local_oth)
-                pool = local_pri if len(local_pri) >= 9 else (local_pri + local_oth)
-                return pool[:9]
-            # Bouw HTML voor printen: 1 kaart per pagina
-            print_cards_html = """
-            <html>
-            <head>
-                <meta name=\"viewport\" content=\"width=device-width, initial-scale=1.0\">
-                <style>
-                    @page { size: A4; margin: 12mm; }
-                    body { font-family: 'Segoe UI', Arial, sans-serif; margin: 0; }
-                    .card { padding: 6mm 0; page-break-before: always; page-break-after: always; break-before: page; break-after: page; break-inside: avoid; display: flex; flex-direction: column; align-items: center; }
-                    .title { margin: 6px 0 10px; font-weight: 600; color: #333; }
-                    .grid { display: grid; grid-template-columns: repeat(3, 1fr); gap: 8px; width: 175mm; max-width: 100%; }
-                    .cell { aspect-ratio: 1/1; border: 2px solid #000; border-radius: 6px; overflow: hidden; }
-                    .cell img { width: 100%; height: 100%; object-fit: cover; }
-                </style>
-            </head>
-            <body>
-            """
-
-            for i in range(int(num_cards)):
-                selected = pick_nine()
-                # Zet om naar base64
-                imgs = []
-                for rel in selected:
-                    pth = os.path.join(BASE_DIR, rel)
-                    b64 = get_base64_image(pth)
-                    if b64:
-                        imgs.append(b64)
-                # Render kaart
-                print_cards_html += f"<div class='card'><div class='title'>Kaart {i+1}</div><div class='grid'>" + \
-                    "".join([f"<div class='cell'><img src='data:image/jpeg;base64,{b}'></div>" for b in imgs]) + \
-                    "</div></div>"
-
-            print_cards_html += "</body></html>"
-
-            # Toon in de app
-            st.components.v1.html(print_cards_html, height=900, scrolling=True)
-
-            # Downloadknop voor HTML-bestand
-            st.download_button(
-                label="Download als HTML",
-                data=print_cards_html.encode('utf-8'),
-                file_name="print_kaarten.html",
-                mime="text/html"
-            )
+        # Fragment: widgets hier laten alleen dit deel opnieuw draaien, niet de kaart hierboven
+        @st.fragment
+        def print_cards_section():
+            st.subheader("🖨️ Printbare kaarten genereren")
+            num_cards = st.number_input("Aantal kaarten (1 per pagina)", min_value=1, max_value=200, value=35, step=1)
+            output_format = st.radio("Formaat", ["HTML", "PDF"], horizontal=True)
+            shared_images = st.checkbox("Elke foto één keer insluiten (kleiner bestand)", value=True, help="Kaarten verwijzen naar een gedeelde kopie van elke foto in plaats van per vakje een eigen kopie.")
+            if st.button("Genereer printbare kaarten"):
+                # 9 foto's per kaart volgens prioriteitslogica; elke kaart krijgt een kaartnummer
+                batch = CardSerial(
+                    KIND_PRINTED, day_number(date.today()), session_seed(), 0,
+                    get_pool_fingerprint(catalog.generation, tuple(priority_photos), tuple(other_photos)),
+                )
+                cards = (
+                    (f"Kaart {i+1} · {encode_serial(batch._replace(index=i))}", printed_card(priority_photos, other_photos, batch.seed, i))
+                    for i in range(int(num_cards))
+                )
+                if output_format == "PDF":
+                    # Pagina's worden parallel getekend uit de print-varianten
+                    def print_path(rel):
+                        pth = os.path.join(BASE_DIR, rel)
+                        try:
+                            return get_derivative_store().get_path(pth, 'print')
+                        except Exception:
+                            return pth
+                    pdf_buf = io.BytesIO()
+                    with st.spinner("PDF wordt gemaakt..."), span('print_cards_pdf', cards=int(num_cards)):
+                        n_pages = write_print_pdf(pdf_buf, ((title, [print_path(r) for r in sel]) for title, sel in cards))
+                    st.success(f"PDF met {n_pages} kaart(en) gemaakt.")
+                    st.download_button(
+                        label="Download als PDF",
+                        data=pdf_buf.getvalue(),
+                        file_name="print_kaarten.pdf",
+                        mime="application/pdf"
+                    )
+                else:
+                    # Bouw HTML voor printen: 1 kaart per pagina, gestreamd naar een buffer
+                    with span('print_cards_html', cards=int(num_cards)):
+                        print_cards_html = build_print_html(
+                            cards,
+                            lambda rel: get_base64_variant(os.path.join(BASE_DIR, rel), 'print'),
+                            shared=shared_images,
+                        )
 
+                    # Toon in de app
+                    st.components.v1.html(print_cards_html, height=900, scrolling=True)
+
+                    # Downloadknop voor HTML-bestand
+                    st.download_button(
+                        label="Download als HTML",
+                        data=print_cards_html.encode('utf-8'),
+                        file_name="print_kaarten.html",
+                        mime="text/html"
+                    )
+        print_cards_section()
+
+        # -----------------------------
+        # Kaart controleren (spelleider)
+        # -----------------------------
         st.divider()
-        st.markdown("---")
+        # Fragment, net als de printsectie
+        @st.fragment
+        def check_card_section():
+            st.subheader("🔎 Kaart controleren (spelleider)")
+            st.markdown("Vul een kaartnummer in en kies welke plaatsen al genoemd zijn. De kaart wordt opnieuw berekend uit het nummer, er wordt niets opgeslagen.")
+            places = sorted({p.place for p in catalog.photos})
+            called_places = st.multiselect("Genoemde plaatsen", places, key="called_places")
+            called_photos = {duplicates.get(p.rel_path, p.rel_path) for p in catalog.photos if p.place in set(called_places)}
+            check_col1, check_col2 = st.columns([2,1])
+            with check_col1:
+                serial_text = st.text_input("Kaartnummer", key="check_serial")
+            with check_col2:
+                batch_count = st.number_input("Hele printbatch (aantal kaarten)", min_value=0, max_value=MAX_BATCH, value=0, step=1, key="check_batch", help="0 = alleen deze kaart controleren.")
+            if serial_text:
+                try:
+                    serial = decode_serial(serial_text)
+                    if batch_count:
+                        batch_cards = regenerate_batch(serial, int(batch_count), priority_photos, other_photos)
+                        verdicts = [card_verdict(card, called_photos) for card in batch_cards]
+                        winners = [(i, vd) for i, vd in enumerate(verdicts) if vd.total >= 1]
+                        st.write(f"{len(winners)} van {len(verdicts)} kaarten hebben minstens 1 rij.")
+                        for i, vd in winners:
+                            st.write(f"Kaart {i+1} ({encode_serial(serial._replace(index=i))}): {_fmt_verdict(vd)}")
+                    else:
+                        verdict = card_verdict(regenerate_card(serial, priority_photos, other_photos), called_photos)
+                        label = KIND_LABELS.get(serial.kind, "kaart")
+                        if verdict.total >= 1:
+                            st.success(f"Geldige {label} — {_fmt_verdict(verdict)}")
+                        else:
+                            st.info(f"Geldige {label}, nog geen volle rij ({verdict.marked} van 9 afgestreept).")
+                except ValueError as e:
+                    st.error(str(e))
+        check_card_section()
+
+        # -----------------------------
+        # Live spel (spelleider, alleen met ?host=<token>; spelers zien alleen hun eigen paneel)
+        # -----------------------------
+        if not st.session_state.get('live_host'):
+            st.session_state.live_host = get_live_game().is_host(st.query_params.get('host', ''))
+
+        def _live_call(place):
+            # Callback: loopt vóór de rerun, zodat de stand hieronder al bijgewerkt is
+            if place and st.session_state.get('live_host'):
+                get_live_game().call_step(place, [duplicates.get(p.rel_path, p.rel_path) for p in catalog.photos if p.place == place])
+
+        def _live_reset():
+            if st.session_state.get('live_host'):
+                get_live_game().reset()
+
+        @st.fragment
+        def live_host_section():
+            st.subheader("📣 Live spel (spelleider)")
+            st.markdown("Roep plaatsen één voor één aan. Bij alle spelers met de app open worden de foto's automatisch afgestreept; de server bepaalt wie als eerste 1 rij, 2 rijen en een volle kaart heeft.")
+            game = get_live_game()
+            view = game.player_view("")
+            stats = game.stats()
+            st.write(f"{stats['players']} kaart(en) aangemeld, {stats['called']} plaats(en) aangeroepen.")
+            places = sorted({p.place for p in catalog.photos})
+            remaining = [p for p in places if p not in view.called]
+            live_col1, live_col2 = st.columns([3,1])
+            with live_col1:
+                next_place = st.selectbox("Volgende plaats", remaining, format_func=os.path.basename, key="live_next_place")
+            with live_col2:
+                st.button("Roep aan", disabled=not remaining, key="live_call", on_click=_live_call, args=(next_place,))
+            if view.called:
+                st.caption("Aangeroepen: " + " → ".join(os.path.basename(p) for p in view.called))
+            for a in view.announcements:
+                st.success(_fmt_announcement(a) + ": " + ", ".join(a.winners[:20]) + (" …" if len(a.winners) > 20 else ""))
+            st.button("Nieuw live spel", key="live_reset", on_click=_live_reset)
+        if st.session_state.live_host:
+            st.divider()
+            live_host_section()
 
-# Helper: check lines on a 3x3 card
-def count_lines(selected_mask):
-    # selected_mask is a list[9] of bool
-    wins = 0
-    lines = [
-        (0,1,2),(3,4,5),(6,7,8),
-        (0,3,6),(1,4,7),(2,5,8),
-        (0,4,8),(2,4,6)
-    ]
-    for a,b,c in lines:
-        if selected_mask[a] and selected_mask[b] and selected_mask[c]:
-            wins += 1
-    return wins
+        st.divider()
+        st.markdown("---")
 
 # -----------------------------
 # Importeer verhaal.html (href-volgorde) en simuleer
 # -----------------------------
+# Bij veel spelers worden niet alle bingo-events afzonderlijk getoond
+MAX_LISTED_EVENTS = 1000
 st.divider()
 st.subheader("📥 Importeer verhaal.html en simuleer")
 
 uploaded_html = st.file_uploader("Upload verhaal.html (met <a href=...> naar echte fotopaden)", type=["html", "htm"], key="upload_verhaal_html")
 if uploaded_html is not None:
     try:
-        html_text = uploaded_html.read().decode('utf-8', errors='ignore')
-        # Eenvoudige href-extractie uit <a ... href="...">
-        import re
-        hrefs = re.findall(r'<a[^>]+href=["\']([^"\']+)["\']', html_text, flags=re.IGNORECASE)
-        st.write(f"Gevonden links: {len(hrefs)}")
-        # Filter optioneel op paden die in de pool zitten
-        pool = set(all_photos)
-        valid_sequence = [h for h in hrefs if h in pool]
-        invalid = [h for h in hrefs if h not in pool]
+        # 1 stap = alle foto's in dezelfde submap van 'pool' (zie story_import.py); een dubbele foto in
+        # het verhaal streept de vertegenwoordiger op de kaarten af
+        story_digest = hashlib.sha256(uploaded_html.getbuffer()).hexdigest()
+        story = get_story(story_digest, catalog.generation, uploaded_html, catalog.all_photos, duplicates)
+        valid_sequence, folder_steps = story.sequence, story.steps
+        st.write(f"Gevonden links: {story.links}")
         with st.expander("Verhaalvolgorde (geldig)"):
             for v in valid_sequence:
                 st.write(v)
-        if invalid:
+        if story.normalized:
+            with st.expander(f"Links herkend na normaliseren ({len(story.normalized)})"):
+                for href, rel in story.normalized:
+                    st.write(f"{href} → {rel}")
+        if story.invalid:
             with st.expander("Links niet in fotopool (worden genegeerd)"):
-                for iv in invalid:
+                for iv in story.invalid:
                     st.write(iv)
         if valid_sequence:
-            # Groepeer geldige paden per submap (1 stap = alle foto's in submap van 'pool')
-            # We nemen de eerste mapcomponent als staplabel, bijvoorbeeld 'pool/Apeldoorn/...'
-            # => staplabel = 'pool/Apeldoorn'
-            from collections import OrderedDict
-            folder_map = OrderedDict()
-            for h in valid_sequence:
-                parts = h.split(os.sep)
-                if len(parts) >= 2 and parts[0] == 'pool':
-                    step_label = os.path.join(parts[0], parts[1])
-                else:
-                    # Valt buiten 'pool' => elke losse foto wordt eigen staplabel
-                    step_label = os.path.dirname(h) or h
-                folder_map.setdefault(step_label, []).append(h)
-            # Maak een geordende lijst van (label, items)
-            folder_steps = list(folder_map.items())
 
             # Controls for simulation
-            num_players_html = st.number_input("Aantal spelers (HTML import)", min_value=1, max_value=500, value=35, step=1, key="players_html")
+            num_players_html = st.number_input("Aantal spelers (HTML import)", min_value=1, max_value=100000, value=35, step=1, key="players_html")
             day_pool_size = st.slider("Dagpool-grootte (meer overlap = hogere kans op 2 rijen/volle kaart)", min_value=9, max_value=30, value=15, step=1, help="De set waaruit alle kaarten worden samengesteld. Kleinere dagpool betekent dat kaarten meer items delen.")
+            mc_col1, mc_col2 = st.columns([1,1])
+            with mc_col1:
+                mc_trials = st.number_input("Aantal Monte Carlo-runs", min_value=10, max_value=100000, value=1000, step=100, key="mc_trials")
+            with mc_col2:
+                mc_seed = st.number_input("Seed", min_value=0, value=0, step=1, key="mc_seed", help="Zelfde seed = zelfde uitkomst.")
+            if st.button("Monte Carlo-simulatie"):
+                with st.spinner(f"{int(mc_trials)} spellen worden gesimuleerd..."), span('monte_carlo', trials=int(mc_trials)):
+                    mc = monte_carlo(priority_photos, other_photos, folder_steps, day_pool_size, int(num_players_html), int(mc_trials), seed=int(mc_seed))
+                step_labels = {i: label for i, (label, _) in enumerate(folder_steps, start=1)}
+                st.subheader("🎲 Monte Carlo-verdeling")
+                for kind, _ in MILESTONES:
+                    st.write(f"**Eerste {kind}** — valt niet in {mc.never[kind]} van {mc.trials} runs.")
+                    for step_nr, count in sorted(mc.first_step[kind].items()):
+                        runs_here = {w: c for (s_nr, w), c in mc.step_winners[kind].items() if s_nr == step_nr}
+                        avg_winners = sum(w * c for w, c in runs_here.items()) / count
+                        st.write(
+                            f"Stap {step_nr} ({step_labels.get(step_nr, '')}): {count / mc.trials:.1%} van de runs, "
+                            f"gemiddeld {avg_winners:.1f} winnaar(s), max {max(runs_here)}"
+                        )
             if st.button("Simuleer met geïmporteerde volgorde"):
                 # Stel dagpool samen: eerst uit prioriteit, aanvullen met overige
-                local_pri = priority_photos.copy()
-                local_oth = other_photos.copy()
-                random.shuffle(local_pri)
-                random.shuffle(local_oth)
-                day_pool = local_pri
-                if len(day_pool) < day_pool_size:
-                    day_pool += local_oth[:max(0, day_pool_size - len(day_pool))]
-                day_pool = day_pool[:day_pool_size]
+                sim_rng = st.session_state.setdefault('rng', random.Random(session_seed()))
+                day_pool = build_day_pool(priority_photos, other_photos, day_pool_size, sim_rng)
                 # Genereer kaarten uit dagpool
-                def make_card_from_daypool():
-                    if len(day_pool) < 9:
-                        return day_pool.copy()  # fallback
-                    return random.sample(day_pool, 9)
-                cards = [make_card_from_daypool() for _ in range(int(num_players_html))]
+                cards = deal_cards(day_pool, int(num_players_html), sim_rng)
 
                 # Simulatie: 1 stap = alle items binnen dezelfde submap (folder_steps)
-                results = []
-                first_bingo_step = None
-                first_bingo_count = 0
-
-                # Per-card state to record first-time events
-                has_one_line = [False] * len(cards)
-                has_two_lines = [False] * len(cards)
-                has_full = [False] * len(cards)
-                events = []  # list of dicts with step, card, details
-
-                def line_breakdown(mask):
-                    rows = [(0,1,2),(3,4,5),(6,7,8)]
-                    cols = [(0,3,6),(1,4,7),(2,5,8)]
-                    diags = [(0,4,8),(2,4,6)]
-                    h = sum(1 for a,b,c in rows if mask[a] and mask[b] and mask[c])
-                    v = sum(1 for a,b,c in cols if mask[a] and mask[b] and mask[c])
-                    d = sum(1 for a,b,c in diags if mask[a] and mask[b] and mask[c])
-                    return {"h": h, "v": v, "d": d, "total": h+v+d}
-
-                # Reset geselecteerde sets per kaart
-                selected_sets = [set() for _ in cards]
-
-                for step_idx, (step_label, items_in_step) in enumerate(folder_steps, start=1):
-                    # Markeer alle items uit deze submap tegelijk
-                    for idx, card in enumerate(cards):
-                        # Voeg alle items die in de kaart voorkomen toe
-                        for itm in items_in_step:
-                            if itm in card:
-                                selected_sets[idx].add(itm)
-
-                    one_line = two_lines = full_cards = 0
-                    horiz_cards = vert_cards = diag_cards = 0
-
-                    for idx, card in enumerate(cards):
-                        mask = [c in selected_sets[idx] for c in card]
-                        bd = line_breakdown(mask)
-                        wins = bd["total"]
-
-                        # Record new events (only first time they occur per card)
-                        if not has_one_line[idx] and wins >= 1:
-                            has_one_line[idx] = True
-                            events.append({
-                                "step": step_idx,
-                                "step_label": step_label,
-                                "card": idx + 1,
-                                "type": "1 rij",
-                                "h": bd["h"], "v": bd["v"], "d": bd["d"], "total": wins,
-                                "full": False
-                            })
-                        if not has_two_lines[idx] and wins >= 2:
-                            has_two_lines[idx] = True
-                            events.append({
-                                "step": step_idx,
-                                "step_label": step_label,
-                                "card": idx + 1,
-                                "type": "2 rijen",
-                                "h": bd["h"], "v": bd["v"], "d": bd["d"], "total": wins,
-                                "full": False
-                            })
-                        if not has_full[idx] and all(mask):
-                            has_full[idx] = True
-                            events.append({
-                                "step": step_idx,
-                                "step_label": step_label,
-                                "card": idx + 1,
-                                "type": "Volle kaart",
-                                "h": bd["h"], "v": bd["v"], "d": bd["d"], "total": wins,
-                                "full": True
-                            })
-
-                        if bd["h"] >= 1:
-                            horiz_cards += 1
-                        if bd["v"] >= 1:
-                            vert_cards += 1
-                        if bd["d"] >= 1:
-                            diag_cards += 1
-                        if wins >= 1:
-                            one_line += 1
-                        if wins >= 2:
-                            two_lines += 1
-                        if all(mask):
-                            full_cards += 1
-
-                    results.append({
-                        "step": step_idx,
-                        "step_label": step_label,
-                        "horiz": horiz_cards,
-                        "vert": vert_cards,
-                        "diag": diag_cards,
-                        "one_line": one_line,
-                        "two_lines": two_lines,
-                        "full": full_cards
-                    })
-
-                    if first_bingo_step is None and one_line > 0:
-                        first_bingo_step = step_idx
-                        first_bingo_count = one_line
+                # Kaarten als 9-bits maskers, alle kaarten tegelijk per stap (zie simulation.py)
+                with span('simulate_story', players=len(cards)):
+                    results, events, first_bingo_step, first_bingo_count = simulate_story(cards, folder_steps)
 
                 st.write("Resultaten per stap (HTML import, per submap):")
                 for r in results:
@@ -522,7 +842,9 @@ if uploaded_html is not None:
                     st.write("Alle bingo’s in volgorde:")
                     # Sort by step, then by card
                     events.sort(key=lambda e: (e["step"], e["card"]))
-                    for e in events:
+                    if len(events) > MAX_LISTED_EVENTS:
+                        st.caption(f"Alleen de eerste {MAX_LISTED_EVENTS} van {len(events)} bingo’s worden getoond.")
+                    for e in events[:MAX_LISTED_EVENTS]:
                         details = []
                         if e["h"]:
                             details.append(f"Horizontaal x{e['h']}")
@@ -535,16 +857,77 @@ if uploaded_html is not None:
                         st.write(f"Stap {e['step']}{step_lbl} — Kaart {e['card']}: {e['type']}" + (f" ({detail_str})" if detail_str else ""))
                 else:
                     st.info("Geen bingo-events geregistreerd.")
+
+            # Zoek automatisch een dagpool + kaarten die het gewenste spelverloop geven
+            with st.expander("🎯 Optimaliseer dagpool en kaarten"):
+                n_steps = len(folder_steps)
+                target_range = st.slider("Eerste bingo tussen stap", min_value=1, max_value=max(2, n_steps), value=(min(8, n_steps), min(10, n_steps)), key="opt_first_range")
+                opt_col1, opt_col2 = st.columns([1,1])
+                with opt_col1:
+                    max_first_winners = st.number_input("Max. winnaars bij eerste bingo", min_value=1, max_value=1000, value=2, step=1, key="opt_max_winners")
+                    full_at_last = st.checkbox("Volle kaart pas bij de laatste stap", value=True, key="opt_full_last")
+                with opt_col2:
+                    pool_range = st.slider("Dagpool-grootte (bereik)", min_value=9, max_value=60, value=(9, 30), key="opt_pool_range")
+                    time_limit = st.slider("Rekentijd (seconden)", min_value=5, max_value=120, value=20, step=5, key="opt_time")
+                if st.button("Optimaliseer"):
+                    candidates = priority_photos if len(priority_photos) >= 9 else priority_photos + other_photos
+                    targets = GameTargets(target_range[0], target_range[1], int(max_first_winners), full_at_last)
+                    with st.spinner("Zoeken naar de beste verdeling..."):
+                        with span('optimize_deal'):
+                            best = optimize_deal(candidates, folder_steps, int(num_players_html), targets, pool_size_range=pool_range, time_limit=time_limit)
+                    shape = best.shape
+                    if best.cost == 0:
+                        st.success(f"Alle doelen gehaald na {best.iterations} pogingen.")
+                    else:
+                        st.warning(f"Niet alle doelen gehaald (afwijking {best.cost:.0f}) na {best.iterations} pogingen. Dit is de beste verdeling.")
+                    st.write(
+                        f"Dagpool: {len(best.day_pool)} foto's — eerste bingo bij stap {shape.first_one_step} met {shape.first_one_winners} winnaar(s), "
+                        f"2 rijen bij stap {shape.first_two_step}, volle kaart bij stap {shape.first_full_step} met {shape.first_full_winners} winnaar(s)."
+                    )
+                    with st.expander("Dagpool"):
+                        for p in sorted(best.day_pool):
+                            st.write(p)
+                    # Elke kaart krijgt een (langer) kaartnummer met de plaats van de foto's in de pool
+                    fingerprint = get_pool_fingerprint(catalog.generation, tuple(priority_photos), tuple(other_photos))
+                    try:
+                        titles = [f"Kaart {i+1} · {encode_serial(optimized_serial(card, priority_photos, other_photos, fingerprint))}"
+                                  for i, card in enumerate(best.cards)]
+                    except ValueError as e:
+                        titles = [f"Kaart {i+1}" for i in range(len(best.cards))]
+                        st.info(f"Deze kaarten hebben geen kaartnummer en kunnen niet worden nagerekend: {e}")
+                    opt_html = build_print_html(
+                        zip(titles, best.cards),
+                        lambda rel: get_base64_variant(os.path.join(BASE_DIR, rel), 'print'),
+                    )
+                    st.download_button(
+                        label="Download kaarten als HTML",
+                        data=opt_html.encode('utf-8'),
+                        file_name="geoptimaliseerde_kaarten.html",
+                        mime="text/html"
+                    )
     except Exception as e:
         st.error(f"Kon verhaal.html niet verwerken: {e}")
 
+# -----------------------------
+# Dubbele foto's (zie photo_hashes.py)
+# -----------------------------
+st.divider()
+st.subheader("🪞 Dubbele foto's")
+if duplicate_clusters:
+    st.markdown(f"{len(duplicate_clusters)} groep(en) met dezelfde of bijna dezelfde foto. Van elke groep komt alleen de eerste op de kaarten; een andere foto uit de groep in het verhaal streept die eerste af.")
+    with st.expander("Toon groepen"):
+        for cluster in duplicate_clusters:
+            st.write(" = ".join(cluster))
+else:
+    st.write("Geen dubbele foto's gevonden.")
+
 # -----------------------------
 # Generate index.html for each city/village folder
 # -----------------------------
 st.divider()
 st.subheader("🏙️ Index.html genereren voor dorpen/steden")
 
-st.markdown("Deze actie maakt of update een index.html in elke submap van 'pool', met een korte beschrijving en links naar de afbeeldingen in die map.")
+st.markdown("Deze actie maakt of update een index.html in elke submap van 'pool', met een korte beschrijving en links naar de afbeeldingen in die map. Alleen plaatsen die veranderd zijn worden opnieuw geschreven; de overzichtspagina pool_galerij.html wordt meteen bijgewerkt.")
 
 colA, colB = st.columns([1,1])
 with colA:
@@ -559,125 +942,13 @@ if st.button("Genereer index.html bestanden"):
         if not os.path.isdir(pool_dir):
             st.error("Map 'pool' niet gevonden naast bingo.py.")
         else:
-
-            # Probeer beschrijvingen te laden uit JSON
-            descs = {}
-            try:
-                json_path = os.path.join(BASE_DIR, 'beschrijvingen.json')
-                if os.path.exists(json_path):
-                    import json
-                    with open(json_path, 'r', encoding='utf-8') as jf:
-                        data = json.load(jf)
-                        if isinstance(data, dict):
-                            descs = data
-            except Exception:
-                descs = {}
-
-            created = 0
-            updated = 0
-            skipped = 0
-
-            # We verwachten structuur: pool/<Plaatsnaam>/... (eventueel diepere submappen)
-            # We nemen alleen de eerste laag mappen direct onder 'pool' als 'plaatsmap'.
-            for name in sorted(os.listdir(pool_dir)):
-                place_path = os.path.join(pool_dir, name)
-                if not os.path.isdir(place_path):
-                    continue
-
-                index_path = os.path.join(place_path, 'index.html')
-                if os.path.exists(index_path) and not overwrite_existing:
-                    skipped += 1
-                    continue
-
-                # Verzamel afbeeldingen direct in deze plaatsmap en eventuele submappen
-                # maar link ze relatief zodat ze bruikbaar zijn vanuit index.html in de plaatsmap
-                images = []
-                for root, dirs, files in os.walk(place_path):
-                    for f in files:
-                        if f.lower().endswith((".png", ".jpg", ".jpeg", ".webp")):
-                            rel = os.path.relpath(os.path.join(root, f), place_path)
-                            images.append(rel)
-                images.sort()
-
-                # Bepaal een eenvoudige titel/omschrijving op basis van de mapnaam
-                plaatsnaam = name.replace('-', ' ').replace('_', ' ')
-                title = f"{plaatsnaam.title()} — Fotoverslag"
-                # Haal beschrijving op uit JSON indien beschikbaar
-                custom = descs.get(name) or descs.get(plaatsnaam) or descs.get(name.title())
-                if not custom:
-                    default_tpl = descs.get('_default') if isinstance(descs, dict) else None
-                    if isinstance(default_tpl, str):
-                        custom = default_tpl.replace('{plaats}', plaatsnaam.title())
-                beschrijving = custom if isinstance(custom, str) else f"Welkom! Dit is een korte pagina over {plaatsnaam.title()}. Hieronder vind je een selectie afbeeldingen uit deze map."
-
-                # Bouw HTML-inhoud
-                head = """<!DOCTYPE html>
-<html lang=\"nl\">
-<head>
-  <meta charset=\"utf-8\">
-  <meta name=\"viewport\" content=\"width=device-width, initial-scale=1\">
-  <title>""" + title + """</title>
-  <style>
-    :root { --bg:#fafafa; --fg:#1a1a1a; --muted:#666; --accent:#1e88e5; --card-bg:#fff; --card-border:#eee; --maxw:900px; }
-    html,body{margin:0;padding:0;background:var(--bg);color:var(--fg);font-family:-apple-system,BlinkMacSystemFont,\"Segoe UI\",Roboto,\"Helvetica Neue\",Arial,system-ui,sans-serif;line-height:1.6}
-    .container{max-width:var(--maxw);margin:0 auto;padding:24px 16px 64px}
-    header{margin:0 0 24px;padding:24px 0 8px;border-bottom:1px solid var(--card-border)}
-    header h1{margin:0 0 6px;font-size:28px;font-weight:700}
-    header p{margin:0;color:var(--muted);font-size:14px}
-    .grid{display:grid;grid-template-columns:repeat(auto-fill,minmax(220px,1fr));gap:12px}
-    .tile{border:1px solid var(--card-border);border-radius:10px;overflow:hidden;background:var(--card-bg);box-shadow:0 2px 10px rgba(0,0,0,.04)}
-    .tile img{display:block;width:100%;height:180px;object-fit:cover}
-    .tile .cap{padding:8px 10px;font-size:12px;color:var(--muted)}
-    a{color:var(--accent);text-decoration:none}
-    footer{margin-top:32px;color:var(--muted);font-size:12px}
-    @media print{ .tile{box-shadow:none} }
-  </style>
-</head>
-<body>
-  <div class=\"container\">
-    <header>
-      <h1>""" + title + """</h1>
-      <p>""" + beschrijving + """</p>
-    </header>
-    <main>
-"""
-                body_parts = []
-                if add_image_gallery and images:
-                    body_parts.append("<section><div class=\"grid\">")
-                    for rel in images:
-                        cap = rel
-                        body_parts.append(
-                            "<div class=\"tile\">" \
-                            + f"<a href=\"{rel}\" target=\"_blank\">" \
-                            + f"<img src=\"{rel}\" alt=\"{cap}\"></a>" \
-                            + f"<div class=\"cap\">{cap}</div>" \
-                            + "</div>"
-                        )
-                    body_parts.append("</div></section>")
-                else:
-                    body_parts.append("<p>Er zijn (nog) geen afbeeldingen of de galerij is uitgeschakeld.</p>")
-
-                tail = """
-    </main>
-    <footer>
-      <p>Automatisch gegenereerd door de Bingo-tool.</p>
-    </footer>
-  </div>
-</body>
-</html>
-"""
-                html_out = head + "\n".join(body_parts) + tail
-
-                # Schrijf bestand
-                with open(index_path, 'w', encoding='utf-8') as f:
-                    f.write(html_out)
-                if os.path.exists(index_path):
-                    if overwrite_existing:
-                        updated += 1
-                    else:
-                        created += 1
-
-            st.success(f"Klaar. Aangemaakt: {created}, Bijgewerkt: {updated}, Overgeslagen: {skipped}.")
+            # Zelfde bouw als generate_indexes.py en generate_gallery_html.py, uit het manifest van de
+            # fotocatalogus: de pool hoeft niet opnieuw doorlopen te worden
+            photo_catalog = get_photo_catalog()
+            photo_catalog.snapshot()
+            site_model = model_from_manifest(BASE_DIR, photo_catalog.manifest)
+            report = build_site(site_model, with_gallery=add_image_gallery, overwrite=overwrite_existing)
+            st.success(f"Klaar. Aangemaakt: {report.created}, Bijgewerkt: {report.updated}, Ongewijzigd: {report.unchanged}, Overgeslagen: {report.skipped}.")
     except Exception as e:
         st.error(f"Kon index.html bestanden niet genereren: {e}")
 
@@ -706,7 +977,6 @@ if st.button("Synchroniseer beschrijvingen.json"):
             data = {}
             try:
                 if os.path.exists(json_path):
-                    import json
                     with open(json_path, 'r', encoding='utf-8') as jf:
                         loaded = json.load(jf)
                         if isinstance(loaded, dict):
@@ -746,7 +1016,6 @@ if st.button("Synchroniseer beschrijvingen.json"):
 
             # Schrijf terug
             try:
-                import json
                 with open(json_path, 'w', encoding='utf-8') as jf:
                     json.dump(data, jf, ensure_ascii=False, indent=2)
                 st.success(f"Synchronisatie klaar. Toegevoegd: {len(added)}, Verwijderd: {len(removed)}.")
@@ -764,84 +1033,54 @@ if st.button("Synchroniseer beschrijvingen.json"):
         st.error(f"Kon synchronisatie niet uitvoeren: {e}")
 
 # -----------------------------
-# Beautify verhaal.html (wrap images, add CSS, captions)
+# Beautify verhaal.html (wrap images, add CSS, captions, verkleinde foto's)
 # -----------------------------
 st.divider()
 st.subheader("✨ Verhaal.html mooier maken (Beautify)")
 beauty_file = st.file_uploader("Upload verhaal.html", type=["html", "htm"], key="beautify_verhaal_html")
+beauty_bundle = st.checkbox("Als zelfstandige bundel (zip met de pagina en verkleinde foto's)", value=False, key="beautify_bundle",
+                            help="Zonder bundel verwijst de pagina naar de verkleinde foto's in de static-map van de app; zet hem dan naast 'pool'.")
 if beauty_file is not None:
     try:
-        raw = beauty_file.read().decode('utf-8', errors='ignore')
-        import re
-        # Extract all <a ...><img ...></a> blocks and wrap them in figure blocks with captions
-        def wrap_figures(html: str) -> str:
-            # Pattern to find anchor with img
-            pattern = re.compile(r"<a[^>]*href=\"([^\"]+)\"[^>]*>\s*<img[^>]*src=\"([^\"]+)\"[^>]*alt=\"([^\"]*)\"[^>]*/?>\s*</a>", re.IGNORECASE)
-            def repl(m):
-                href, src, alt = m.group(1), m.group(2), m.group(3)
-                caption = alt if alt else href
-                return f"<div class=\"figure\"><a href=\"{href}\"><img src=\"{src}\" alt=\"{alt or src}\"></a><div class=\"caption\">{caption}</div></div>"
-            return pattern.sub(repl, html)
-
-        content = wrap_figures(raw)
-        # Build pretty HTML shell
-        pretty_head = """
-<!DOCTYPE html>
-<html lang=\"nl\">
-<head>
-  <meta charset=\"utf-8\">
-  <meta name=\"viewport\" content=\"width=device-width, initial-scale=1\">
-  <title>Verhaal</title>
-  <style>
-    :root { --bg:#fafafa; --fg:#1a1a1a; --muted:#666; --accent:#1e88e5; --card-bg:#fff; --card-border:#eee; --maxw:820px; }
-    html,body{margin:0;padding:0;background:var(--bg);color:var(--fg);font-family:-apple-system,BlinkMacSystemFont,"Segoe UI",Roboto,"Helvetica Neue",Arial,system-ui,sans-serif;line-height:1.6;-webkit-font-smoothing:antialiased;-moz-osx-font-smoothing:grayscale}
-    .container{max-width:var(--maxw);margin:0 auto;padding:24px 16px 64px}
-    header{margin:0 0 24px;padding:24px 0 8px;border-bottom:1px solid var(--card-border)}
-    header h1{margin:0 0 6px;font-size:28px;font-weight:700;letter-spacing:-.02em}
-    header p{margin:0;color:var(--muted);font-size:14px}
-    main p{margin:16px 0;font-size:17px}
-    .figure{margin:20px 0;display:flex;flex-direction:column;align-items:center}
-    .figure a{display:inline-block;text-decoration:none;outline:none;border-radius:12px;background:var(--card-bg);border:1px solid var(--card-border);box-shadow:0 4px 16px rgba(0,0,0,.06);overflow:hidden;transition:transform .1s ease,box-shadow .2s ease}
-    .figure a:hover{transform:translateY(-1px);box-shadow:0 8px 24px rgba(0,0,0,.08)}
-    .figure img{display:block;height:auto;width:min(100%,720px);max-width:100%}
-    .caption{margin-top:8px;color:var(--muted);font-size:13px;text-align:center}
-    a.inline{color:var(--accent);text-decoration:none;border-bottom:1px dashed rgba(30,136,229,.4)}
-    a.inline:hover{border-bottom-color:var(--accent)}
-    @media print{ :root{--bg:#fff} .figure a{box-shadow:none!important} }
-  </style>
-</head>
-<body>
-  <div class=\"container\">
-    <header>
-      <h1>Verhaal</h1>
-      <p>Tekst en afbeeldingen in volgorde — klik op een afbeelding om de gekoppelde href te volgen.</p>
-    </header>
-    <main>
-"""
-        pretty_tail = """
-    </main>
-  </div>
-</body>
-</html>
-"""
-        # Try to extract body inner content; if not present, use full content
-        body_match = re.search(r"<body[^>]*>([\s\S]*?)</body>", content, flags=re.IGNORECASE)
-        inner = body_match.group(1) if body_match else content
-        pretty_html = pretty_head + inner + pretty_tail
-
-        st.download_button(
-            label="Download verhaal_mooi.html",
-            data=pretty_html.encode('utf-8'),
-            file_name="verhaal_mooi.html",
-            mime="text/html"
-        )
-        st.info("De HTML is opgeschoond en opgemaakt. Afbeeldingen zijn gewrapt in figure-blokken met captions. Tekst is behouden.")
+        beauty_digest = hashlib.sha256(beauty_file.getbuffer()).hexdigest()
+        pretty_html, pretty_zip, n_figures, n_optimized = get_pretty_story(
+            beauty_digest, catalog.generation, beauty_bundle, beauty_file, catalog.all_photos)
+        if pretty_zip is not None:
+            st.download_button(
+                label="Download verhaal_mooi.zip",
+                data=pretty_zip,
+                file_name="verhaal_mooi.zip",
+                mime="application/zip"
+            )
+        else:
+            st.download_button(
+                label="Download verhaal_mooi.html",
+                data=pretty_html,
+                file_name="verhaal_mooi.html",
+                mime="text/html"
+            )
+        st.info(f"De HTML is opgeschoond en opgemaakt. {n_figures} afbeelding(en) zijn gewrapt in figure-blokken met captions, "
+                f"{n_optimized} daarvan met verkleinde foto's die pas laden als ze in beeld komen. Tekst is behouden.")
     except Exception as e:
         st.error(f"Kon verhaal.html niet beautify-en: {e}")
 
-
-
-
-
-
-
+# -----------------------------
+# Tijdmetingen (alleen met BINGO_TIMING=1, zichtbaar met ?debug=1 in de URL)
+# -----------------------------
+if timing.ENABLED and st.query_params.get('debug'):
+    recorder = _session_recorder()
+    with st.expander("⏱️ Tijdmetingen (debug)"):
+        rows = recorder.summary()
+        if rows:
+            st.dataframe(rows, hide_index=True)
+            last = recorder.records()[-20:]
+            st.caption("Laatste metingen: " + ", ".join(f"{r.name} {r.dur_us / 1000:.1f} ms" for r in reversed(last)))
+        else:
+            st.write("Nog geen metingen in deze sessie.")
+        dbg_col1, dbg_col2, dbg_col3 = st.columns(3)
+        with dbg_col1:
+            st.download_button("Download JSON", data=recorder.to_json(), file_name="bingo_timing.json", mime="application/json")
+        with dbg_col2:
+            st.download_button("Download Chrome trace", data=recorder.to_chrome_trace(), file_name="bingo_timing.trace.json", mime="application/json")
+        with dbg_col3:
+            st.button("Wis metingen", on_click=recorder.clear)
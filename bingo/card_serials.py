@@ -0,0 +1,184 @@
+"""Kaartnummers waarmee de spelleider een kaart kan nacontroleren.
+
+Een kaartnummer bevat alles om de 9 foto's van een kaart opnieuw te maken:
+het soort kaart (interactief of geprint), de dag, de seed, de volgorde in de
+printbatch en een vingerafdruk van de fotopool. Er wordt dus niets
+opgeslagen. Het nummer is Crockford-base32 met een controlegetal, zodat
+typefouten herkend worden.
+
+Kaarten uit de optimalisatie (deal_optimizer.py) zijn niet uit een seed na
+te rekenen; hun nummer is langer en bevat de plaats van elk van de 9 foto's
+in de fotopool. Aan de lengte van het nummer is te zien welke soort het is.
+"""
+import hashlib
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, NamedTuple, Sequence, Tuple
+
+from dealing import SEED_BITS, interactive_card, printed_card
+from simulation import FULL_MASK, LINE_TABLE
+
+ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+EPOCH = date(2024, 1, 1)
+
+KIND_INTERACTIVE = 0
+KIND_PRINTED = 1
+KIND_OPTIMIZED = 2
+KIND_LABELS = {KIND_INTERACTIVE: "interactieve kaart", KIND_PRINTED: "printkaart",
+               KIND_OPTIMIZED: "geoptimaliseerde kaart"}
+
+# Veldbreedtes in bits, in volgorde
+FIELDS = (('kind', 2), ('day', 16), ('seed', SEED_BITS), ('index', 8), ('fingerprint', 12))
+# Geoptimaliseerde kaart: soort, vingerafdruk en per vakje de plaats van de foto in de pool
+PHOTO_BITS = 11
+OPTIMIZED_FIELDS = (('kind', 2), ('fingerprint', 12)) + tuple((f'photo{i}', PHOTO_BITS) for i in range(9))
+CHECK_BITS = 8
+MAX_BATCH = 1 << 8
+MAX_POOL = 1 << PHOTO_BITS
+
+
+class CardSerial(NamedTuple):
+    kind: int
+    day: int
+    seed: int
+    index: int
+    fingerprint: int
+    # Alleen bij KIND_OPTIMIZED: plaats van elke foto in ``priority + other``
+    photos: Tuple[int, ...] = ()
+
+    @property
+    def day_seed(self) -> str:
+        return (EPOCH + timedelta(days=self.day)).strftime("%Y%m%d")
+
+
+class Verdict(NamedTuple):
+    h: int
+    v: int
+    d: int
+    total: int
+    full: bool
+    marked: int
+
+
+def day_number(day: date) -> int:
+    return (day - EPOCH).days
+
+
+def pool_fingerprint(priority: Sequence[str], other: Sequence[str]) -> int:
+    """Korte vingerafdruk van de fotopool; verandert als er foto's bijkomen of verdwijnen."""
+    h = hashlib.sha1()
+    for group in (priority, other):
+        for photo in group:
+            h.update(photo.encode('utf-8'))
+            h.update(b'\0')
+        h.update(b'\1')
+    return int.from_bytes(h.digest()[:2], 'big') >> 4
+
+
+def _check(value: int) -> int:
+    return hashlib.sha1(value.to_bytes(16, 'big')).digest()[0]
+
+
+def _n_chars(fields) -> int:
+    return -(-(sum(bits for _, bits in fields) + CHECK_BITS) // 5)
+
+
+def encode_serial(serial: CardSerial) -> str:
+    fields = FIELDS
+    values = serial._asdict()
+    if serial.kind == KIND_OPTIMIZED:
+        if len(serial.photos) != 9:
+            raise ValueError("Een geoptimaliseerde kaart heeft 9 foto's nodig.")
+        fields = OPTIMIZED_FIELDS
+        values.update((f'photo{i}', photo) for i, photo in enumerate(serial.photos))
+    value = 0
+    for name, bits in fields:
+        field = values[name]
+        if not 0 <= field < (1 << bits):
+            raise ValueError(f"{name} past niet in het kaartnummer: {field}")
+        value = (value << bits) | field
+    value = (value << CHECK_BITS) | _check(value)
+    n_chars = _n_chars(fields)
+    chars = [ALPHABET[(value >> (5 * i)) & 31] for i in reversed(range(n_chars))]
+    text = ''.join(chars)
+    return '-'.join(text[i:i + 4] for i in range(0, len(text), 4))
+
+
+def decode_serial(text: str) -> CardSerial:
+    """Lees een kaartnummer; gooit ValueError bij een ongeldig nummer."""
+    clean = text.strip().upper().replace('-', '').replace(' ', '')
+    # Crockford: O -> 0, I/L -> 1
+    clean = clean.replace('O', '0').replace('I', '1').replace('L', '1')
+    value = 0
+    for ch in clean:
+        pos = ALPHABET.find(ch)
+        if pos < 0:
+            raise ValueError(f"Ongeldig teken in kaartnummer: {ch!r}")
+        value = (value << 5) | pos
+    if len(clean) == _n_chars(FIELDS):
+        fields = FIELDS
+    elif len(clean) == _n_chars(OPTIMIZED_FIELDS):
+        fields = OPTIMIZED_FIELDS
+    else:
+        raise ValueError("Kaartnummer heeft niet de juiste lengte.")
+    if value >> (sum(bits for _, bits in fields) + CHECK_BITS):
+        raise ValueError("Kaartnummer heeft niet de juiste lengte.")
+    check = value & ((1 << CHECK_BITS) - 1)
+    value >>= CHECK_BITS
+    if _check(value) != check:
+        raise ValueError("Kaartnummer klopt niet (controlegetal).")
+    values: Dict[str, int] = {}
+    for name, bits in reversed(fields):
+        values[name] = value & ((1 << bits) - 1)
+        value >>= bits
+    if fields is OPTIMIZED_FIELDS:
+        if values['kind'] != KIND_OPTIMIZED:
+            raise ValueError(f"Onbekend soort kaart: {values['kind']}")
+        return CardSerial(KIND_OPTIMIZED, 0, 0, 0, values['fingerprint'],
+                          tuple(values[f'photo{i}'] for i in range(9)))
+    return CardSerial(**values)
+
+
+def optimized_serial(card: Sequence[str], priority: Sequence[str], other: Sequence[str], fingerprint: int) -> CardSerial:
+    """Kaartnummer voor een kaart uit de optimalisatie; ValueError als de pool te groot is of een foto mist."""
+    positions = {photo: i for i, photo in enumerate(list(priority) + list(other))}
+    if len(positions) > MAX_POOL:
+        raise ValueError(f"De fotopool is te groot voor een kaartnummer ({len(positions)} > {MAX_POOL} foto's).")
+    try:
+        photos = tuple(positions[photo] for photo in card)
+    except KeyError as e:
+        raise ValueError(f"Foto staat niet in de fotopool: {e.args[0]}")
+    return CardSerial(KIND_OPTIMIZED, 0, 0, 0, fingerprint, photos)
+
+
+def regenerate_card(serial: CardSerial, priority: Sequence[str], other: Sequence[str]) -> List[str]:
+    """De 9 foto's van de kaart, opnieuw afgeleid uit het nummer en de huidige pool."""
+    if serial.fingerprint != pool_fingerprint(priority, other):
+        raise ValueError("De fotopool is gewijzigd sinds deze kaart is gemaakt; de kaart kan niet worden nagerekend.")
+    if serial.kind == KIND_INTERACTIVE:
+        return interactive_card(priority, other, serial.day_seed, serial.seed)
+    if serial.kind == KIND_PRINTED:
+        return printed_card(priority, other, serial.seed, serial.index)
+    if serial.kind == KIND_OPTIMIZED:
+        pool = list(priority) + list(other)
+        if any(i >= len(pool) for i in serial.photos):
+            raise ValueError("Kaartnummer verwijst naar een foto buiten de fotopool.")
+        return [pool[i] for i in serial.photos]
+    raise ValueError(f"Onbekend soort kaart: {serial.kind}")
+
+
+def regenerate_batch(serial: CardSerial, count: int, priority: Sequence[str], other: Sequence[str]) -> List[List[str]]:
+    """Alle kaarten uit dezelfde printbatch als ``serial`` (index 0 .. count-1)."""
+    if serial.kind != KIND_PRINTED:
+        raise ValueError("Alleen printkaarten horen bij een batch.")
+    return [regenerate_card(serial._replace(index=i), priority, other) for i in range(count)]
+
+
+def card_verdict(photos: Sequence[str], called: Iterable[str]) -> Verdict:
+    """Rijen/kolommen/diagonalen vol op een kaart, gegeven de tot nu toe genoemde foto's."""
+    called = called if isinstance(called, (set, frozenset)) else set(called)
+    mask = 0
+    for pos, photo in enumerate(photos[:9]):
+        if photo in called:
+            mask |= 1 << pos
+    h, v, d = (int(x) for x in LINE_TABLE[mask])
+    return Verdict(h, v, d, h + v + d, mask == FULL_MASK, bin(mask).count('1'))
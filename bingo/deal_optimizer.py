@@ -0,0 +1,146 @@
+"""Zoek een dagpool en kaartverdeling die een gewenst spelverloop geeft.
+
+In plaats van met de dagpool-slider te schuiven en opnieuw te simuleren,
+zoekt simulated annealing over de samenstelling en grootte van de dagpool
+en over de kaarten zelf. Elke kandidaat wordt beoordeeld met de snelle
+simulatie uit simulation.py.
+"""
+import math
+import random
+import time
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+from dealing import deal_cards
+from simulation import simulate_story
+
+
+class GameTargets(NamedTuple):
+    first_bingo_min: int
+    first_bingo_max: int
+    max_first_winners: int = 2
+    full_at_last_step: bool = True
+
+
+class GameShape(NamedTuple):
+    first_one_step: Optional[int]
+    first_one_winners: int
+    first_two_step: Optional[int]
+    first_full_step: Optional[int]
+    first_full_winners: int
+    # Kaarten die al vol zijn vóór de laatste stap
+    full_before_last: int
+
+
+class OptimizeResult(NamedTuple):
+    day_pool: List[str]
+    cards: List[List[str]]
+    cost: float
+    shape: GameShape
+    iterations: int
+
+
+def game_shape(cards: Sequence[Sequence[str]], folder_steps) -> GameShape:
+    results = simulate_story(cards, folder_steps, collect_events=False).results
+    one = next((r for r in results if r["one_line"] > 0), None)
+    two = next((r for r in results if r["two_lines"] > 0), None)
+    full = next((r for r in results if r["full"] > 0), None)
+    return GameShape(
+        one["step"] if one else None, one["one_line"] if one else 0,
+        two["step"] if two else None,
+        full["step"] if full else None, full["full"] if full else 0,
+        results[-2]["full"] if len(results) >= 2 else 0,
+    )
+
+
+def shape_cost(shape: GameShape, targets: GameTargets, n_steps: int) -> float:
+    """0 als alle doelen gehaald zijn; anders hoe ver het spel ernaast zit."""
+    cost = 0.0
+    if shape.first_one_step is None:
+        cost += 10 * (n_steps + 1)
+    elif shape.first_one_step < targets.first_bingo_min:
+        cost += 10 * (targets.first_bingo_min - shape.first_one_step)
+    elif shape.first_one_step > targets.first_bingo_max:
+        cost += 10 * (shape.first_one_step - targets.first_bingo_max)
+    cost += 3 * max(0, shape.first_one_winners - targets.max_first_winners)
+    if targets.full_at_last_step:
+        if shape.first_full_step is None:
+            cost += 5 * (n_steps + 1)
+        else:
+            cost += 5 * (n_steps - shape.first_full_step) + shape.full_before_last
+    return cost
+
+
+def _replace_everywhere(cards: List[List[str]], old: str, new: str) -> None:
+    for card in cards:
+        for pos, photo in enumerate(card):
+            if photo == old:
+                card[pos] = new
+
+
+def _neighbour(pool: List[str], cards: List[List[str]], candidates: Sequence[str], size_range: Tuple[int, int], rng: random.Random):
+    pool = list(pool)
+    cards = [list(c) for c in cards]
+    in_pool = set(pool)
+    outside = [p for p in candidates if p not in in_pool]
+    move = rng.random()
+    if move < 0.3 and outside:
+        # Wissel een dagpoolfoto voor een foto buiten de pool
+        old = rng.choice(pool)
+        new = rng.choice(outside)
+        pool[pool.index(old)] = new
+        _replace_everywhere(cards, old, new)
+    elif move < 0.4 and outside and len(pool) < size_range[1]:
+        pool.append(rng.choice(outside))
+    elif move < 0.5 and len(pool) > max(9, size_range[0]):
+        old = pool.pop(rng.randrange(len(pool)))
+        for card in cards:
+            if old in card:
+                card[card.index(old)] = rng.choice([p for p in pool if p not in card])
+    elif move < 0.7:
+        # Deel één kaart opnieuw
+        cards[rng.randrange(len(cards))] = rng.sample(pool, 9)
+    else:
+        # Verwissel één vakje van een kaart
+        card = cards[rng.randrange(len(cards))]
+        spare = [p for p in pool if p not in card]
+        if spare:
+            card[rng.randrange(9)] = rng.choice(spare)
+    return pool, cards
+
+
+def optimize_deal(candidates: Sequence[str], folder_steps, num_players: int, targets: GameTargets,
+                  pool_size_range: Tuple[int, int] = (9, 30), time_limit: float = 20.0,
+                  max_iterations: Optional[int] = None, seed: Optional[int] = None,
+                  t_start: float = 5.0, t_end: float = 0.05) -> OptimizeResult:
+    """Simulated annealing over dagpool en kaarten, begrensd in tijd (en optioneel iteraties)."""
+    if len(candidates) < 9:
+        raise ValueError("Minimaal 9 foto's nodig om kaarten te maken.")
+    rng = random.Random(seed)
+    n_steps = len(folder_steps)
+    lo, hi = pool_size_range
+    size = min(max(9, (lo + hi) // 2), len(candidates))
+    pool = rng.sample(list(candidates), size)
+    cards = deal_cards(pool, num_players, rng)
+    shape = game_shape(cards, folder_steps)
+    cost = shape_cost(shape, targets, n_steps)
+    best = (cost, pool, cards, shape)
+
+    started = time.monotonic()
+    iterations = 0
+    while best[0] > 0:
+        elapsed = time.monotonic() - started
+        if elapsed >= time_limit or (max_iterations is not None and iterations >= max_iterations):
+            break
+        iterations += 1
+        progress = elapsed / time_limit if max_iterations is None else iterations / max_iterations
+        temperature = t_start * (t_end / t_start) ** progress
+        new_pool, new_cards = _neighbour(pool, cards, candidates, (lo, hi), rng)
+        new_shape = game_shape(new_cards, folder_steps)
+        new_cost = shape_cost(new_shape, targets, n_steps)
+        if new_cost <= cost or rng.random() < math.exp((cost - new_cost) / temperature):
+            pool, cards, shape, cost = new_pool, new_cards, new_shape, new_cost
+            if cost < best[0]:
+                best = (cost, pool, cards, shape)
+
+    best_cost, best_pool, best_cards, best_shape = best
+    return OptimizeResult(best_pool, best_cards, best_cost, best_shape, iterations)
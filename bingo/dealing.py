@@ -0,0 +1,90 @@
+"""Kaarten delen: de dagselectie en het trekken van kaarten uit een dagpool.
+
+Er wordt nooit aan de globale ``random``-module gezeten. De dagselectie komt
+uit een eigen ``random.Random`` met de datum als seed, zodat iedereen
+vandaag dezelfde foto's krijgt, en elke sessie deelt met een eigen
+generator. Zo kunnen gelijktijdige sessies (Streamlit draait die in
+threads) elkaar niet beïnvloeden.
+"""
+import random
+from typing import List, Mapping, Sequence
+
+# Seeds passen in een kaartnummer (zie card_serials.py)
+SEED_BITS = 24
+
+
+def day_selection(priority: Sequence[str], other: Sequence[str], day_seed: str, size: int = 9) -> List[str]:
+    """De foto's van de dag: eerst uit de prioritaire foto's, aangevuld met overige.
+
+    Geeft dezelfde uitkomst als voorheen ``random.seed(day_seed)`` gevolgd
+    door twee shuffles, maar zonder de globale generator te gebruiken.
+    """
+    rng = random.Random(day_seed)
+    pri = list(priority)
+    oth = list(other)
+    rng.shuffle(pri)
+    rng.shuffle(oth)
+    pool = pri if len(pri) >= size else pri + oth
+    return pool[:size]
+
+
+def session_seed() -> int:
+    """Onvoorspelbare seed voor een nieuwe sessie of printbatch."""
+    return random.SystemRandom().getrandbits(SEED_BITS)
+
+
+def interactive_card(priority: Sequence[str], other: Sequence[str], day_seed: str, card_seed: int) -> List[str]:
+    """De kaart van een speler: de foto's van de dag in een eigen volgorde."""
+    return card_order(day_selection(priority, other, day_seed), card_seed)
+
+
+def card_order(photos: Sequence[str], card_seed: int) -> List[str]:
+    """Schud de foto's van de dag met de seed van de kaart."""
+    photos = list(photos)
+    random.Random(card_seed).shuffle(photos)
+    return photos
+
+
+def distinct_photos(photos: Sequence[str], canonical: Mapping[str, str]) -> List[str]:
+    """Eén foto per cluster van (bijna-)dubbele foto's (zie photo_hashes.py).
+
+    ``canonical`` wijst elke dubbele foto naar de vertegenwoordiger van zijn
+    cluster; alleen die blijft over. Geef de lijsten hierdoor voordat ze naar
+    ``pick_nine``, ``build_day_pool`` of ``day_selection`` gaan, dan telt een
+    cluster overal als één foto.
+    """
+    return [p for p in photos if p not in canonical]
+
+
+def pick_nine(priority: Sequence[str], other: Sequence[str], rng: random.Random) -> List[str]:
+    """Negen foto's voor een printkaart volgens de prioriteitslogica."""
+    local_pri = list(priority)
+    local_oth = list(other)
+    rng.shuffle(local_pri)
+    rng.shuffle(local_oth)
+    pool = local_pri if len(local_pri) >= 9 else (local_pri + local_oth)
+    return pool[:9]
+
+
+def printed_card(priority: Sequence[str], other: Sequence[str], batch_seed: int, index: int) -> List[str]:
+    """Kaart ``index`` uit een printbatch; elke kaart heeft een eigen, herleidbare generator."""
+    return pick_nine(priority, other, random.Random(f"{batch_seed}:{index}"))
+
+
+def build_day_pool(priority: Sequence[str], other: Sequence[str], size: int, rng: random.Random) -> List[str]:
+    """Dagpool: eerst uit de prioritaire foto's, aangevuld met overige foto's."""
+    local_pri = list(priority)
+    local_oth = list(other)
+    rng.shuffle(local_pri)
+    rng.shuffle(local_oth)
+    day_pool = local_pri
+    if len(day_pool) < size:
+        day_pool += local_oth[:max(0, size - len(day_pool))]
+    return day_pool[:size]
+
+
+def deal_cards(day_pool: Sequence[str], count: int, rng: random.Random) -> List[List[str]]:
+    """Trek ``count`` kaarten van 9 foto's uit de dagpool."""
+    if len(day_pool) < 9:
+        return [list(day_pool) for _ in range(count)]  # fallback
+    return [rng.sample(day_pool, 9) for _ in range(count)]
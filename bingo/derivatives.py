@@ -0,0 +1,230 @@
+"""Verkleinde, opnieuw gecodeerde varianten van foto's (Pillow).
+
+Varianten worden op schijf bewaard onder een sleutel van inhoudshash en
+doelgrootte, zodat dezelfde foto onder een andere naam of in een andere map
+niet opnieuw verwerkt wordt. EXIF-oriëntatie wordt toegepast en alle
+metadata wordt weggelaten.
+
+Voor schermvullende afbeeldingen (de landkaart) is er daarnaast een set in
+meerdere breedtes, als WebP en JPEG, plus een piepkleine placeholder die
+meteen inline getoond kan worden.
+"""
+import base64
+import hashlib
+import io
+import os
+import tempfile
+import threading
+from typing import Dict, List, NamedTuple, Sequence, Tuple
+
+from PIL import Image, ImageOps, features
+
+# Kortste zijde in pixels per variant. Een kaartvakje is ~120 css-px breed,
+# 360 px is scherp op schermen met 3x pixeldichtheid; 'print' is ~300 dpi
+# voor een vakje van ~58 mm op A4.
+VARIANTS = {
+    'card': 360,
+    'print': 720,
+}
+JPEG_QUALITY = 82
+ORIENTATION_TAG = 0x0112
+CACHE_DIRNAME = '.cache'
+
+# Breedtes (px) voor schermvullende afbeeldingen; nooit breder dan het origineel
+RESPONSIVE_WIDTHS = (360, 540, 720, 1080, 1440)
+# Formaat -> (Pillow-naam, extensie); WebP alleen als Pillow het kan schrijven
+RESPONSIVE_FORMATS = {'webp': ('WEBP', 'webp'), 'jpeg': ('JPEG', 'jpg')}
+PLACEHOLDER_WIDTH = 24
+PLACEHOLDER_QUALITY = 50
+
+
+class Rendition(NamedTuple):
+    path: str
+    width: int
+    fmt: str
+
+
+class ResponsiveSet(NamedTuple):
+    width: int
+    height: int
+    renditions: Tuple[Rendition, ...]
+    # base64-JPEG van een paar pixels breed; de browser rekt hem wazig op
+    placeholder: str
+
+    def srcset(self, fmt: str, prefix: str = '') -> str:
+        return ", ".join(f"{prefix}{r.path} {r.width}w" for r in self.renditions if r.fmt == fmt)
+
+    def fallback(self) -> Rendition:
+        # Middelste JPEG-breedte, voor browsers zonder srcset
+        jpegs = [r for r in self.renditions if r.fmt == 'jpeg']
+        return jpegs[len(jpegs) // 2]
+
+
+class DerivativeStore:
+    def __init__(self, cache_dir: str, quality: int = JPEG_QUALITY):
+        self.cache_dir = cache_dir
+        self.quality = quality
+        self._lock = threading.Lock()
+        # abspath -> (size, mtime_ns, sha256) zodat ongewijzigde bestanden niet opnieuw gehasht worden
+        self._hashes: Dict[str, Tuple[int, int, str]] = {}
+        # (abspath, mtime_ns, breedtes) -> ResponsiveSet
+        self._responsive: Dict[Tuple[str, int, Tuple[int, ...]], ResponsiveSet] = {}
+
+    def content_hash(self, src_path: str) -> str:
+        src_path = os.path.abspath(src_path)
+        st = os.stat(src_path)
+        with self._lock:
+            known = self._hashes.get(src_path)
+        if known and known[0] == st.st_size and known[1] == st.st_mtime_ns:
+            return known[2]
+        h = hashlib.sha256()
+        with open(src_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+        digest = h.hexdigest()
+        with self._lock:
+            self._hashes[src_path] = (st.st_size, st.st_mtime_ns, digest)
+        return digest
+
+    def variant_path(self, src_path: str, variant: str) -> str:
+        size = VARIANTS[variant]
+        digest = self.content_hash(src_path)
+        return os.path.join(self.cache_dir, digest[:2], f"{digest[:24]}_{size}_q{self.quality}.jpg")
+
+    def get_path(self, src_path: str, variant: str) -> str:
+        """Pad naar de variant; wordt aangemaakt als die nog niet bestaat."""
+        out_path = self.variant_path(src_path, variant)
+        if not os.path.exists(out_path):
+            data = render_variant(src_path, VARIANTS[variant], self.quality)
+            atomic_write(out_path, data)
+        return out_path
+
+    def get_bytes(self, src_path: str, variant: str) -> bytes:
+        with open(self.get_path(src_path, variant), 'rb') as f:
+            return f.read()
+
+    def get_responsive(self, src_path: str, widths: Sequence[int] = RESPONSIVE_WIDTHS) -> ResponsiveSet:
+        """Alle ``widths`` en formaten van een afbeelding plus placeholder; één keer per mtime gemaakt."""
+        src_path = os.path.abspath(src_path)
+        widths = tuple(widths)
+        key = (src_path, os.stat(src_path).st_mtime_ns, widths)
+        with self._lock:
+            known = self._responsive.get(key)
+        if known:
+            return known
+        digest = self.content_hash(src_path)
+        stem = os.path.join(self.cache_dir, digest[:2], digest[:24])
+        with Image.open(src_path) as src:
+            im = _prepare(src)
+            w, h = im.size
+            # Een breedte vlak onder het origineel levert weinig op; dan alleen het origineel
+            used = [x for x in widths if x < 0.9 * w] + ([w] if w <= widths[-1] else [])
+            renditions: List[Rendition] = []
+            for fmt, (pil_format, ext) in RESPONSIVE_FORMATS.items():
+                if fmt == 'webp' and not features.check('webp'):
+                    continue
+                for width in used:
+                    out_path = f"{stem}_w{width}_q{self.quality}.{ext}"
+                    if not os.path.exists(out_path):
+                        atomic_write(out_path, _encode(_resize_width(im, width), pil_format, self.quality))
+                    renditions.append(Rendition(out_path, width, fmt))
+            lqip_path = f"{stem}_lqip.jpg"
+            if not os.path.exists(lqip_path):
+                atomic_write(lqip_path, _encode(_resize_width(im, PLACEHOLDER_WIDTH), 'JPEG', PLACEHOLDER_QUALITY))
+        with open(lqip_path, 'rb') as f:
+            placeholder = base64.b64encode(f.read()).decode()
+        result = ResponsiveSet(w, h, tuple(renditions), placeholder)
+        with self._lock:
+            self._responsive[key] = result
+        return result
+
+
+def render_variant(src_path: str, min_side: int, quality: int = JPEG_QUALITY) -> bytes:
+    """Lees een afbeelding, draai volgens EXIF, verklein en codeer als JPEG zonder metadata."""
+    with Image.open(src_path) as src:
+        im = _prepare(src)
+        w, h = im.size
+        scale = min_side / min(w, h)
+        if scale < 1:
+            im = im.resize((max(1, round(w * scale)), max(1, round(h * scale))), Image.LANCZOS)
+        buf = io.BytesIO()
+        # Geen exif/icc meegeven: het nieuwe bestand bevat geen metadata.
+        # Een al kleine, ongewijzigde JPEG houdt zijn eigen kwantisatie, zodat hij niet groter wordt.
+        keep = im is src and src.format == 'JPEG'
+        im.save(buf, format='JPEG', quality='keep' if keep else quality, optimize=True, progressive=True)
+        return buf.getvalue()
+
+
+def source_size(src_path: str) -> Tuple[int, int]:
+    """Afmetingen na EXIF-oriëntatie; leest alleen de header."""
+    with Image.open(src_path) as src:
+        w, h = src.size
+        if src.getexif().get(ORIENTATION_TAG, 1) in (5, 6, 7, 8):
+            w, h = h, w
+        return w, h
+
+
+def cover_size(size: Tuple[int, int], box: Tuple[int, int]) -> Tuple[int, int]:
+    """Kleinste verkleining die ``box`` nog helemaal bedekt (object-fit: cover); nooit groter dan het origineel."""
+    w, h = size
+    scale = max(box[0] / w, box[1] / h)
+    if scale >= 1:
+        return w, h
+    return max(1, round(w * scale)), max(1, round(h * scale))
+
+
+def render_cover(src_path: str, box: Tuple[int, int], quality: int = JPEG_QUALITY) -> bytes:
+    """JPEG die ``box`` bedekt, voor tegels met object-fit: cover."""
+    with Image.open(src_path) as src:
+        im = _prepare(src)
+        size = cover_size(im.size, box)
+        if size != im.size:
+            im = im.resize(size, Image.LANCZOS)
+        return _encode(im, 'JPEG', quality)
+
+
+def _prepare(src: Image.Image) -> Image.Image:
+    """Draai volgens EXIF en zet om naar RGB (transparantie op wit)."""
+    im = src
+    if src.getexif().get(ORIENTATION_TAG, 1) != 1:
+        im = ImageOps.exif_transpose(src)
+    if im.mode in ('RGBA', 'LA') or (im.mode == 'P' and 'transparency' in im.info):
+        im = im.convert('RGBA')
+        background = Image.new('RGB', im.size, (255, 255, 255))
+        background.paste(im, mask=im.getchannel('A'))
+        im = background
+    elif im.mode != 'RGB':
+        im = im.convert('RGB')
+    return im
+
+
+def _resize_width(im: Image.Image, width: int) -> Image.Image:
+    if width >= im.width:
+        return im
+    return im.resize((width, max(1, round(im.height * width / im.width))), Image.LANCZOS)
+
+
+def _encode(im: Image.Image, pil_format: str, quality: int) -> bytes:
+    buf = io.BytesIO()
+    if pil_format == 'JPEG':
+        im.save(buf, format='JPEG', quality=quality, optimize=True, progressive=True)
+    else:
+        im.save(buf, format=pil_format, quality=quality, method=4)
+    return buf.getvalue()
+
+
+def atomic_write(path: str, data: bytes) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        # mkstemp maakt 0600; varianten worden ook door een webserver gelezen
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
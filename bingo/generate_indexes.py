@@ -2,157 +2,30 @@
 import os
 import sys
 import argparse
-from typing import List
-import json
 
-HTML_HEAD_TEMPLATE = """<!DOCTYPE html>
-<html lang=\"nl\">
-<head>
-  <meta charset=\"utf-8\">
-  <meta name=\"viewport\" content=\"width=device-width, initial-scale=1\">
-  <title>{title}</title>
-  <style>
-    :root {{ --bg:#fafafa; --fg:#1a1a1a; --muted:#666; --accent:#1e88e5; --card-bg:#fff; --card-border:#eee; --maxw:900px; }}
-    html,body{{margin:0;padding:0;background:var(--bg);color:var(--fg);font-family:-apple-system,BlinkMacSystemFont,\"Segoe UI\",Roboto,\"Helvetica Neue\",Arial,system-ui,sans-serif;line-height:1.6}}
-    .container{{max-width:var(--maxw);margin:0 auto;padding:24px 16px 64px}}
-    header{{margin:0 0 24px;padding:24px 0 8px;border-bottom:1px solid var(--card-border)}}
-    header h1{{margin:0 0 6px;font-size:28px;font-weight:700}}
-    header p{{margin:0;color:var(--muted);font-size:14px}}
-    .grid{{display:grid;grid-template-columns:repeat(auto-fill,minmax(220px,1fr));gap:12px}}
-    .tile{{border:1px solid var(--card-border);border-radius:10px;overflow:hidden;background:var(--card-bg);box-shadow:0 2px 10px rgba(0,0,0,.04)}}
-    .tile img{{display:block;width:100%;height:180px;object-fit:cover}}
-    .tile .cap{{padding:8px 10px;font-size:12px;color:var(--muted)}}
-    a{{color:var(--accent);text-decoration:none}}
-    footer{{margin-top:32px;color:var(--muted);font-size:12px}}
-    @media print{{ .tile{{box-shadow:none}} }}
-  </style>
-</head>
-<body>
-  <div class=\"container\">
-    <header>
-      <h1>{title}</h1>
-      <p>{beschrijving}</p>
-    </header>
-    <main>
-"""
-
-HTML_TAIL = """
-    </main>
-    <footer>
-      <p>Automatisch gegenereerd door generate_indexes.py.</p>
-    </footer>
-  </div>
-</body>
-</html>
-"""
-
-def collect_images(place_dir: str) -> List[str]:
-    images: List[str] = []
-    for root, dirs, files in os.walk(place_dir):
-        for f in files:
-            low = f.lower()
-            if low.endswith((".png", ".jpg", ".jpeg", ".webp")):
-                rel = os.path.relpath(os.path.join(root, f), place_dir)
-                images.append(rel)
-    images.sort()
-    return images
-
-def load_descriptions(base_dir: str) -> dict:
-    path = os.path.join(base_dir, 'beschrijvingen.json')
-    try:
-        with open(path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            if isinstance(data, dict):
-                return data
-    except Exception:
-        pass
-    return {}
-
-def sync_descriptions(base_dir: str, pool_dir: str, remove_orphans: bool = False) -> tuple[int, int]:
-    """Synchronize beschrijvingen.json with folders under pool_dir.
-    Returns (added, removed)."""
-    path = os.path.join(base_dir, 'beschrijvingen.json')
-    # Load existing data
-    try:
-        with open(path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            if not isinstance(data, dict):
-                data = {}
-    except Exception:
-        data = {}
-
-    # Ensure default template
-    default_tpl = data.get('_default')
-    if not isinstance(default_tpl, str):
-        default_tpl = "Welkom! Dit is een korte pagina over {plaats}. Hieronder vind je een selectie afbeeldingen uit deze map."
-        data['_default'] = default_tpl
-
-    # Collect first-level folders
-    places_on_disk = [name for name in sorted(os.listdir(pool_dir)) if os.path.isdir(os.path.join(pool_dir, name))]
-
-    added = 0
-    removed = 0
-
-    # Add missing
-    for name in places_on_disk:
-        if name in data:
-            continue
-        plaatsnaam = name.replace('-', ' ').replace('_', ' ')
-        desc = default_tpl.replace('{plaats}', plaatsnaam.title())
-        data[name] = desc
-        added += 1
-
-    # Remove orphans
-    if remove_orphans:
-        keys = list(data.keys())
-        for key in keys:
-            if key == '_default':
-                continue
-            if key not in places_on_disk and key.title() not in places_on_disk and key.replace(' ', '-') not in places_on_disk:
-                del data[key]
-                removed += 1
-
-    # Write back
-    with open(path, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-
-    return added, removed
-
-def build_html(place_name: str, images: List[str], with_gallery: bool, beschrijving: str | None = None) -> str:
-    plaatsnaam = place_name.replace('-', ' ').replace('_', ' ')
-    if not beschrijving:
-        beschrijving = f"Welkom! Dit is een korte pagina over {plaatsnaam.title()}. Hieronder vind je een selectie afbeeldingen uit deze map."
-
-    title = f"{plaatsnaam.title()} — Fotoverslag"
-
-    head = HTML_HEAD_TEMPLATE.format(title=title, beschrijving=beschrijving)
-    body_parts: List[str] = []
-    if with_gallery and images:
-        body_parts.append("<section><div class=\"grid\">")
-        for rel in images:
-            cap = rel
-            body_parts.append(
-                "<div class=\"tile\">"
-                + f"<a href=\"{rel}\" target=\"_blank\">"
-                + f"<img src=\"{rel}\" alt=\"{cap}\"></a>"
-                + f"<div class=\"cap\">{cap}</div>"
-                + "</div>"
-            )
-        body_parts.append("</div></section>")
-    else:
-        body_parts.append("<p>Er zijn (nog) geen afbeeldingen of de galerij is uitgeschakeld.</p>")
-
-    return head + "\n".join(body_parts) + HTML_TAIL
+# De HTML-sjablonen en het manifest staan in site_build.py; hier opnieuw beschikbaar voor bestaande scripts
+from site_build import (HTML_HEAD_TEMPLATE, HTML_TAIL, MANIFEST_NAME, TEMPLATE_VERSION, build_html, build_site,
+                        load_descriptions, load_manifest, page_inputs, place_description, scan_site,
+                        sync_descriptions)
+from site_watch import SiteWatcher
+from timing import report_at_exit
 
 
 def main(argv=None):
     parser = argparse.ArgumentParser(description="Genereer index.html in elke submap van 'pool'.")
     parser.add_argument('--base', type=str, default=None, help="Basismap (standaard: map van dit script)")
-    parser.add_argument('--overwrite', action='store_true', help="Overschrijf bestaande index.html")
+    parser.add_argument('--overwrite', action='store_true', help="Herschrijf alle index.html, ook ongewijzigde en handgemaakte")
+    parser.add_argument('--check', action='store_true', help="Meld verouderde index.html zonder iets te schrijven (exitcode 1 als er verouderde zijn)")
     parser.add_argument('--no-gallery', action='store_true', help="Schakel de afbeeldingsgalerij uit")
+    parser.add_argument('--workers', type=int, default=None, help="Aantal processen (standaard: aantal CPU's)")
     parser.add_argument('--sync-descriptions', action='store_true', help='Synchroniseer beschrijvingen.json met mappen voor generatie')
     parser.add_argument('--remove-orphans', action='store_true', help='Verwijder beschrijvingen zonder corresponderende map (gebruik met --sync-descriptions)')
+    parser.add_argument('--watch', action='store_true', help="Blijf draaien en bouw bij wijzigingen in 'pool' alleen de geraakte pagina's (en galerijkaarten) opnieuw")
+    parser.add_argument('--interval', type=float, default=1.0, help="Seconden tussen twee controles in --watch (standaard: 1)")
+    parser.add_argument('--debounce', type=float, default=2.0, help="Seconden rust na de laatste wijziging voordat er gebouwd wordt (standaard: 2)")
     args = parser.parse_args(argv)
+    if args.watch and args.check:
+        parser.error("--watch en --check gaan niet samen")
 
     base_dir = args.base if args.base else os.path.dirname(os.path.abspath(__file__))
     pool_dir = os.path.join(base_dir, 'pool')
@@ -165,49 +38,31 @@ def main(argv=None):
         added, removed = sync_descriptions(base_dir, pool_dir, remove_orphans=args.remove_orphans)
         print(f"Synchronisatie beschrijvingen.json — Toegevoegd: {added}, Verwijderd: {removed}.")
 
-    descs = load_descriptions(base_dir)
-
-    created = 0
-    updated = 0
-    skipped = 0
-
-    for name in sorted(os.listdir(pool_dir)):
-        place_path = os.path.join(pool_dir, name)
-        if not os.path.isdir(place_path):
-            continue
-
-        index_path = os.path.join(place_path, 'index.html')
-        if os.path.exists(index_path) and not args.overwrite:
-            skipped += 1
-            continue
-
-        images = collect_images(place_path)
-
-        plaatsnaam = name.replace('-', ' ').replace('_', ' ')
-        custom = descs.get(name) or descs.get(plaatsnaam) or descs.get(name.title())
-        if not custom:
-            default_tpl = descs.get('_default')
-            if isinstance(default_tpl, str):
-                custom = default_tpl.replace('{plaats}', plaatsnaam.title())
-
-        html_out = build_html(name, images, with_gallery=(not args.no_gallery), beschrijving=custom)
-
-        os.makedirs(place_path, exist_ok=True)
-        with open(index_path, 'w', encoding='utf-8') as f:
-            f.write(html_out)
-
-        if os.path.exists(index_path) and args.overwrite:
-            # If file existed and we overwrote -> updated
-            updated += 1
-        elif not os.path.exists(index_path) or (not args.overwrite and not os.path.exists(index_path)):
-            # If for some reason file doesn't exist (should not happen), count created
-            created += 1
-        else:
-            # If file didn't exist before, count created
-            created += 1
-
-    print(f"Klaar. Aangemaakt: {created}, Bijgewerkt: {updated}, Overgeslagen: {skipped}.")
+    # Momentopname vóór de eerste build, zodat wijzigingen tijdens die build niet gemist worden
+    watcher = SiteWatcher(base_dir, with_gallery=not args.no_gallery, workers=args.workers) if args.watch else None
+
+    # Model uit het fotomanifest (alleen gewijzigde mappen worden gelezen); alleen verouderde pagina's
+    # worden (parallel) opnieuw geschreven
+    model = scan_site(base_dir, workers=args.workers)
+    report = build_site(model, pages=True, gallery=False, with_gallery=not args.no_gallery,
+                        overwrite=args.overwrite, check=args.check, workers=args.workers)
+
+    if args.check:
+        for name, reason in report.stale:
+            print(f"Verouderd: {name} ({reason})")
+        print(f"{len(report.stale)} verouderd, {report.unchanged} actueel, {report.skipped} handgemaakt.")
+        return 1 if report.stale else 0
+
+    print(f"Klaar. Aangemaakt: {report.created}, Bijgewerkt: {report.updated}, Ongewijzigd: {report.unchanged}, Overgeslagen: {report.skipped}.")
+    if watcher:
+        print(f"Wacht op wijzigingen in {pool_dir} (Ctrl+C om te stoppen)...")
+        try:
+            watcher.run(interval=args.interval, debounce=args.debounce)
+        except KeyboardInterrupt:
+            pass
     return 0
 
 if __name__ == '__main__':
-    sys.exit(main())
+    code = main()
+    report_at_exit()
+    sys.exit(code)
@@ -0,0 +1,89 @@
+"""Procesbrede LRU-cache voor gecodeerde afbeeldingen (base64-strings).
+
+Alle sessies delen dezelfde cache. De sleutel is pad + mtime + variant, zodat
+een gewijzigd bestand vanzelf opnieuw gecodeerd wordt. De cache houdt een
+plafond in bytes aan en gooit de minst recent gebruikte items weg.
+"""
+import base64
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def get_base64_image(image_path):
+    """Het hele bestand als base64-tekst, of None als het niet te lezen is."""
+    try:
+        with open(image_path, "rb") as f:
+            return base64.b64encode(f.read()).decode()
+    except Exception:
+        return None
+
+
+class EncodedImageCache:
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._items: "OrderedDict[Tuple[str, int, str], str]" = OrderedDict()
+        self.resident_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_encode(self, path: str, variant: str, encode: Callable[[], Optional[str]]) -> Optional[str]:
+        """Geef de gecodeerde payload uit de cache of maak hem met ``encode()``."""
+        path = os.path.abspath(path)
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+        key = (path, mtime_ns, variant)
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return value
+            self.misses += 1
+
+        value = encode()
+        if value is None:
+            return None
+        size = len(value)
+        if size > self.max_bytes:
+            return value
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.resident_bytes -= len(old)
+            self._items[key] = value
+            self.resident_bytes += size
+            while self.resident_bytes > self.max_bytes and self._items:
+                _, evicted = self._items.popitem(last=False)
+                self.resident_bytes -= len(evicted)
+                self.evictions += 1
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self.resident_bytes = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hit_rate,
+                'items': len(self._items),
+                'resident_bytes': self.resident_bytes,
+                'max_bytes': self.max_bytes,
+            }
@@ -0,0 +1,108 @@
+"""Afbeeldingen via een vaste URL serveren in plaats van als base64 in de HTML.
+
+De verkleinde varianten (zie derivatives.py) staan in de static-map van de
+app en hebben een naam op basis van hun inhoudshash. Een URL verandert dus
+alleen als de foto verandert, en de browser kan hem onbeperkt bewaren.
+
+Standaard serveert Streamlit zelf de static-map (``server.enableStaticServing``).
+Met ``serve_static`` kan dezelfde map ook via een kleine eigen HTTP-server
+worden aangeboden, met ``Cache-Control: immutable``-headers. Die server
+luistert op hetzelfde adres als de app en staat cross-origin verzoeken
+(de geluiden worden met ``fetch`` geladen) alleen toe vanaf dezelfde host.
+"""
+import functools
+import os
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.parse import quote, urlsplit
+
+from derivatives import DerivativeStore, ResponsiveSet
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+class ImageUrls:
+    """Vertaalt een foto + variant naar een pad binnen de static-map."""
+
+    def __init__(self, store: DerivativeStore, static_dir: str):
+        self.store = store
+        self.static_dir = os.path.abspath(static_dir)
+        self._lock = threading.Lock()
+        # (pad, mtime_ns, variant) -> relatief pad; voorkomt opnieuw hashen bij elke rerun
+        self._paths: Dict[Tuple[str, int, str], str] = {}
+        self._responsive: Dict[Tuple[str, int], ResponsiveSet] = {}
+
+    def url_path(self, out_path: str) -> str:
+        """Relatief, URL-gecodeerd pad van een bestand in de static-map."""
+        return quote(os.path.relpath(out_path, self.static_dir).replace(os.sep, '/'))
+
+    def path_for(self, src_path: str, variant: str) -> Optional[str]:
+        """Relatief, URL-gecodeerd pad van de variant, of None als die niet te maken is."""
+        src_path = os.path.abspath(src_path)
+        try:
+            key = (src_path, os.stat(src_path).st_mtime_ns, variant)
+        except OSError:
+            return None
+        with self._lock:
+            known = self._paths.get(key)
+        if known:
+            return known
+        try:
+            out_path = self.store.get_path(src_path, variant)
+        except Exception:
+            return None
+        rel = self.url_path(out_path)
+        with self._lock:
+            self._paths[key] = rel
+        return rel
+
+    def responsive_for(self, src_path: str) -> Optional[ResponsiveSet]:
+        """Zoals ``DerivativeStore.get_responsive``, maar met relatieve URL-paden."""
+        src_path = os.path.abspath(src_path)
+        try:
+            key = (src_path, os.stat(src_path).st_mtime_ns)
+        except OSError:
+            return None
+        with self._lock:
+            known = self._responsive.get(key)
+        if known:
+            return known
+        try:
+            full = self.store.get_responsive(src_path)
+        except Exception:
+            return None
+        result = full._replace(renditions=tuple(r._replace(path=self.url_path(r.path)) for r in full.renditions))
+        with self._lock:
+            self._responsive[key] = result
+        return result
+
+
+class _CachingHandler(SimpleHTTPRequestHandler):
+    def end_headers(self):
+        self.send_header('Cache-Control', IMMUTABLE_CACHE_CONTROL)
+        # Alleen de app zelf: zelfde hostnaam, andere poort
+        origin = self.headers.get('Origin')
+        if origin and urlsplit(origin).hostname == urlsplit(f"//{self.headers.get('Host', '')}").hostname:
+            self.send_header('Access-Control-Allow-Origin', origin)
+        self.send_header('Vary', 'Origin')
+        super().end_headers()
+
+    def list_directory(self, path):
+        self.send_error(404, "File not found")
+        return None
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_static(directory: str, port: int, host: str = 'localhost') -> ThreadingHTTPServer:
+    """Start een HTTP-server op de achtergrond die ``directory`` serveert met lange cache-headers.
+
+    ``host`` is het adres waarop geluisterd wordt ('' voor alle adressen).
+    """
+    handler = functools.partial(_CachingHandler, directory=directory)
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='bingo-image-server', daemon=True).start()
+    return server
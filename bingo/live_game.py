@@ -0,0 +1,181 @@
+"""Live spel: de spelleider roept plaatsen aan, de server streept af en zoekt winnaars.
+
+Eén ``LiveGame`` per proces wordt gedeeld door alle sessies. Elke speler
+meldt zijn kaart aan met het kaartnummer; de kaart wordt een 9-bits masker
+zoals in simulation.py. Een index foto -> (speler, bit) zorgt dat een
+aangeroepen stap alleen de kaarten raakt waar die foto's op staan. Wie
+laat aanmeldt met een kaart die door eerder aangeroepen stappen al een
+mijlpaal haalt die nog niet is aangekondigd, wordt bij de volgende stap
+als winnaar meegenomen.
+
+Spelerssessies pollen elke paar seconden ``player_view``; ``version`` (een
+oplopend getal) zegt of er sinds de vorige keer iets veranderd is, en alleen
+dan wordt de stand naar de kaart in de browser geschreven. Een speler die
+een tijd niet gepolld heeft (``PLAYER_TTL`` seconden, bijv. na het sluiten
+van het tabblad) valt uit het spel; bij de volgende poll meldt hij zich weer
+aan.
+
+Alleen wie het ``host_token`` kent is spelleider (zie ``is_host``).
+"""
+import hmac
+import threading
+import time
+from typing import Dict, Iterable, List, NamedTuple, Sequence, Tuple
+
+from simulation import FULL_MASK, LINE_TOTALS, MILESTONES
+
+# Seconden zonder poll waarna een kaart uit het spel valt
+PLAYER_TTL = 600
+
+
+class Announcement(NamedTuple):
+    step: int
+    place: str
+    kind: str
+    # Kaartnummers van de winnaars, in volgorde van aanmelden
+    winners: Tuple[str, ...]
+
+
+class PlayerView(NamedTuple):
+    version: int
+    game_id: int
+    # Posities (0-8) op de kaart die door de spelleider zijn afgestreept
+    marked: Tuple[int, ...]
+    called: Tuple[str, ...]
+    announcements: Tuple[Announcement, ...]
+
+
+def _reached(mask: int) -> Tuple[bool, bool, bool]:
+    total = int(LINE_TOTALS[mask])
+    return total >= 1, total >= 2, mask == FULL_MASK
+
+
+class LiveGame:
+    """Thread-safe spelstand van het live spel, gedeeld door alle sessies."""
+
+    def __init__(self, host_token: str, player_ttl: float = PLAYER_TTL):
+        self._lock = threading.Lock()
+        self.host_token = host_token
+        self.player_ttl = player_ttl
+        self.version = 0
+        self.game_id = 1
+        self._cards: Dict[str, Tuple[str, ...]] = {}
+        self._masks: Dict[str, int] = {}
+        self._last_seen: Dict[str, float] = {}
+        # foto -> [(speler, bit)]
+        self._index: Dict[str, List[Tuple[str, int]]] = {}
+        self._called: List[str] = []
+        self._called_photos: set = set()
+        self._announcements: List[Announcement] = []
+        # Laat aangemelde spelers die al een open mijlpaal halen; als geordende set
+        self._pending: Dict[str, None] = {}
+
+    def is_host(self, token: str) -> bool:
+        return bool(token) and hmac.compare_digest(token, self.host_token)
+
+    def _publish(self) -> None:
+        # Aanroepen met de lock in handen
+        self.version += 1
+
+    def join(self, player_id: str, photos: Sequence[str]) -> None:
+        """Meld een kaart aan; nogmaals aanmelden met dezelfde kaart doet niets."""
+        photos = tuple(photos[:9])
+        with self._lock:
+            self._last_seen[player_id] = time.monotonic()
+            self._expire()
+            if self._cards.get(player_id) == photos:
+                return
+            if player_id in self._cards:
+                self._unindex(player_id)
+            self._cards[player_id] = photos
+            mask = 0
+            for pos, photo in enumerate(photos):
+                self._index.setdefault(photo, []).append((player_id, 1 << pos))
+                if photo in self._called_photos:
+                    mask |= 1 << pos
+            self._masks[player_id] = mask
+            done = {a.kind for a in self._announcements}
+            if any(hit and kind not in done for (kind, _), hit in zip(MILESTONES, _reached(mask))):
+                self._pending[player_id] = None
+
+    def _unindex(self, player_id: str) -> None:
+        for photo in self._cards[player_id]:
+            entries = self._index.get(photo, [])
+            entries[:] = [e for e in entries if e[0] != player_id]
+            if not entries:
+                self._index.pop(photo, None)
+
+    def _remove(self, player_id: str) -> None:
+        if player_id in self._cards:
+            self._unindex(player_id)
+            del self._cards[player_id]
+            del self._masks[player_id]
+        self._pending.pop(player_id, None)
+        self._last_seen.pop(player_id, None)
+
+    def _expire(self) -> None:
+        cutoff = time.monotonic() - self.player_ttl
+        for player_id in [p for p, seen in self._last_seen.items() if seen < cutoff]:
+            self._remove(player_id)
+
+    def call_step(self, place: str, photos: Iterable[str]) -> List[Announcement]:
+        """Roep een plaats aan: streep de foto's af en geef nieuwe aankondigingen terug."""
+        with self._lock:
+            self._expire()
+            fresh = [p for p in photos if p not in self._called_photos]
+            self._called.append(place)
+            self._called_photos.update(fresh)
+            touched: Dict[str, int] = {}
+            for photo in fresh:
+                for player_id, bit in self._index.get(photo, ()):
+                    touched[player_id] = touched.get(player_id, self._masks[player_id]) | bit
+            self._masks.update(touched)
+
+            done = {a.kind for a in self._announcements}
+            winners: Dict[str, List[str]] = {kind: [] for kind, _ in MILESTONES}
+            # Dict-volgorde = volgorde van aanmelden
+            for player_id, mask in self._masks.items():
+                if player_id not in touched and player_id not in self._pending:
+                    continue
+                for (kind, _), hit in zip(MILESTONES, _reached(mask)):
+                    if hit and kind not in done:
+                        winners[kind].append(player_id)
+            new = [Announcement(len(self._called), place, kind, tuple(winners[kind]))
+                   for kind, _ in MILESTONES if winners[kind]]
+            self._announcements.extend(new)
+            self._pending = {}
+            self._publish()
+            return new
+
+    def reset(self) -> None:
+        """Nieuw spel met dezelfde aangemelde kaarten."""
+        with self._lock:
+            self.game_id += 1
+            self._called = []
+            self._called_photos = set()
+            self._announcements = []
+            self._pending = {}
+            self._masks = dict.fromkeys(self._masks, 0)
+            self._publish()
+
+    def player_view(self, player_id: str) -> PlayerView:
+        """Stand voor één kaart; geldt ook als teken van leven voor een aangemelde kaart."""
+        with self._lock:
+            if player_id in self._cards:
+                self._last_seen[player_id] = time.monotonic()
+            mask = self._masks.get(player_id, 0)
+            return PlayerView(
+                self.version, self.game_id,
+                tuple(pos for pos in range(9) if mask >> pos & 1),
+                tuple(self._called), tuple(self._announcements),
+            )
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._expire()
+            return {
+                'players': len(self._cards),
+                'called': len(self._called),
+                'version': self.version,
+                'game_id': self.game_id,
+            }
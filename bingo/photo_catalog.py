@@ -0,0 +1,148 @@
+"""Gedeelde fotocatalogus voor de bingo-app.
+
+De catalogus scant de fotomappen één keer en onthoudt per foto het pad, de
+plaatsmap, de grootte en de mtime. Bij volgende aanvragen worden alleen de
+mtimes van de mappen gecontroleerd; pas als een map gewijzigd is (bestand
+toegevoegd, verwijderd of hernoemd) volgt een nieuwe scan.
+
+Met een ``manifest`` (een ``pool_manifest.PoolManifest``) komt de scan uit
+het manifest op schijf: een koude start leest dan alleen de mappen die
+sinds de vorige keer veranderd zijn.
+"""
+import os
+import threading
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+
+IMAGE_EXTS = ('.png', '.jpg', '.jpeg', '.webp')
+PRIORITY_FOLDER = 'pool'
+
+
+class Photo(NamedTuple):
+    rel_path: str
+    place: str
+    size: int
+    mtime: float
+
+
+class CatalogSnapshot(NamedTuple):
+    photos: Tuple[Photo, ...]
+    all_photos: Tuple[str, ...]
+    priority_photos: Tuple[str, ...]
+    other_photos: Tuple[str, ...]
+    generation: int
+
+
+def place_of(rel_path: str) -> str:
+    """Plaatsmap van een foto: 'pool/<plaats>' binnen de pool, anders de eigen map."""
+    parts = rel_path.split(os.sep)
+    if len(parts) >= 2 and parts[0] == PRIORITY_FOLDER:
+        return os.path.join(parts[0], parts[1])
+    return os.path.dirname(rel_path) or rel_path
+
+
+class PhotoCatalog:
+    """Thread-safe catalogus van alle foto's onder ``root``.
+
+    Bestanden direct in ``root`` worden overgeslagen; alleen submappen tellen
+    mee, net als voorheen in bingo.py. Verborgen mappen (zoals de cache met
+    verkleinde varianten in ``.cache``) worden niet doorzocht, en ook de
+    mappen in ``exclude`` direct onder ``root`` niet. Mappen met een naam uit
+    ``skip_dirnames`` (zoals de thumbnails van de indexpagina's) worden op
+    elke diepte overgeslagen. Met een ``manifest`` gelden diens regels.
+    """
+
+    def __init__(self, root: str, exclude: Iterable[str] = (), skip_dirnames: Iterable[str] = (), manifest=None):
+        self.root = os.path.abspath(root)
+        self.exclude = frozenset(exclude)
+        self.skip_dirnames = frozenset(skip_dirnames)
+        self.manifest = manifest
+        self._lock = threading.Lock()
+        self._dir_mtimes: Dict[str, int] = {}
+        self._snapshot: CatalogSnapshot | None = None
+        self._dirty = False
+        self.hits = 0
+        self.misses = 0
+        self.rescans = 0
+
+    def _scan_manifest(self) -> Tuple[List[Photo], Dict[str, int]]:
+        self.manifest.refresh()
+        self.manifest.save()
+        photos = [Photo(rel, p.place, p.size, p.mtime_ns / 1e9) for rel, p in self.manifest.photos.items()]
+        photos.sort(key=lambda p: p.rel_path)
+        return photos, self.manifest.dir_mtimes()
+
+    def _scan(self) -> Tuple[List[Photo], Dict[str, int]]:
+        if self.manifest is not None:
+            return self._scan_manifest()
+        photos: List[Photo] = []
+        dir_mtimes: Dict[str, int] = {}
+        stack = [self.root]
+        while stack:
+            current = stack.pop()
+            try:
+                dir_mtimes[current] = os.stat(current).st_mtime_ns
+                entries = list(os.scandir(current))
+            except OSError:
+                continue
+            is_root = current == self.root
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if (not entry.name.startswith('.') and entry.name not in self.skip_dirnames
+                                and not (is_root and entry.name in self.exclude)):
+                            stack.append(entry.path)
+                        continue
+                    if is_root or not entry.name.lower().endswith(IMAGE_EXTS):
+                        continue
+                    st = entry.stat()
+                except OSError:
+                    continue
+                rel = os.path.relpath(entry.path, self.root)
+                photos.append(Photo(rel, place_of(rel), st.st_size, st.st_mtime))
+        photos.sort(key=lambda p: p.rel_path)
+        return photos, dir_mtimes
+
+    def _is_stale(self) -> bool:
+        for path, mtime_ns in self._dir_mtimes.items():
+            try:
+                if os.stat(path).st_mtime_ns != mtime_ns:
+                    return True
+            except OSError:
+                return True
+        return False
+
+    def snapshot(self) -> CatalogSnapshot:
+        """Geef de actuele catalogus; scant alleen opnieuw als een map gewijzigd is."""
+        with self._lock:
+            if self._snapshot is not None and not self._dirty and not self._is_stale():
+                self.hits += 1
+                return self._snapshot
+            if self._snapshot is None:
+                self.misses += 1
+            else:
+                self.rescans += 1
+            photos, dir_mtimes = self._scan()
+            all_photos = tuple(p.rel_path for p in photos)
+            priority = tuple(p for p in all_photos if p.split(os.sep)[0] == PRIORITY_FOLDER)
+            other = tuple(p for p in all_photos if p.split(os.sep)[0] != PRIORITY_FOLDER)
+            generation = self._snapshot.generation + 1 if self._snapshot else 1
+            self._snapshot = CatalogSnapshot(tuple(photos), all_photos, priority, other, generation)
+            self._dir_mtimes = dir_mtimes
+            self._dirty = False
+            return self._snapshot
+
+    def invalidate(self) -> None:
+        """Forceer een nieuwe scan bij de volgende aanvraag."""
+        with self._lock:
+            self._dirty = True
+
+    def stats(self) -> dict:
+        with self._lock:
+            snap = self._snapshot
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'rescans': self.rescans,
+                'photos': len(snap.photos) if snap else 0,
+                'dirs': len(self._dir_mtimes),
+            }
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""Dubbele en bijna-dubbele foto's herkennen met hashes.
+
+Per foto worden twee hashes bewaard: SHA-1 van de bytes (exact dezelfde
+file) en een dHash van 64 bits (zelfde beeld, ander formaat of andere
+compressie). De index staat als JSON in ``.cache/photo_hashes.json`` en
+wordt per foto bijgewerkt als grootte of mtime verandert; nieuwe foto's
+worden in een procespool gehasht. Staat een foto al in het fotomanifest
+(zie pool_manifest.py), dan komen grootte, mtime en SHA-1 daaruit en wordt
+alleen de dHash nog berekend.
+
+Foto's met gelijke SHA-1, of met een dHash die in ten hoogste ``threshold``
+bits verschilt, vormen een cluster. Om niet alle paren te hoeven vergelijken
+wordt de dHash in ``threshold + 1`` stukken gedeeld: twee hashes die zo
+weinig verschillen zijn in minstens één stuk gelijk (duiventilprincipe).
+Bijna egale beelden (heel weinig of bijna alle bits aan) doen alleen mee via
+de exacte hash; hun dHash zegt te weinig.
+
+Binnen een cluster is de eerste foto de vertegenwoordiger (poolfoto's eerst,
+dan op pad);
+zie ``DuplicateIndex.canonical`` en ``dealing.distinct_photos``.
+
+    python photo_hashes.py            # toon clusters in de map van dit script
+    python photo_hashes.py --threshold 6 --workers 8
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+from PIL import Image, ImageOps
+
+from derivatives import atomic_write
+from photo_catalog import PRIORITY_FOLDER
+
+CACHE_NAME = os.path.join('.cache', 'photo_hashes.json')
+HASH_VERSION = 1
+# Bij 4 zijn de stukken 12-13 bits: kleine buckets, ook bij tienduizenden foto's
+DEFAULT_THRESHOLD = 4
+# dHash met minder dan dit aantal bits aan (of uit) telt niet voor bijna-dubbelen
+MIN_DETAIL_BITS = 8
+HASH_BITS = 64
+
+
+class HashEntry(NamedTuple):
+    size: int
+    mtime_ns: int
+    sha1: str
+    # None als Pillow het bestand niet kan lezen
+    dhash: Optional[int]
+
+
+def dhash(im: Image.Image) -> int:
+    """64-bit verschil-hash: per rij van een 9x8 grijsbeeld, is de pixel lichter dan zijn rechterbuur."""
+    small = im.convert('L').resize((9, 8), Image.LANCZOS)
+    px = small.tobytes()
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            value = (value << 1) | (px[row * 9 + col] > px[row * 9 + col + 1])
+    return value
+
+
+def hash_file(path: str, sha1: Optional[str] = None) -> Tuple[str, Optional[int]]:
+    """(sha1, dhash) van een foto; met een bekende ``sha1`` wordt alleen de dHash berekend."""
+    if sha1 is None:
+        with open(path, 'rb') as f:
+            sha1 = hashlib.sha1(f.read()).hexdigest()
+    try:
+        with Image.open(path) as im:
+            # JPEG's direct op lage resolutie decoderen; voor een 9x8-hash is dat ruim genoeg
+            im.draft('L', (64, 64))
+            value = dhash(ImageOps.exif_transpose(im))
+    except Exception:
+        value = None
+    return sha1, value
+
+
+def _hash_batch(jobs: Sequence[Tuple[str, Optional[str]]]) -> List[Tuple[str, Optional[int]]]:
+    results = []
+    for path, sha1 in jobs:
+        try:
+            results.append(hash_file(path, sha1))
+        except OSError:
+            results.append(('', None))
+    return results
+
+
+def _rep_order(rel: str) -> Tuple[bool, str]:
+    return rel.split(os.sep)[0] != PRIORITY_FOLDER, rel
+
+
+def _has_detail(value: Optional[int]) -> bool:
+    if value is None:
+        return False
+    bits = value.bit_count()
+    return MIN_DETAIL_BITS <= bits <= HASH_BITS - MIN_DETAIL_BITS
+
+
+class DuplicateIndex:
+    """Hashes van alle foto's onder ``root`` en de clusters van (bijna-)dubbele foto's.
+
+    Thread-safe; de app deelt één index over alle sessies.
+    """
+
+    def __init__(self, root: str, cache_path: Optional[str] = None, threshold: int = DEFAULT_THRESHOLD):
+        self.root = os.path.abspath(root)
+        self.cache_path = cache_path or os.path.join(self.root, CACHE_NAME)
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self.entries: Dict[str, HashEntry] = self._load()
+        self.clusters: List[Tuple[str, ...]] = []
+        self.canonical: Dict[str, str] = {}
+
+    def _load(self) -> Dict[str, HashEntry]:
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') != HASH_VERSION:
+                return {}
+            return {rel: HashEntry(*values) for rel, values in data['photos'].items()}
+        except Exception:
+            return {}
+
+    def _save(self) -> None:
+        data = {'version': HASH_VERSION, 'photos': {rel: list(e) for rel, e in sorted(self.entries.items())}}
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            atomic_write(self.cache_path, json.dumps(data, separators=(',', ':')).encode('utf-8'))
+        except OSError:
+            pass
+
+    def update(self, rel_paths: Iterable[str], workers: Optional[int] = None, known: Optional[Mapping] = None) -> int:
+        """Hash nieuwe en gewijzigde foto's, vergeet verdwenen foto's en bepaal de clusters opnieuw.
+
+        ``known`` is een bijgewerkt ``PoolManifest.photos``: foto's daarin worden
+        niet gestat en hun SHA-1 wordt niet opnieuw berekend. Geeft het aantal
+        (opnieuw) gehashte foto's terug.
+        """
+        known = known or {}
+        with self._lock:
+            current: Dict[str, Tuple[int, int]] = {}
+            for rel in rel_paths:
+                photo = known.get(rel)
+                if photo is not None:
+                    current[rel] = (photo.size, photo.mtime_ns)
+                    continue
+                try:
+                    st = os.stat(os.path.join(self.root, rel))
+                except OSError:
+                    continue
+                current[rel] = (st.st_size, st.st_mtime_ns)
+            todo = [rel for rel, stat in current.items()
+                    if rel not in self.entries or tuple(self.entries[rel][:2]) != stat]
+            removed = [rel for rel in self.entries if rel not in current]
+            for rel in removed:
+                del self.entries[rel]
+
+            if todo:
+                jobs = [(os.path.join(self.root, rel), known[rel].sha1 if rel in known else None) for rel in todo]
+                workers = min(workers or os.cpu_count() or 1, max(1, len(todo) // 64))
+                if workers <= 1:
+                    hashes = _hash_batch(jobs)
+                else:
+                    # Aaneengesloten stukken, zodat de volgorde bewaard blijft
+                    step = -(-len(jobs) // (workers * 4))
+                    chunks = [jobs[i:i + step] for i in range(0, len(jobs), step)]
+                    with ProcessPoolExecutor(max_workers=workers) as pool:
+                        hashes = [h for chunk in pool.map(_hash_batch, chunks) for h in chunk]
+                for rel, (sha1, value) in zip(todo, hashes):
+                    if sha1:
+                        self.entries[rel] = HashEntry(*current[rel], sha1, value)
+            if todo or removed:
+                self._save()
+            self._cluster()
+            return len(todo)
+
+    def _cluster(self) -> None:
+        rels = sorted(self.entries)
+        parent = list(range(len(rels)))
+
+        def find(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        def union(a: int, b: int) -> None:
+            ra, rb = find(a), find(b)
+            if ra != rb:
+                parent[max(ra, rb)] = min(ra, rb)
+
+        by_sha: Dict[str, int] = {}
+        for i, rel in enumerate(rels):
+            first = by_sha.setdefault(self.entries[rel].sha1, i)
+            if first != i:
+                union(first, i)
+
+        bands = self.threshold + 1
+        edges = [band * HASH_BITS // bands for band in range(bands + 1)]
+        masks = [(1 << (edges[band + 1] - edges[band])) - 1 for band in range(bands)]
+        values = [self.entries[rel].dhash for rel in rels]
+        buckets: List[Dict[int, List[int]]] = [{} for _ in range(bands)]
+        for i, value in enumerate(values):
+            if not _has_detail(value):
+                continue
+            for band in range(bands):
+                bucket = buckets[band].setdefault((value >> edges[band]) & masks[band], [])
+                for j in bucket:
+                    if (value ^ values[j]).bit_count() <= self.threshold:
+                        union(i, j)
+                bucket.append(i)
+
+        groups: Dict[int, List[str]] = {}
+        for i, rel in enumerate(rels):
+            groups.setdefault(find(i), []).append(rel)
+        self.clusters = sorted(tuple(sorted(g, key=_rep_order)) for g in groups.values() if len(g) > 1)
+        self.canonical = {rel: group[0] for group in self.clusters for rel in group[1:]}
+
+    def representative(self, rel: str) -> str:
+        return self.canonical.get(rel, rel)
+
+    def is_exact(self, cluster: Sequence[str]) -> bool:
+        return len({self.entries[rel].sha1 for rel in cluster}) == 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Zoek dubbele en bijna-dubbele foto's.")
+    parser.add_argument('--base', type=str, default=None, help="Basismap (standaard: map van dit script)")
+    parser.add_argument('--threshold', type=int, default=DEFAULT_THRESHOLD, help=f"Maximaal aantal verschillende dHash-bits (standaard: {DEFAULT_THRESHOLD})")
+    parser.add_argument('--workers', type=int, default=None, help="Aantal processen (standaard: aantal CPU's)")
+    parser.add_argument('--json', action='store_true', help="Clusters als JSON")
+    args = parser.parse_args(argv)
+
+    from photo_catalog import PhotoCatalog
+    from pool_manifest import PoolManifest
+    base_dir = args.base if args.base else os.path.dirname(os.path.abspath(__file__))
+    manifest = PoolManifest(base_dir)
+    photos = PhotoCatalog(base_dir, manifest=manifest).snapshot().all_photos
+    index = DuplicateIndex(base_dir, threshold=args.threshold)
+    hashed = index.update(photos, workers=args.workers, known=manifest.photos)
+
+    if args.json:
+        print(json.dumps([{'exact': index.is_exact(c), 'photos': list(c)} for c in index.clusters], indent=2, ensure_ascii=False))
+        return 0
+    print(f"{len(photos)} foto's, {hashed} opnieuw gehasht, {len(index.clusters)} cluster(s) met dubbele foto's.")
+    for cluster in index.clusters:
+        print(f"\n{'Exact gelijk' if index.is_exact(cluster) else 'Bijna gelijk'}:")
+        for rel in cluster:
+            print(f"  {rel}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
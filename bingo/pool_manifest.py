@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""Manifest van alle foto's op schijf, zodat een koude start niet alles hoeft te doorlopen.
+
+``pool_manifest.json`` staat naast ``pool/`` en bevat per foto de plaats,
+grootte, mtime, afmetingen (na EXIF-oriëntatie) en SHA-1 van de inhoud, en
+per map de mtime en submappen. Dezelfde regels als de fotocatalogus van de
+app: bestanden direct in de basismap tellen niet, verborgen mappen en de
+mappen in ``EXCLUDE`` (direct onder de basismap) en ``SKIP_DIRNAMES`` (op elke
+diepte) worden overgeslagen.
+
+``refresh()`` stat alleen de mappen uit het manifest. Is de mtime van een map
+gelijk, dan worden zijn bestanden en submappen uit het manifest overgenomen;
+anders wordt alleen die map opnieuw gelezen en worden nieuwe of gewijzigde
+bestanden opnieuw gemeten en gehasht. Een bestand dat op zijn plek wordt
+overschreven verandert de map niet; ``refresh(full=True)`` (het commando
+``scan``) stat daarom ook elk bestand. De basismap zelf wordt altijd gelezen
+(daar staat het manifest, dus zijn mtime verandert bij elke keer schrijven);
+hij bevat alleen mappen en is dus snel.
+
+    python pool_manifest.py scan              # werk het manifest volledig bij
+    python pool_manifest.py scan --base /pad/naar/bingo --workers 8
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from derivatives import atomic_write, source_size
+from photo_catalog import IMAGE_EXTS, place_of
+
+MANIFEST_NAME = 'pool_manifest.json'
+MANIFEST_VERSION = 1
+# Map met thumbnails in elke plaatsmap (zie site_build.py); geen spelfoto's
+THUMB_DIRNAME = 'thumbs'
+EXCLUDE = ('static',)
+SKIP_DIRNAMES = (THUMB_DIRNAME,)
+
+
+class ManifestPhoto(NamedTuple):
+    place: str
+    size: int
+    mtime_ns: int
+    # 0 als Pillow het bestand niet kan lezen
+    width: int
+    height: int
+    sha1: str
+
+
+def measure(path: str) -> Tuple[int, int, str]:
+    """(breedte, hoogte, sha1) van een foto."""
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    try:
+        w, ht = source_size(path)
+    except Exception:
+        w, ht = 0, 0
+    return w, ht, h.hexdigest()
+
+
+def _measure_batch(paths: Sequence[str]) -> List[Optional[Tuple[int, int, str]]]:
+    results = []
+    for path in paths:
+        try:
+            results.append(measure(path))
+        except OSError:
+            results.append(None)
+    return results
+
+
+class PoolManifest:
+    """Het manifest van ``root`` in het geheugen; ``refresh`` werkt bij, ``save`` schrijft weg."""
+
+    def __init__(self, root: str, path: Optional[str] = None):
+        self.root = os.path.abspath(root)
+        self.path = path or os.path.join(self.root, MANIFEST_NAME)
+        self._lock = threading.Lock()
+        # relatieve map ('' is de basismap) -> (mtime_ns, submappen)
+        self.dirs: Dict[str, Tuple[int, Tuple[str, ...]]] = {}
+        self.photos: Dict[str, ManifestPhoto] = {}
+        self._root_mtime = 0
+        self._dirty = False
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') != MANIFEST_VERSION:
+                return
+            self.dirs = {d: (mtime, tuple(subdirs)) for d, (mtime, subdirs) in data['dirs'].items()}
+            self.photos = {rel: ManifestPhoto(*values) for rel, values in data['photos'].items()}
+        except Exception:
+            self.dirs, self.photos = {}, {}
+
+    def save(self) -> bool:
+        """Schrijf het manifest als er iets veranderd is; True als er geschreven is."""
+        with self._lock:
+            if not self._dirty:
+                return False
+            data = {
+                'version': MANIFEST_VERSION,
+                'dirs': {d: [mtime, list(subdirs)] for d, (mtime, subdirs) in sorted(self.dirs.items())},
+                'photos': {rel: list(p) for rel, p in sorted(self.photos.items())},
+            }
+            try:
+                before = os.stat(self.root).st_mtime_ns
+                atomic_write(self.path, json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+                # Schrijven verandert de mtime van de basismap; zonder andere wijziging sinds refresh()
+                # is dat geen reden om opnieuw te scannen (zie dir_mtimes)
+                if before == self._root_mtime and os.path.dirname(self.path) == self.root:
+                    self._root_mtime = os.stat(self.root).st_mtime_ns
+            except OSError:
+                return False
+            self._dirty = False
+            return True
+
+    def _list_dir(self, rel_dir: str, old_photos: Dict[str, ManifestPhoto]):
+        """Lees één map: (submappen, {rel: (size, mtime_ns)} van nieuwe/gewijzigde foto's, ongewijzigde foto's)."""
+        abs_dir = os.path.join(self.root, rel_dir)
+        is_root = rel_dir == ''
+        subdirs: List[str] = []
+        changed: Dict[str, Tuple[int, int]] = {}
+        kept: Dict[str, ManifestPhoto] = {}
+        try:
+            entries = list(os.scandir(abs_dir))
+        except OSError:
+            return (), changed, kept
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if (not entry.name.startswith('.') and entry.name not in SKIP_DIRNAMES
+                            and not (is_root and entry.name in EXCLUDE)):
+                        subdirs.append(entry.name)
+                    continue
+                if is_root or not entry.name.lower().endswith(IMAGE_EXTS):
+                    continue
+                st = entry.stat()
+            except OSError:
+                continue
+            rel = os.path.join(rel_dir, entry.name)
+            old = old_photos.get(rel)
+            if old is not None and old.size == st.st_size and old.mtime_ns == st.st_mtime_ns:
+                kept[rel] = old
+            else:
+                changed[rel] = (st.st_size, st.st_mtime_ns)
+        return tuple(sorted(subdirs)), changed, kept
+
+    def refresh(self, full: bool = False, workers: Optional[int] = None) -> int:
+        """Werk het manifest bij; geeft het aantal opnieuw gemeten foto's terug."""
+        with self._lock:
+            by_dir: Dict[str, Dict[str, ManifestPhoto]] = {}
+            for rel, photo in self.photos.items():
+                by_dir.setdefault(os.path.dirname(rel), {})[rel] = photo
+
+            dirs: Dict[str, Tuple[int, Tuple[str, ...]]] = {}
+            photos: Dict[str, ManifestPhoto] = {}
+            todo: Dict[str, Tuple[int, int]] = {}
+            stack = ['']
+            while stack:
+                rel_dir = stack.pop()
+                try:
+                    mtime = os.stat(os.path.join(self.root, rel_dir)).st_mtime_ns
+                except OSError:
+                    continue
+                known = self.dirs.get(rel_dir)
+                if rel_dir == '':
+                    self._root_mtime = mtime
+                    mtime = 0
+                if not full and known is not None and known[0] == mtime and rel_dir != '':
+                    subdirs = known[1]
+                    photos.update(by_dir.get(rel_dir, {}))
+                else:
+                    subdirs, changed, kept = self._list_dir(rel_dir, by_dir.get(rel_dir, {}))
+                    photos.update(kept)
+                    todo.update(changed)
+                dirs[rel_dir] = (mtime, subdirs)
+                stack.extend(os.path.join(rel_dir, name) for name in subdirs)
+
+            if todo:
+                rels = sorted(todo)
+                paths = [os.path.join(self.root, rel) for rel in rels]
+                workers = min(workers or os.cpu_count() or 1, max(1, len(rels) // 64))
+                if workers <= 1:
+                    measured = _measure_batch(paths)
+                else:
+                    step = -(-len(paths) // (workers * 4))
+                    chunks = [paths[i:i + step] for i in range(0, len(paths), step)]
+                    with ProcessPoolExecutor(max_workers=workers) as pool:
+                        measured = [m for chunk in pool.map(_measure_batch, chunks) for m in chunk]
+                for rel, result in zip(rels, measured):
+                    if result is not None:
+                        photos[rel] = ManifestPhoto(place_of(rel), *todo[rel], *result)
+
+            if dirs != self.dirs or photos != self.photos:
+                self._dirty = True
+            self.dirs, self.photos = dirs, photos
+            return len(todo)
+
+    def dir_mtimes(self) -> Dict[str, int]:
+        """Absoluut pad -> mtime_ns van alle mappen, voor een snelle controle of er iets veranderd is."""
+        with self._lock:
+            return {os.path.join(self.root, d) if d else self.root: mtime if d else self._root_mtime
+                    for d, (mtime, _) in self.dirs.items()}
+
+    def subdirs(self, rel_dir: str) -> Tuple[str, ...]:
+        known = self.dirs.get(rel_dir)
+        return known[1] if known else ()
+
+
+def load_manifest(root: str, full: bool = False, workers: Optional[int] = None) -> PoolManifest:
+    """Lees het manifest van ``root``, werk het bij en schrijf het terug als er iets veranderd is."""
+    manifest = PoolManifest(root)
+    manifest.refresh(full=full, workers=workers)
+    manifest.save()
+    return manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Beheer het fotomanifest (pool_manifest.json).")
+    sub = parser.add_subparsers(dest='command', required=True)
+    scan = sub.add_parser('scan', help="Werk het manifest bij (stat elk bestand)")
+    scan.add_argument('--base', type=str, default=None, help="Basismap (standaard: map van dit script)")
+    scan.add_argument('--quick', action='store_true', help="Lees alleen mappen waarvan de mtime veranderd is")
+    scan.add_argument('--workers', type=int, default=None, help="Aantal processen (standaard: aantal CPU's)")
+    args = parser.parse_args(argv)
+
+    base_dir = args.base if args.base else os.path.dirname(os.path.abspath(__file__))
+    manifest = PoolManifest(base_dir)
+    before = len(manifest.photos)
+    measured = manifest.refresh(full=not args.quick, workers=args.workers)
+    written = manifest.save()
+    places = {p.place for p in manifest.photos.values()}
+    print(f"{len(manifest.photos)} foto's in {len(places)} map(pen) (was {before}), {measured} opnieuw gemeten.")
+    print(f"Manifest {'geschreven naar' if written else 'ongewijzigd:'} {manifest.path}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
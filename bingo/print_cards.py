@@ -0,0 +1,242 @@
+"""Printbare bingokaarten (1 kaart per A4-pagina) als HTML of PDF.
+
+De HTML wordt stuk voor stuk naar een tekststroom geschreven in plaats van
+met ``+=`` opgebouwd. In de gedeelde modus staat elke foto één keer in het
+bestand (als CSS-klasse) en verwijzen alle kaarten daarnaar.
+
+De PDF wordt per pagina met Pillow getekend in een procespool; elke pagina
+gaat als JPEG de PDF in zodra hij klaar is, zodat het geheugengebruik
+begrensd blijft.
+"""
+import io
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import BinaryIO, Callable, Dict, Iterable, List, Optional, TextIO, Tuple
+
+from PIL import Image, ImageDraw, ImageFont, ImageOps
+
+PRINT_HEAD = """<html>
+<head>
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <style>
+        @page { size: A4; margin: 12mm; }
+        body { font-family: 'Segoe UI', Arial, sans-serif; margin: 0; }
+        .card { padding: 6mm 0; page-break-before: always; page-break-after: always; break-before: page; break-after: page; break-inside: avoid; display: flex; flex-direction: column; align-items: center; }
+        .title { margin: 6px 0 10px; font-weight: 600; color: #333; }
+        .grid { display: grid; grid-template-columns: repeat(3, 1fr); gap: 8px; width: 175mm; max-width: 100%; }
+        .cell { aspect-ratio: 1/1; border: 2px solid #000; border-radius: 6px; overflow: hidden; }
+        .cell img { width: 100%; height: 100%; object-fit: cover; }
+        .cell.ph { background-size: cover; background-position: center; background-repeat: no-repeat; -webkit-print-color-adjust: exact; print-color-adjust: exact; }
+    </style>
+</head>
+<body>
+"""
+
+PRINT_TAIL = "</body></html>"
+
+# (titel, relatieve fotopaden) per kaart
+Card = Tuple[str, List[str]]
+
+
+def write_print_html(out: TextIO, cards: Iterable[Card], encode: Callable[[str], Optional[str]], shared: bool = True) -> int:
+    """Schrijf alle kaarten naar ``out``; geeft het aantal unieke ingesloten foto's terug.
+
+    ``encode`` levert de base64-payload (JPEG) van een foto of None als die
+    niet te lezen is. In de gedeelde modus wordt elke foto één keer als
+    ``<style>``-regel uitgeschreven, vlak voor de eerste kaart die hem
+    gebruikt, zodat de uitvoer in één doorgang gestreamd kan worden.
+    """
+    classes: Dict[str, Optional[str]] = {}
+    out.write(PRINT_HEAD)
+    for title, photos in cards:
+        cells: List[str] = []
+        for rel in photos:
+            if shared:
+                if rel not in classes:
+                    b64 = encode(rel)
+                    cls = f"p{len(classes)}" if b64 else None
+                    classes[rel] = cls
+                    if cls:
+                        out.write(f"<style>.{cls}{{background-image:url(data:image/jpeg;base64,{b64})}}</style>\n")
+                cls = classes[rel]
+                if cls:
+                    cells.append(f"<div class='cell ph {cls}'></div>")
+            else:
+                b64 = encode(rel)
+                if b64:
+                    cells.append(f"<div class='cell'><img src='data:image/jpeg;base64,{b64}'></div>")
+        out.write(f"<div class='card'><div class='title'>{title}</div><div class='grid'>")
+        out.write("".join(cells))
+        out.write("</div></div>\n")
+    out.write(PRINT_TAIL)
+    return sum(1 for cls in classes.values() if cls)
+
+
+def build_print_html(cards: Iterable[Card], encode: Callable[[str], Optional[str]], shared: bool = True) -> str:
+    buf = io.StringIO()
+    write_print_html(buf, cards, encode, shared=shared)
+    return buf.getvalue()
+
+
+# A4 en de maten uit de print-CSS hierboven (in mm)
+A4_MM = (210.0, 297.0)
+PAGE_MARGIN_MM = 12.0
+CARD_PADDING_MM = 6.0
+GRID_WIDTH_MM = 175.0
+GRID_GAP_MM = 8 * 25.4 / 96      # 8px
+CELL_BORDER_MM = 2 * 25.4 / 96   # 2px
+CELL_RADIUS_MM = 6 * 25.4 / 96   # 6px
+TITLE_SIZE_MM = 16 * 25.4 / 96   # standaard 16px-lettertype
+PDF_DPI = 150
+PAGE_JPEG_QUALITY = 88
+TITLE_FONTS = ('DejaVuSans-Bold.ttf', 'Arial Bold.ttf', 'arialbd.ttf', 'Helvetica.ttc')
+
+
+def _load_title_font(size_px: int):
+    for name in TITLE_FONTS:
+        try:
+            return ImageFont.truetype(name, size_px)
+        except OSError:
+            continue
+    try:
+        return ImageFont.load_default(size=size_px)
+    except TypeError:
+        return ImageFont.load_default()
+
+
+@lru_cache(maxsize=64)
+def _fitted_photo(path: str, mtime_ns: int, cell: int) -> Image.Image:
+    # Een dagpool is klein: elke worker schaalt elke foto maar één keer
+    with Image.open(path) as im:
+        return ImageOps.fit(ImageOps.exif_transpose(im).convert('RGB'), (cell, cell), Image.LANCZOS)
+
+
+@lru_cache(maxsize=4)
+def _title_font(size_px: int):
+    return _load_title_font(size_px)
+
+
+def render_page(title: str, image_paths: List[str], dpi: int = PDF_DPI) -> Tuple[int, int, bytes]:
+    """Teken één kaart (titel + 3x3 raster) op een A4-pagina; geeft (breedte, hoogte, JPEG) terug."""
+    px = dpi / 25.4
+    page_w, page_h = round(A4_MM[0] * px), round(A4_MM[1] * px)
+    page = Image.new('RGB', (page_w, page_h), 'white')
+    draw = ImageDraw.Draw(page)
+
+    margin = PAGE_MARGIN_MM * px
+    y = margin + CARD_PADDING_MM * px
+    font = _title_font(round(TITLE_SIZE_MM * px))
+    title_top = y + 6 * px * 25.4 / 96
+    draw.text((page_w / 2, title_top), title, fill='#333333', font=font, anchor='mt')
+    y = title_top + TITLE_SIZE_MM * px * 1.2 + 10 * px * 25.4 / 96
+
+    grid_w = min(GRID_WIDTH_MM, A4_MM[0] - 2 * PAGE_MARGIN_MM) * px
+    gap = GRID_GAP_MM * px
+    cell = int((grid_w - 2 * gap) / 3)
+    border = max(1, round(CELL_BORDER_MM * px))
+    radius = round(CELL_RADIUS_MM * px)
+    x0 = (page_w - (3 * cell + 2 * gap)) / 2
+
+    mask = Image.new('L', (cell, cell), 0)
+    ImageDraw.Draw(mask).rounded_rectangle((0, 0, cell - 1, cell - 1), radius=radius, fill=255)
+    for idx, path in enumerate(image_paths[:9]):
+        row, col = divmod(idx, 3)
+        left = round(x0 + col * (cell + gap))
+        top = round(y + row * (cell + gap))
+        try:
+            page.paste(_fitted_photo(path, os.stat(path).st_mtime_ns, cell), (left, top), mask)
+        except Exception:
+            pass
+        draw.rounded_rectangle((left, top, left + cell - 1, top + cell - 1), radius=radius, outline='black', width=border)
+
+    buf = io.BytesIO()
+    page.save(buf, format='JPEG', quality=PAGE_JPEG_QUALITY, dpi=(dpi, dpi))
+    return page_w, page_h, buf.getvalue()
+
+
+def _render_page_job(job: Tuple[str, List[str], int]) -> Tuple[int, int, bytes]:
+    return render_page(*job)
+
+
+class _PdfPageWriter:
+    """Minimale PDF-schrijver: elke pagina is één JPEG-afbeelding over het hele A4-vlak."""
+
+    def __init__(self, out: BinaryIO):
+        self.out = out
+        self.offsets: Dict[int, int] = {}
+        self.page_ids: List[int] = []
+        self.pos = 0
+        # 1 = catalogus, 2 = paginaboom; die worden aan het eind geschreven
+        self.next_id = 3
+        self._write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def _write(self, data: bytes) -> None:
+        self.out.write(data)
+        self.pos += len(data)
+
+    def _obj(self, obj_id: int, body: bytes, stream: Optional[bytes] = None) -> None:
+        self.offsets[obj_id] = self.pos
+        self._write(f"{obj_id} 0 obj\n".encode() + body)
+        if stream is not None:
+            self._write(b"\nstream\n")
+            self._write(stream)
+            self._write(b"\nendstream")
+        self._write(b"\nendobj\n")
+
+    def add_jpeg_page(self, width: int, height: int, jpeg: bytes) -> None:
+        img_id, content_id, page_id = self.next_id, self.next_id + 1, self.next_id + 2
+        self.next_id += 3
+        pw, ph = A4_MM[0] * 72 / 25.4, A4_MM[1] * 72 / 25.4
+        self._obj(img_id, (
+            f"<< /Type /XObject /Subtype /Image /Width {width} /Height {height} "
+            f"/ColorSpace /DeviceRGB /BitsPerComponent 8 /Filter /DCTDecode /Length {len(jpeg)} >>"
+        ).encode(), jpeg)
+        content = f"q {pw:.2f} 0 0 {ph:.2f} 0 0 cm /Im0 Do Q".encode()
+        self._obj(content_id, f"<< /Length {len(content)} >>".encode(), content)
+        self._obj(page_id, (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {pw:.2f} {ph:.2f}] "
+            f"/Resources << /XObject << /Im0 {img_id} 0 R >> >> /Contents {content_id} 0 R >>"
+        ).encode())
+        self.page_ids.append(page_id)
+
+    def close(self) -> None:
+        kids = " ".join(f"{pid} 0 R" for pid in self.page_ids)
+        self._obj(2, f"<< /Type /Pages /Kids [{kids}] /Count {len(self.page_ids)} >>".encode())
+        self._obj(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+        xref_pos = self.pos
+        size = self.next_id
+        lines = [f"xref\n0 {size}\n", "0000000000 65535 f \n"]
+        for obj_id in range(1, size):
+            lines.append(f"{self.offsets[obj_id]:010d} 00000 n \n")
+        self._write("".join(lines).encode())
+        self._write(f"trailer\n<< /Size {size} /Root 1 0 R >>\nstartxref\n{xref_pos}\n%%EOF\n".encode())
+
+
+def write_print_pdf(out: BinaryIO, cards: Iterable[Card], workers: Optional[int] = None, dpi: int = PDF_DPI) -> int:
+    """Render alle kaarten als meerpagina-PDF naar ``out``; geeft het aantal pagina's terug.
+
+    ``cards`` bevat (titel, absolute fotopaden). Pagina's worden parallel
+    getekend en in volgorde weggeschreven; er staan nooit meer dan een paar
+    pagina's per worker tegelijk in het geheugen. Met ``workers=1`` wordt er
+    geen procespool gestart.
+    """
+    writer = _PdfPageWriter(out)
+    jobs = ((title, list(paths), dpi) for title, paths in cards)
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1:
+        for job in jobs:
+            writer.add_jpeg_page(*_render_page_job(job))
+    else:
+        max_inflight = workers * 2
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending: deque = deque()
+            for job in jobs:
+                pending.append(pool.submit(_render_page_job, job))
+                if len(pending) >= max_inflight:
+                    writer.add_jpeg_page(*pending.popleft().result())
+            while pending:
+                writer.add_jpeg_page(*pending.popleft().result())
+    writer.close()
+    return len(writer.page_ids)
@@ -0,0 +1,229 @@
+"""Snelle simulatie van het verhaal (verhaal.html) over veel kaarten.
+
+Elke kaart is een 9-bits masker: bit ``i`` staat aan als vakje ``i`` is
+afgestreept. Per stap wordt het masker bijgewerkt met de vakjes waarvan de
+foto in die stap genoemd wordt. Het aantal horizontale, verticale en
+diagonale lijnen komt uit een vooraf berekende tabel van 512 regels, zodat
+alles met NumPy over alle kaarten tegelijk kan.
+
+De uitkomst (resultaten per stap en de eerste keer dat een kaart 1 rij,
+2 rijen of een volle kaart heeft) is gelijk aan de oorspronkelijke lus in
+bingo.py.
+"""
+import os
+import random
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from dealing import build_day_pool, deal_cards
+
+ROWS = ((0, 1, 2), (3, 4, 5), (6, 7, 8))
+COLS = ((0, 3, 6), (1, 4, 7), (2, 5, 8))
+DIAGS = ((0, 4, 8), (2, 4, 6))
+FULL_MASK = 0b111111111
+CELL_WEIGHTS = (1 << np.arange(9)).astype(np.int32)
+
+
+def _line_bits(line: Tuple[int, int, int]) -> int:
+    return sum(1 << i for i in line)
+
+
+def _build_line_table() -> np.ndarray:
+    # LINE_TABLE[mask] = (horizontaal, verticaal, diagonaal)
+    table = np.zeros((512, 3), dtype=np.int8)
+    for mask in range(512):
+        for col, group in enumerate((ROWS, COLS, DIAGS)):
+            table[mask, col] = sum(1 for line in group if mask & _line_bits(line) == _line_bits(line))
+    return table
+
+
+LINE_TABLE = _build_line_table()
+LINE_TOTALS = LINE_TABLE.sum(axis=1).astype(np.int8)
+
+# Volgorde waarin gebeurtenissen per kaart binnen een stap worden vastgelegd
+EVENT_TYPES = ("1 rij", "2 rijen", "Volle kaart")
+
+
+class SimulationResult(NamedTuple):
+    results: List[dict]
+    events: List[dict]
+    first_bingo_step: Optional[int]
+    first_bingo_count: int
+
+
+def encode_cards(cards: Sequence[Sequence[str]], photo_ids: Dict[str, int]) -> np.ndarray:
+    """Zet kaarten om naar een (n, 9) array met foto-id's; -1 voor een leeg vakje."""
+    for photo in sorted(set().union(*cards)):
+        photo_ids.setdefault(photo, len(photo_ids))
+    if all(len(card) == 9 for card in cards):
+        flat = np.fromiter(map(photo_ids.__getitem__, chain.from_iterable(cards)), dtype=np.int32, count=9 * len(cards))
+        return flat.reshape(len(cards), 9)
+    ids = np.full((len(cards), 9), -1, dtype=np.int32)
+    for row, card in enumerate(cards):
+        for pos, photo in enumerate(card[:9]):
+            ids[row, pos] = photo_ids[photo]
+    return ids
+
+
+def call_steps(card_ids: np.ndarray, folder_steps: Sequence[Tuple[str, Sequence[str]]], photo_ids: Dict[str, int]) -> np.ndarray:
+    """Stap (1-based) waarop elk vakje wordt afgestreept; 0 als dat nooit gebeurt.
+
+    Dit is de incidentie foto -> kaarten: één opzoeking per vakje in plaats
+    van ``itm in card`` voor elke kaart en elke stap.
+    """
+    photo_step = np.zeros(len(photo_ids) + 1, dtype=np.int32)
+    for step_idx, (_, items) in enumerate(folder_steps, start=1):
+        for itm in items:
+            pid = photo_ids.get(itm)
+            if pid is not None and photo_step[pid] == 0:
+                photo_step[pid] = step_idx
+    # Index -1 wijst naar de extra laatste plek, die altijd 0 blijft
+    return photo_step[card_ids]
+
+
+def simulate_story(cards: Sequence[Sequence[str]], folder_steps: Sequence[Tuple[str, Sequence[str]]], collect_events: bool = True) -> SimulationResult:
+    """Simuleer het verhaal stap voor stap over alle kaarten.
+
+    Met ``collect_events=False`` worden alleen de resultaten per stap
+    berekend; dat scheelt veel werk bij herhaalde simulaties.
+    """
+    photo_ids: Dict[str, int] = {}
+    card_ids = encode_cards(cards, photo_ids)
+    cell_steps = call_steps(card_ids, folder_steps, photo_ids)
+    full_masks = (card_ids >= 0).astype(np.int32) @ CELL_WEIGHTS
+
+    n = len(cards)
+    masks = np.zeros(n, dtype=np.int32)
+    # has[kaart, soort]: gebeurtenis al eerder vastgelegd
+    has = np.zeros((n, len(EVENT_TYPES)), dtype=bool)
+
+    results: List[dict] = []
+    events: List[dict] = []
+    first_bingo_step: Optional[int] = None
+    first_bingo_count = 0
+
+    for step_idx, (step_label, _) in enumerate(folder_steps, start=1):
+        masks |= (cell_steps == step_idx).astype(np.int32) @ CELL_WEIGHTS
+        hvd = LINE_TABLE[masks]
+        totals = LINE_TOTALS[masks]
+        full = masks == full_masks
+        reached = (totals >= 1, totals >= 2, full)
+
+        if collect_events:
+            fresh = np.stack(reached, axis=1) & ~has
+            has |= fresh
+            # np.nonzero loopt per kaart en dan per soort: dezelfde volgorde als de oorspronkelijke lus
+            new_cards, new_kinds = np.nonzero(fresh)
+        else:
+            new_cards = new_kinds = np.zeros(0, dtype=np.intp)
+        for card, kind, (h, v, d) in zip(new_cards.tolist(), new_kinds.tolist(), hvd[new_cards].tolist()):
+            events.append({
+                "step": step_idx,
+                "step_label": step_label,
+                "card": card + 1,
+                "type": EVENT_TYPES[kind],
+                "h": h, "v": v, "d": d, "total": h + v + d,
+                "full": kind == 2,
+            })
+
+        one_line = int(reached[0].sum())
+        results.append({
+            "step": step_idx,
+            "step_label": step_label,
+            "horiz": int((hvd[:, 0] >= 1).sum()),
+            "vert": int((hvd[:, 1] >= 1).sum()),
+            "diag": int((hvd[:, 2] >= 1).sum()),
+            "one_line": one_line,
+            "two_lines": int(reached[1].sum()),
+            "full": int(full.sum()),
+        })
+
+        if first_bingo_step is None and one_line > 0:
+            first_bingo_step = step_idx
+            first_bingo_count = one_line
+
+    return SimulationResult(results, events, first_bingo_step, first_bingo_count)
+
+
+# -----------------------------
+# Monte Carlo: veel onafhankelijke spellen
+# -----------------------------
+# (soort, sleutel in de resultaten per stap)
+MILESTONES = (("1 rij", "one_line"), ("2 rijen", "two_lines"), ("Volle kaart", "full"))
+
+
+class TrialOutcome(NamedTuple):
+    # Per mijlpaal: (stap, aantal winnaars op die stap) of None als hij niet valt
+    milestones: Tuple[Optional[Tuple[int, int]], ...]
+
+
+class MonteCarloSummary(NamedTuple):
+    trials: int
+    # soort -> Counter(stap -> aantal runs waarin de mijlpaal daar als eerste valt)
+    first_step: Dict[str, Counter]
+    # soort -> Counter(aantal winnaars -> aantal runs)
+    winners: Dict[str, Counter]
+    # soort -> Counter((stap, aantal winnaars) -> aantal runs)
+    step_winners: Dict[str, Counter]
+    # soort -> aantal runs waarin de mijlpaal nooit valt
+    never: Dict[str, int]
+
+
+def trial_seed(seed: int, trial: int) -> str:
+    # Tekst-seeds zijn in elk proces gelijk (niet afhankelijk van PYTHONHASHSEED)
+    return f"{seed}:{trial}"
+
+
+def run_trial(priority: Sequence[str], other: Sequence[str], folder_steps, day_pool_size: int, num_players: int, seed: str) -> TrialOutcome:
+    """Eén spel: zelfde dagpool- en kaartlogica als de gewone simulatie."""
+    rng = random.Random(seed)
+    day_pool = build_day_pool(priority, other, day_pool_size, rng)
+    cards = deal_cards(day_pool, num_players, rng)
+    sim = simulate_story(cards, folder_steps, collect_events=False)
+    milestones = []
+    for _, key in MILESTONES:
+        hit = next((r for r in sim.results if r[key] > 0), None)
+        milestones.append((hit["step"], hit[key]) if hit else None)
+    return TrialOutcome(tuple(milestones))
+
+
+def _run_trial_batch(job) -> List[TrialOutcome]:
+    priority, other, folder_steps, day_pool_size, num_players, seed, trials = job
+    return [run_trial(priority, other, folder_steps, day_pool_size, num_players, trial_seed(seed, t)) for t in trials]
+
+
+def monte_carlo(priority: Sequence[str], other: Sequence[str], folder_steps, day_pool_size: int, num_players: int,
+                trials: int, seed: int = 0, workers: Optional[int] = None) -> MonteCarloSummary:
+    """Draai ``trials`` onafhankelijke spellen, verdeeld over een procespool.
+
+    Elke run ``t`` gebruikt seed ``"{seed}:{t}"``, dus de uitkomst hangt niet
+    af van het aantal workers.
+    """
+    workers = min(workers or os.cpu_count() or 1, max(1, trials))
+    # Een paar batches per worker: weinig pickle-overhead, toch goede verdeling
+    n_batches = max(1, min(trials, workers * 4))
+    batches = [range(i, trials, n_batches) for i in range(n_batches)]
+    jobs = [(list(priority), list(other), list(folder_steps), day_pool_size, num_players, seed, b) for b in batches]
+    if workers <= 1:
+        outcomes = [o for job in jobs for o in _run_trial_batch(job)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            outcomes = [o for batch in pool.map(_run_trial_batch, jobs) for o in batch]
+
+    first_step = {kind: Counter() for kind, _ in MILESTONES}
+    winners = {kind: Counter() for kind, _ in MILESTONES}
+    step_winners = {kind: Counter() for kind, _ in MILESTONES}
+    never = {kind: 0 for kind, _ in MILESTONES}
+    for outcome in outcomes:
+        for (kind, _), hit in zip(MILESTONES, outcome.milestones):
+            if hit is None:
+                never[kind] += 1
+                continue
+            first_step[kind][hit[0]] += 1
+            winners[kind][hit[1]] += 1
+            step_winners[kind][hit] += 1
+    return MonteCarloSummary(trials, first_step, winners, step_winners, never)
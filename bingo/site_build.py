@@ -0,0 +1,560 @@
+"""Statische site voor de pool: index.html per plaats en pool_galerij.html.
+
+``scan_site`` maakt een model van plaatsen, afbeeldingen en beschrijvingen
+uit het fotomanifest (``pool_manifest.json``, zie pool_manifest.py), dat
+alleen gewijzigde mappen opnieuw leest; de app geeft het manifest van de
+fotocatalogus door aan ``model_from_manifest``. ``build_site`` rendert daaruit
+de pagina's in een procespool en schrijft alleen wat verouderd is (zie het
+manifest). Bestanden worden geschreven met ``derivatives.atomic_write``.
+Tegels gebruiken verkleinde kopieën (1x en 2x) in een ``thumbs``-map naast
+de pagina (``thumbs/<naam.ext>_<breedte>.jpg``) en linken naar het origineel.
+generate_indexes.py, generate_gallery_html.py (ook met ``--watch``, zie
+site_watch.py) en de knop in bingo.py gebruiken allemaal deze module.
+"""
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from derivatives import atomic_write, cover_size, render_cover, source_size
+from pool_manifest import THUMB_DIRNAME, PoolManifest
+from timing import span, timed
+
+IMAGE_EXTS = ('.png', '.jpg', '.jpeg', '.webp')
+# Vak dat een tegel (180 px hoog, ~220-360 px breed) bedekt, voor 1x en 2x schermen
+THUMB_BOXES = ((360, 180), (720, 360))
+THUMB_QUALITY = 80
+# sizes-attribuut: tegels zijn op een telefoon schermbreed, anders ongeveer een kolom
+PAGE_SIZES = "(max-width: 520px) calc(100vw - 32px), 300px"
+GALLERY_SIZES = "(max-width: 600px) calc(100vw - 32px), 360px"
+POOL_DIRNAME = 'pool'
+GALLERY_NAME = 'pool_galerij.html'
+GALLERY_TITLE = 'Overzicht dorpen en steden'
+GALLERY_SUBTITLE = 'Klik op een kaart om de indexpagina van het dorp of de stad te openen.'
+
+# Verhoog dit als HTML_HEAD_TEMPLATE/HTML_TAIL/build_html verandert: dan zijn alle pagina's verouderd
+TEMPLATE_VERSION = 2
+# Per plaats de invoer van de laatst geschreven index.html (zie page_inputs)
+MANIFEST_NAME = '.index_manifest.json'
+# Staat in de voettekst van elke gegenereerde pagina (ook van oudere versies en de app)
+GENERATED_MARKER = 'Automatisch gegenereerd door'
+
+HTML_HEAD_TEMPLATE = """<!DOCTYPE html>
+<html lang=\"nl\">
+<head>
+  <meta charset=\"utf-8\">
+  <meta name=\"viewport\" content=\"width=device-width, initial-scale=1\">
+  <title>{title}</title>
+  <style>
+    :root {{ --bg:#fafafa; --fg:#1a1a1a; --muted:#666; --accent:#1e88e5; --card-bg:#fff; --card-border:#eee; --maxw:900px; }}
+    html,body{{margin:0;padding:0;background:var(--bg);color:var(--fg);font-family:-apple-system,BlinkMacSystemFont,\"Segoe UI\",Roboto,\"Helvetica Neue\",Arial,system-ui,sans-serif;line-height:1.6}}
+    .container{{max-width:var(--maxw);margin:0 auto;padding:24px 16px 64px}}
+    header{{margin:0 0 24px;padding:24px 0 8px;border-bottom:1px solid var(--card-border)}}
+    header h1{{margin:0 0 6px;font-size:28px;font-weight:700}}
+    header p{{margin:0;color:var(--muted);font-size:14px}}
+    .grid{{display:grid;grid-template-columns:repeat(auto-fill,minmax(220px,1fr));gap:12px}}
+    .tile{{border:1px solid var(--card-border);border-radius:10px;overflow:hidden;background:var(--card-bg);box-shadow:0 2px 10px rgba(0,0,0,.04)}}
+    .tile img{{display:block;width:100%;height:180px;object-fit:cover}}
+    .tile .cap{{padding:8px 10px;font-size:12px;color:var(--muted)}}
+    a{{color:var(--accent);text-decoration:none}}
+    footer{{margin-top:32px;color:var(--muted);font-size:12px}}
+    @media print{{ .tile{{box-shadow:none}} }}
+  </style>
+</head>
+<body>
+  <div class=\"container\">
+    <header>
+      <h1>{title}</h1>
+      <p>{beschrijving}</p>
+    </header>
+    <main>
+"""
+
+HTML_TAIL = """
+    </main>
+    <footer>
+      <p>Automatisch gegenereerd door generate_indexes.py.</p>
+    </footer>
+  </div>
+</body>
+</html>
+"""
+
+def load_descriptions(base_dir: str) -> dict:
+    path = os.path.join(base_dir, 'beschrijvingen.json')
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+            if isinstance(data, dict):
+                return data
+    except Exception:
+        pass
+    return {}
+
+def sync_descriptions(base_dir: str, pool_dir: str, remove_orphans: bool = False) -> tuple[int, int]:
+    """Synchronize beschrijvingen.json with folders under pool_dir.
+    Returns (added, removed)."""
+    path = os.path.join(base_dir, 'beschrijvingen.json')
+    # Load existing data
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+            if not isinstance(data, dict):
+                data = {}
+    except Exception:
+        data = {}
+
+    # Ensure default template
+    default_tpl = data.get('_default')
+    if not isinstance(default_tpl, str):
+        default_tpl = "Welkom! Dit is een korte pagina over {plaats}. Hieronder vind je een selectie afbeeldingen uit deze map."
+        data['_default'] = default_tpl
+
+    # Collect first-level folders
+    places_on_disk = [name for name in sorted(os.listdir(pool_dir)) if os.path.isdir(os.path.join(pool_dir, name))]
+
+    added = 0
+    removed = 0
+
+    # Add missing
+    for name in places_on_disk:
+        if name in data:
+            continue
+        plaatsnaam = name.replace('-', ' ').replace('_', ' ')
+        desc = default_tpl.replace('{plaats}', plaatsnaam.title())
+        data[name] = desc
+        added += 1
+
+    # Remove orphans
+    if remove_orphans:
+        keys = list(data.keys())
+        for key in keys:
+            if key == '_default':
+                continue
+            if key not in places_on_disk and key.title() not in places_on_disk and key.replace(' ', '-') not in places_on_disk:
+                del data[key]
+                removed += 1
+
+    # Write back
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+    return added, removed
+
+def build_html(place_name: str, images: List[str], with_gallery: bool, beschrijving: str | None = None,
+               thumbs: Optional[Dict[str, Optional["Thumb"]]] = None) -> str:
+    plaatsnaam = place_name.replace('-', ' ').replace('_', ' ')
+    if not beschrijving:
+        beschrijving = f"Welkom! Dit is een korte pagina over {plaatsnaam.title()}. Hieronder vind je een selectie afbeeldingen uit deze map."
+
+    title = f"{plaatsnaam.title()} — Fotoverslag"
+
+    head = HTML_HEAD_TEMPLATE.format(title=title, beschrijving=beschrijving)
+    body_parts: List[str] = []
+    if with_gallery and images:
+        body_parts.append("<section><div class=\"grid\">")
+        for rel in images:
+            cap = rel
+            thumb = (thumbs or {}).get(rel)
+            body_parts.append(
+                "<div class=\"tile\">"
+                + f"<a href=\"{rel}\" target=\"_blank\">"
+                + (thumb.img_tag(cap, PAGE_SIZES) if thumb else f"<img src=\"{rel}\" alt=\"{cap}\" loading=\"lazy\" decoding=\"async\">")
+                + "</a>"
+                + f"<div class=\"cap\">{cap}</div>"
+                + "</div>"
+            )
+        body_parts.append("</div></section>")
+    else:
+        body_parts.append("<p>Er zijn (nog) geen afbeeldingen of de galerij is uitgeschakeld.</p>")
+
+    return head + "\n".join(body_parts) + HTML_TAIL
+
+
+class Thumb(NamedTuple):
+    # Per variant (1x, 2x): pad relatief aan de plaatsmap en (breedte, hoogte)
+    srcs: Tuple[str, ...]
+    sizes: Tuple[Tuple[int, int], ...]
+
+    def img_tag(self, alt: str, sizes_attr: str, prefix: str = '') -> str:
+        w, h = self.sizes[0]
+        srcset = ", ".join(f"{prefix}{src} {sw}w" for src, (sw, _) in zip(self.srcs, self.sizes))
+        return (f'<img src="{prefix}{self.srcs[0]}" srcset="{srcset}" sizes="{sizes_attr}" '
+                f'width="{w}" height="{h}" loading="lazy" decoding="async" alt="{alt}">')
+
+
+def place_thumbs(place_dir: str, images: Iterable[str], write: bool = True,
+                 dims: Optional[Dict[str, Tuple[int, Tuple[int, int]]]] = None) -> Tuple[Dict[str, Optional[Thumb]], int]:
+    """Thumbnails (1x en 2x) voor ``images``; geeft (rel -> Thumb of None, aantal ontbrekende) terug.
+
+    Een thumbnail wordt alleen (opnieuw) gemaakt als hij ontbreekt of ouder
+    is dan het origineel. Is het origineel al klein genoeg, dan wijst de
+    variant naar het origineel zelf. Met ``write=False`` wordt niets
+    geschreven; de afmetingen komen uit de header van het origineel, of uit
+    ``dims`` (rel -> (mtime_ns, (breedte, hoogte)), uit het manifest) als de
+    mtime daar nog klopt.
+    """
+    thumbs: Dict[str, Optional[Thumb]] = {}
+    missing = 0
+    dims = dims or {}
+    for rel in images:
+        src = os.path.join(place_dir, rel)
+        try:
+            src_mtime = os.stat(src).st_mtime_ns
+            known = dims.get(rel)
+            size = known[1] if known is not None and known[0] == src_mtime else source_size(src)
+        except Exception:
+            thumbs[rel] = None
+            continue
+        srcs: List[str] = []
+        sizes: List[Tuple[int, int]] = []
+        for box in THUMB_BOXES:
+            target = cover_size(size, box)
+            url = rel
+            if target != size:
+                # Met de extensie van het origineel: x.jpg en x.png krijgen elk een eigen thumbnail
+                url = os.path.join(THUMB_DIRNAME, f"{rel}_{box[0]}.jpg")
+                out_path = os.path.join(place_dir, url)
+                try:
+                    fresh = os.stat(out_path).st_mtime_ns >= src_mtime
+                except OSError:
+                    fresh = False
+                if not fresh:
+                    missing += 1
+                    if write:
+                        try:
+                            atomic_write(out_path, render_cover(src, box, THUMB_QUALITY))
+                        except Exception:
+                            url = rel
+                            target = size
+            url = url.replace(os.sep, '/')
+            if url not in srcs:
+                srcs.append(url)
+                sizes.append(target)
+        thumbs[rel] = Thumb(tuple(srcs), tuple(sizes))
+    return thumbs, missing
+
+
+def place_description(descs: dict, name: str) -> str | None:
+    plaatsnaam = name.replace('-', ' ').replace('_', ' ')
+    custom = descs.get(name) or descs.get(plaatsnaam) or descs.get(name.title())
+    if not custom:
+        default_tpl = descs.get('_default')
+        if isinstance(default_tpl, str):
+            custom = default_tpl.replace('{plaats}', plaatsnaam.title())
+    return custom
+
+
+def page_inputs(images: List[str], beschrijving: str | None, with_gallery: bool,
+                thumbs: Optional[Dict[str, Optional["Thumb"]]] = None) -> dict:
+    """Alles waar de inhoud van een index.html van afhangt, plus de hash daarvan."""
+    inputs = {
+        'images': images,
+        # Paden en afmetingen van de thumbnails staan in de HTML (srcset, width/height)
+        'thumbs': [[list(thumbs[rel].srcs), list(thumbs[rel].sizes)] if thumbs and thumbs.get(rel) else None
+                   for rel in images],
+        'description': beschrijving or '',
+        'gallery': with_gallery,
+        'template': TEMPLATE_VERSION,
+    }
+    blob = json.dumps(inputs, ensure_ascii=False, sort_keys=True).encode('utf-8')
+    inputs['hash'] = hashlib.sha256(blob).hexdigest()
+    return inputs
+
+
+def load_manifest(pool_dir: str) -> dict:
+    try:
+        with open(os.path.join(pool_dir, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+            data = json.load(f)
+            if isinstance(data, dict) and isinstance(data.get('places'), dict):
+                return data
+    except Exception:
+        pass
+    return {'places': {}}
+
+
+GALLERY_HEAD = """<!DOCTYPE html>
+<html lang="nl">
+<head>
+  <meta charset="utf-8">
+  <meta name="viewport" content="width=device-width, initial-scale=1">
+  <title>{title}</title>
+  <style>
+    :root {{ --bg:#fafafa; --fg:#1a1a1a; --muted:#666; --accent:#1e88e5; --card-bg:#fff; --card-border:#eee; --maxw:1100px; }}
+    html,body{{margin:0;padding:0;background:var(--bg);color:var(--fg);font-family:-apple-system,BlinkMacSystemFont,\"Segoe UI\",Roboto,\"Helvetica Neue\",Arial,system-ui,sans-serif;line-height:1.6}}
+    .container{{max-width:var(--maxw);margin:0 auto;padding:24px 16px 64px}}
+    header{{margin:0 0 24px;padding:24px 0 8px;border-bottom:1px solid var(--card-border)}}
+    header h1{{margin:0 0 6px;font-size:28px;font-weight:700}}
+    header p{{margin:0;color:var(--muted);font-size:14px}}
+    .grid{{display:grid;grid-template-columns:repeat(auto-fill,minmax(260px,1fr));gap:14px}}
+    .card{{display:flex;flex-direction:column;border:1px solid var(--card-border);border-radius:12px;background:var(--card-bg);overflow:hidden;box-shadow:0 2px 12px rgba(0,0,0,.05)}}
+    .thumb img{{width:100%;height:180px;object-fit:cover;display:block;background:#ddd}}
+    .content{{padding:10px 12px}}
+    .content h3{{margin:0 0 6px;font-size:16px}}
+    .content p{{margin:0;color:var(--muted);font-size:13px}}
+    a.card-link{{text-decoration:none;color:inherit;display:block}}
+    .no-thumb{{height:180px;background:linear-gradient(135deg,#e3f2fd,#bbdefb);display:flex;align-items:center;justify-content:center;color:#1e88e5;font-weight:600;font-size:18px}}
+    footer{{margin-top:32px;color:var(--muted);font-size:12px}}
+  </style>
+</head>
+<body>
+  <div class="container">
+    <header>
+      <h1>{title}</h1>
+      <p>{subtitle}</p>
+    </header>
+    <main>
+      <div class="grid">
+"""
+
+GALLERY_TAIL = """
+      </div>
+    </main>
+    <footer>
+      <p>Automatisch gegenereerd door generate_gallery_html.py.</p>
+    </footer>
+  </div>
+</body>
+</html>
+"""
+
+
+class Place(NamedTuple):
+    name: str
+    path: str
+    # Paden relatief aan de plaatsmap, gesorteerd
+    images: Tuple[str, ...]
+    # Bekende afmetingen uit het manifest: rel -> (mtime_ns, (breedte, hoogte))
+    dims: Optional[Dict[str, Tuple[int, Tuple[int, int]]]] = None
+
+    def first_image(self) -> Optional[str]:
+        # Eerst een afbeelding direct in de plaatsmap, anders de eerste uit een submap
+        top = [rel for rel in self.images if os.sep not in rel]
+        return (top or list(self.images) or [None])[0]
+
+
+class SiteModel(NamedTuple):
+    base_dir: str
+    pool_dir: str
+    places: Tuple[Place, ...]
+    descs: dict
+
+
+class BuildReport(NamedTuple):
+    created: int
+    updated: int
+    unchanged: int
+    skipped: int
+    # (plaats of galerij, reden) voor alles wat verouderd is/was
+    stale: List[Tuple[str, str]]
+    gallery_path: Optional[str]
+
+
+def walk_images(place_dir: str) -> List[Tuple[str, os.DirEntry]]:
+    """(pad relatief aan de plaatsmap, DirEntry) van alle afbeeldingen, zonder thumbs- en verborgen mappen."""
+    found: List[Tuple[str, os.DirEntry]] = []
+    stack = [place_dir]
+    while stack:
+        current = stack.pop()
+        try:
+            entries = list(os.scandir(current))
+        except OSError:
+            continue
+        for entry in entries:
+            if entry.is_dir():
+                if not entry.name.startswith('.') and entry.name != THUMB_DIRNAME:
+                    stack.append(entry.path)
+            elif entry.name.lower().endswith(IMAGE_EXTS):
+                found.append((os.path.relpath(entry.path, place_dir), entry))
+    return found
+
+
+@timed()
+def scan_site(base_dir: str, workers: Optional[int] = None) -> SiteModel:
+    """Werk het fotomanifest bij (alleen gewijzigde mappen) en maak daaruit het model."""
+    manifest = PoolManifest(base_dir)
+    manifest.refresh(workers=workers)
+    manifest.save()
+    return model_from_manifest(base_dir, manifest)
+
+
+def model_from_manifest(base_dir: str, manifest: PoolManifest) -> SiteModel:
+    """Model uit een bijgewerkt manifest: plaatsen zijn de mappen direct onder ``pool``."""
+    pool_dir = os.path.join(base_dir, POOL_DIRNAME)
+    by_place: Dict[str, List[str]] = {name: [] for name in manifest.subdirs(POOL_DIRNAME)}
+    dims: Dict[str, Dict[str, Tuple[int, Tuple[int, int]]]] = {name: {} for name in by_place}
+    for rel, photo in manifest.photos.items():
+        parts = rel.split(os.sep)
+        if len(parts) >= 3 and parts[0] == POOL_DIRNAME and parts[1] in by_place:
+            image = os.path.join(*parts[2:])
+            by_place[parts[1]].append(image)
+            if photo.width:
+                dims[parts[1]][image] = (photo.mtime_ns, (photo.width, photo.height))
+    places = tuple(Place(name, os.path.join(pool_dir, name), tuple(sorted(by_place[name])), dims[name])
+                   for name in sorted(by_place))
+    return SiteModel(base_dir, pool_dir, tuple(places), load_descriptions(base_dir))
+
+
+def gallery_description(descs: dict, name: str) -> str:
+    """Beschrijving op de galerijkaart van een plaats (zelfde bronnen als ``place_description``)."""
+    plaatsnaam = name.replace('-', ' ').replace('_', ' ').title()
+    custom = descs.get(name) or descs.get(plaatsnaam) or descs.get(name.title())
+    if not custom:
+        default_tpl = descs.get('_default')
+        if isinstance(default_tpl, str):
+            custom = default_tpl.replace('{plaats}', plaatsnaam)
+    return custom if isinstance(custom, str) else ''
+
+
+def gallery_card_html(place: Place, base_dir: str, with_thumb: bool, descs: dict, write_thumbs: bool = True) -> str:
+    plaatsnaam = place.name.replace('-', ' ').replace('_', ' ').title()
+    rel_index = os.path.relpath(os.path.join(place.path, 'index.html'), base_dir)
+
+    desc = gallery_description(descs, place.name)
+
+    # Thumbnail
+    first_img = place.first_image() if with_thumb else None
+    if first_img:
+        # from gallery page location, link through the place folder
+        prefix = os.path.relpath(place.path, base_dir) + '/'
+        thumb = place_thumbs(place.path, [first_img], write=write_thumbs, dims=place.dims)[0][first_img]
+        if thumb:
+            img_tag = thumb.img_tag(plaatsnaam, GALLERY_SIZES, prefix)
+        else:
+            img_tag = f'<img src="{prefix}{first_img}" alt="{plaatsnaam}" loading="lazy" decoding="async">'
+        thumb_html = f'<div class="thumb">{img_tag}</div>'
+    else:
+        thumb_html = f'<div class="no-thumb">{plaatsnaam}</div>'
+
+    return (
+        f'<a class="card-link" href="{rel_index}" target="_blank">'
+        f'  <div class="card">'
+        f'    {thumb_html}'
+        f'    <div class="content">'
+        f'      <h3>{plaatsnaam}</h3>'
+        f'      <p>{desc}</p>'
+        f'    </div>'
+        f'  </div>'
+        f'</a>'
+    )
+
+
+def build_gallery_html(model: SiteModel, with_thumbs: bool = True, write_thumbs: bool = True) -> str:
+    html = [GALLERY_HEAD.format(title=GALLERY_TITLE, subtitle=GALLERY_SUBTITLE)]
+    for place in model.places:
+        html.append(gallery_card_html(place, model.base_dir, with_thumbs, model.descs, write_thumbs))
+    html.append(GALLERY_TAIL)
+    return "\n".join(html)
+
+
+def _build_place(job) -> Tuple[str, str, Optional[dict], Optional[str]]:
+    """Eén plaats: (naam, status, invoer voor het manifest, reden als verouderd).
+
+    Status is 'created', 'updated', 'unchanged', 'skipped' (handgemaakte
+    pagina) of 'stale' (alleen bij ``check``).
+    """
+    place, descs, with_gallery, entry, overwrite, check = job
+    index_path = os.path.join(place.path, 'index.html')
+    custom = place_description(descs, place.name)
+    images = list(place.images)
+    # Thumbnails ook bij een ongewijzigde pagina bijwerken (bijv. na het verwijderen van de thumbs-map)
+    thumbs, missing_thumbs = place_thumbs(place.path, images, write=not check, dims=place.dims) if with_gallery else (None, 0)
+    inputs = page_inputs(images, custom, with_gallery, thumbs)
+    html_out = None
+
+    existed = os.path.exists(index_path)
+    if not overwrite:
+        if existed and entry is None:
+            # Bestaande pagina zonder manifest: overnemen als hij gelijk is aan wat wij zouden schrijven,
+            # bijwerken als hij door een oudere versie gegenereerd is, en anders (handgemaakt) laten staan
+            html_out = build_html(place.name, images, with_gallery=with_gallery, beschrijving=custom, thumbs=thumbs)
+            with open(index_path, 'r', encoding='utf-8', errors='replace') as f:
+                current = f.read()
+            if current == html_out:
+                return place.name, 'unchanged', inputs, None
+            if GENERATED_MARKER not in current:
+                return place.name, 'skipped', None, None
+        if existed and entry is not None and entry.get('hash') == inputs['hash']:
+            if check and missing_thumbs:
+                return place.name, 'stale', None, f"{missing_thumbs} thumbnail(s) ontbreken"
+            return place.name, 'unchanged', inputs, None
+
+    reason = 'ontbreekt' if not existed else 'gewijzigd'
+    if check:
+        return place.name, 'stale', None, reason
+    if html_out is None:
+        html_out = build_html(place.name, images, with_gallery=with_gallery, beschrijving=custom, thumbs=thumbs)
+    atomic_write(index_path, html_out.encode('utf-8'))
+    return place.name, 'updated' if existed else 'created', inputs, reason
+
+
+def _build_place_batch(jobs) -> List[Tuple[str, str, Optional[dict], Optional[str]]]:
+    results = []
+    for job in jobs:
+        with span('build_place', place=job[0].name):
+            results.append(_build_place(job))
+    return results
+
+
+def build_site(model: SiteModel, pages: bool = True, gallery: bool = True, with_gallery: bool = True,
+               with_thumbs: bool = True, overwrite: bool = False, check: bool = False,
+               gallery_output: str = GALLERY_NAME, workers: Optional[int] = None,
+               only: Optional[Iterable[str]] = None) -> BuildReport:
+    """Render indexpagina's en/of de galerij uit ``model``; met ``check`` wordt niets geschreven.
+
+    De plaatsen worden in batches over een procespool verdeeld; met
+    ``workers=1`` (of weinig plaatsen) gebeurt alles in dit proces.
+    Met ``only`` worden alleen de pagina's van die plaatsen bekeken.
+    """
+    counts = {'created': 0, 'updated': 0, 'unchanged': 0, 'skipped': 0}
+    stale: List[Tuple[str, str]] = []
+
+    if pages:
+        with span('build_pages'):
+            manifest = load_manifest(model.pool_dir)
+            entries = manifest['places']
+            only = set(only) if only is not None else None
+            jobs = [(place, model.descs, with_gallery, entries.get(place.name), overwrite, check)
+                    for place in model.places if only is None or place.name in only]
+            workers = min(workers or os.cpu_count() or 1, max(1, len(jobs) // 50))
+            if workers <= 1:
+                results = _build_place_batch(jobs)
+            else:
+                n_batches = workers * 4
+                batches = [jobs[i::n_batches] for i in range(n_batches)]
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    results = [r for batch in pool.map(_build_place_batch, batches) for r in batch]
+            for name, status, inputs, reason in sorted(results):
+                if status == 'stale':
+                    stale.append((name, reason))
+                    continue
+                counts[status] += 1
+                if reason:
+                    stale.append((name, reason))
+                if inputs is not None:
+                    entries[name] = inputs
+            known = {place.name for place in model.places}
+            for name in list(entries):
+                if name not in known:
+                    del entries[name]
+            if not check:
+                atomic_write(os.path.join(model.pool_dir, MANIFEST_NAME),
+                             json.dumps(manifest, ensure_ascii=False, indent=2).encode('utf-8'))
+
+    gallery_path = None
+    if gallery:
+        gallery_path = os.path.join(model.base_dir, gallery_output)
+        with span('build_gallery', places=len(model.places)):
+            html = build_gallery_html(model, with_thumbs, write_thumbs=not check)
+        try:
+            with open(gallery_path, 'r', encoding='utf-8') as f:
+                current = f.read()
+        except OSError:
+            current = None
+        if current != html:
+            stale.append((gallery_output, 'ontbreekt' if current is None else 'gewijzigd'))
+            if not check:
+                atomic_write(gallery_path, html.encode('utf-8'))
+
+    return BuildReport(counts['created'], counts['updated'], counts['unchanged'], counts['skipped'], stale, gallery_path)
@@ -0,0 +1,158 @@
+"""Watch-modus voor generate_indexes.py en generate_gallery_html.py.
+
+Houdt een momentopname bij van de pool (per plaats: afbeeldingen met mtime
+en grootte) en van beschrijvingen.json, en vergelijkt die elke ``interval``
+seconden opnieuw. Dat is gewoon pollen met ``os.scandir``: geen inotify,
+geen extra pakketten of diensten.
+
+Een reeks wijzigingen (een map vol foto's die binnenkomt, een bestand dat
+nog gekopieerd wordt) wordt samengevoegd: pas als er ``debounce`` seconden
+niets meer veranderd is, worden alleen de pagina's van de geraakte plaatsen
+opnieuw gebouwd. De galerij wordt alleen bijgewerkt als van een plaats de
+eerste afbeelding of de beschrijving veranderde, of als er een plaats
+bijkwam of verdween.
+"""
+import os
+import threading
+import time
+from typing import Callable, Dict, NamedTuple, Optional, Set, Tuple
+
+from site_build import (GALLERY_NAME, POOL_DIRNAME, Place, SiteModel, build_site, gallery_description,
+                        load_descriptions, place_description, walk_images)
+from timing import timed
+
+
+class PlaceSnapshot(NamedTuple):
+    path: str
+    # (pad relatief aan de plaatsmap, mtime_ns, grootte), gesorteerd op pad
+    files: Tuple[Tuple[str, int, int], ...]
+
+    def first_image(self) -> Optional[str]:
+        return Place(os.path.basename(self.path), self.path, tuple(rel for rel, _, _ in self.files)).first_image()
+
+    def signature(self, rel: Optional[str]) -> Optional[Tuple[str, int, int]]:
+        return next((f for f in self.files if f[0] == rel), None)
+
+
+def take_snapshot(pool_dir: str) -> Dict[str, PlaceSnapshot]:
+    snapshot: Dict[str, PlaceSnapshot] = {}
+    try:
+        tops = list(os.scandir(pool_dir))
+    except OSError:
+        return snapshot
+    for top in tops:
+        if not top.is_dir() or top.name.startswith('.'):
+            continue
+        files = []
+        for rel, entry in walk_images(top.path):
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            files.append((rel, st.st_mtime_ns, st.st_size))
+        snapshot[top.name] = PlaceSnapshot(top.path, tuple(sorted(files)))
+    return snapshot
+
+
+def _mtime(path: str) -> Optional[int]:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+class SiteWatcher:
+    """Momentopname van de pool plus de logica om alleen het nodige opnieuw te bouwen."""
+
+    def __init__(self, base_dir: str, pages: bool = True, gallery: bool = True, with_gallery: bool = True,
+                 with_thumbs: bool = True, gallery_output: str = GALLERY_NAME, workers: Optional[int] = None):
+        self.base_dir = base_dir
+        self.pool_dir = os.path.join(base_dir, POOL_DIRNAME)
+        self.desc_path = os.path.join(base_dir, 'beschrijvingen.json')
+        self.pages = pages
+        self.gallery = gallery
+        self.with_gallery = with_gallery
+        self.with_thumbs = with_thumbs
+        self.gallery_output = gallery_output
+        self.workers = workers
+        self.snapshot = take_snapshot(self.pool_dir)
+        self.desc_mtime = _mtime(self.desc_path)
+        self.descs = load_descriptions(base_dir)
+        # Wat er sinds de laatste build veranderd is
+        self.pending: Set[str] = set()
+        self.desc_changed = False
+        self._built = self.snapshot
+
+    def model(self) -> SiteModel:
+        places = tuple(Place(name, snap.path, tuple(rel for rel, _, _ in snap.files))
+                       for name, snap in sorted(self.snapshot.items()))
+        return SiteModel(self.base_dir, self.pool_dir, places, self.descs)
+
+    def poll(self) -> bool:
+        """Neem een nieuwe momentopname; True als er sinds de vorige iets veranderd is."""
+        current = take_snapshot(self.pool_dir)
+        changed = {name for name in self.snapshot.keys() | current.keys()
+                   if self.snapshot.get(name) != current.get(name)}
+        desc_mtime = _mtime(self.desc_path)
+        self.snapshot = current
+        self.pending |= changed
+        if desc_mtime != self.desc_mtime:
+            self.desc_mtime = desc_mtime
+            self.desc_changed = True
+            return True
+        return bool(changed)
+
+    def _card_key(self, snapshot: Dict[str, PlaceSnapshot], descs: dict, name: str):
+        snap = snapshot.get(name)
+        if snap is None:
+            return None
+        first = snap.first_image()
+        return snap.signature(first), gallery_description(descs, name)
+
+    @timed('watch_rebuild')
+    def rebuild(self) -> list:
+        """Bouw de geraakte pagina's en zo nodig de galerij; geeft (plaats of galerij, reden) terug."""
+        old_descs, old_snapshot = self.descs, self._built
+        pages = set(self.pending)
+        cards = set(self.pending)
+        if self.desc_changed:
+            self.descs = load_descriptions(self.base_dir)
+            for name in self.snapshot:
+                if place_description(old_descs, name) != place_description(self.descs, name):
+                    pages.add(name)
+                cards.add(name)
+        self.pending = set()
+        self.desc_changed = False
+        self._built = self.snapshot
+
+        model = self.model()
+        done = []
+        if self.pages and pages:
+            report = build_site(model, pages=True, gallery=False, with_gallery=self.with_gallery,
+                                workers=self.workers, only=pages)
+            done.extend(report.stale)
+        if self.gallery and any(self._card_key(old_snapshot, old_descs, name) != self._card_key(self.snapshot, self.descs, name)
+                                for name in cards):
+            report = build_site(model, pages=False, gallery=True, with_thumbs=self.with_thumbs,
+                                gallery_output=self.gallery_output)
+            done.extend(report.stale)
+        return done
+
+    def run(self, interval: float = 1.0, debounce: float = 2.0, log: Callable[[str], None] = print,
+            stop: Optional[threading.Event] = None) -> None:
+        """Poll tot ``stop`` gezet wordt (of Ctrl+C) en bouw na ``debounce`` seconden rust."""
+        stop = stop or threading.Event()
+        last_change = None
+        while not stop.wait(interval):
+            if self.poll():
+                last_change = time.monotonic()
+                continue
+            if last_change is None or time.monotonic() - last_change < debounce:
+                continue
+            last_change = None
+            stamp = time.strftime('%H:%M:%S')
+            done = self.rebuild()
+            for name, reason in done:
+                log(f"[{stamp}] {name}: bijgewerkt ({reason})")
+            if not done:
+                log(f"[{stamp}] Wijziging gezien, niets opnieuw te schrijven.")
@@ -0,0 +1,92 @@
+/*
+ * Kleine confetti-functie voor de bingokaart, zonder externe CDN.
+ * Ondersteunt de opties die bingo.py gebruikt, met dezelfde namen en
+ * standaardwaarden als canvas-confetti: particleCount, angle, spread,
+ * startVelocity, decay, gravity, ticks, origin {x, y} en colors.
+ */
+(function () {
+    var DEFAULTS = {
+        particleCount: 50, angle: 90, spread: 45, startVelocity: 45,
+        decay: 0.9, gravity: 1, ticks: 200, origin: { x: 0.5, y: 0.5 },
+        colors: ['#26ccff', '#a25afd', '#ff5e7e', '#88ff5a', '#fcff42', '#ffa62d', '#ff36ff']
+    };
+    var canvas = null, ctx = null, particles = [], running = false;
+
+    function setup() {
+        if (canvas) return;
+        canvas = document.createElement('canvas');
+        canvas.style.cssText = 'position:fixed;top:0;left:0;width:100%;height:100%;pointer-events:none;z-index:1000';
+        document.body.appendChild(canvas);
+        ctx = canvas.getContext('2d');
+        resize();
+        window.addEventListener('resize', resize);
+    }
+
+    function resize() {
+        var ratio = window.devicePixelRatio || 1;
+        canvas.width = window.innerWidth * ratio;
+        canvas.height = window.innerHeight * ratio;
+        ctx.setTransform(ratio, 0, 0, ratio, 0, 0);
+    }
+
+    function opt(options, name) {
+        return options[name] !== undefined ? options[name] : DEFAULTS[name];
+    }
+
+    function frame() {
+        var w = window.innerWidth, h = window.innerHeight;
+        ctx.clearRect(0, 0, w, h);
+        particles = particles.filter(function (p) { return p.tick < p.ticks; });
+        particles.forEach(function (p) {
+            p.x += Math.cos(p.angle) * p.velocity;
+            p.y += Math.sin(p.angle) * p.velocity + p.gravity * 3;
+            p.velocity *= p.decay;
+            p.wobble += 0.1;
+            p.tilt += 0.1;
+            p.tick += 1;
+            var size = 8 * p.scalar, wx = Math.cos(p.wobble) * size, ty = Math.sin(p.tilt) * size * 0.6;
+            ctx.globalAlpha = 1 - p.tick / p.ticks;
+            ctx.fillStyle = p.color;
+            ctx.beginPath();
+            ctx.moveTo(p.x, p.y);
+            ctx.lineTo(p.x + wx, p.y + ty);
+            ctx.lineTo(p.x + wx + size * 0.6, p.y + ty + size * 0.6);
+            ctx.lineTo(p.x + size * 0.6, p.y + size * 0.6);
+            ctx.closePath();
+            ctx.fill();
+        });
+        ctx.globalAlpha = 1;
+        if (particles.length) {
+            requestAnimationFrame(frame);
+        } else {
+            running = false;
+            ctx.clearRect(0, 0, w, h);
+        }
+    }
+
+    window.confetti = function (options) {
+        options = options || {};
+        setup();
+        var origin = options.origin || {};
+        var x = (origin.x !== undefined ? origin.x : DEFAULTS.origin.x) * window.innerWidth;
+        var y = (origin.y !== undefined ? origin.y : DEFAULTS.origin.y) * window.innerHeight;
+        var colors = opt(options, 'colors'), angle = opt(options, 'angle') * Math.PI / 180;
+        var spread = opt(options, 'spread') * Math.PI / 180, startVelocity = opt(options, 'startVelocity');
+        for (var i = 0; i < opt(options, 'particleCount'); i++) {
+            particles.push({
+                x: x, y: y,
+                angle: -angle + (Math.random() - 0.5) * spread,
+                velocity: startVelocity * 0.5 + Math.random() * startVelocity,
+                decay: opt(options, 'decay'), gravity: opt(options, 'gravity'),
+                ticks: opt(options, 'ticks'), tick: 0,
+                wobble: Math.random() * 10, tilt: Math.random() * Math.PI,
+                scalar: 0.8 + Math.random() * 0.4,
+                color: colors[i % colors.length]
+            });
+        }
+        if (!running) {
+            running = true;
+            requestAnimationFrame(frame);
+        }
+    };
+})();
@@ -0,0 +1,255 @@
+"""Verhaal.html mooier maken: opmaak, figuren met onderschrift en lichte afbeeldingen.
+
+Het verhaal gaat in stukken door een ``html.parser``-lezer die alles
+ongewijzigd doorgeeft, behalve een ``<a href>`` met alleen een ``<img>``
+erin: dat wordt een figuur met onderschrift. Staat de foto in de pool (zie
+``story_import.PathIndex``), dan wijst de figuur naar verkleinde varianten
+(``STORY_WIDTHS``, WebP en JPEG, zie derivatives.py) met ``srcset``,
+breedte en hoogte, ``loading="lazy"`` en ``decoding="async"``; de link blijft
+naar het origineel wijzen. Van de pagina wordt alleen de inhoud van
+``<body>`` gebruikt (zonder body: alles).
+
+De varianten worden pas na het lezen gemaakt, elke foto één keer en in
+threads. Zonder bundel verwijzen de paden naar de varianten in de map van
+de app (de pagina hoort naast ``pool/``); met ``bundle=True`` naar ``img/`` in
+een zip met de pagina en elke variant één keer (``write_bundle``).
+"""
+import html
+import html.parser
+import io
+import os
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, NamedTuple, Optional, Union
+from urllib.parse import quote
+
+from derivatives import DerivativeStore, ResponsiveSet
+from story_import import PathIndex, decode_chunks
+
+# Een figuur is maximaal 720 css-px breed; 1440 voor schermen met 2x pixeldichtheid
+STORY_WIDTHS = (720, 1440)
+FIGURE_SIZES = "(max-width: 752px) calc(100vw - 32px), 720px"
+BUNDLE_HTML_NAME = 'verhaal_mooi.html'
+BUNDLE_IMG_DIR = 'img'
+
+PRETTY_HEAD = """
+<!DOCTYPE html>
+<html lang=\"nl\">
+<head>
+  <meta charset=\"utf-8\">
+  <meta name=\"viewport\" content=\"width=device-width, initial-scale=1\">
+  <title>Verhaal</title>
+  <style>
+    :root { --bg:#fafafa; --fg:#1a1a1a; --muted:#666; --accent:#1e88e5; --card-bg:#fff; --card-border:#eee; --maxw:820px; }
+    html,body{margin:0;padding:0;background:var(--bg);color:var(--fg);font-family:-apple-system,BlinkMacSystemFont,"Segoe UI",Roboto,"Helvetica Neue",Arial,system-ui,sans-serif;line-height:1.6;-webkit-font-smoothing:antialiased;-moz-osx-font-smoothing:grayscale}
+    .container{max-width:var(--maxw);margin:0 auto;padding:24px 16px 64px}
+    header{margin:0 0 24px;padding:24px 0 8px;border-bottom:1px solid var(--card-border)}
+    header h1{margin:0 0 6px;font-size:28px;font-weight:700;letter-spacing:-.02em}
+    header p{margin:0;color:var(--muted);font-size:14px}
+    main p{margin:16px 0;font-size:17px}
+    .figure{margin:20px 0;display:flex;flex-direction:column;align-items:center}
+    .figure a{display:inline-block;text-decoration:none;outline:none;border-radius:12px;background:var(--card-bg);border:1px solid var(--card-border);box-shadow:0 4px 16px rgba(0,0,0,.06);overflow:hidden;transition:transform .1s ease,box-shadow .2s ease}
+    .figure a:hover{transform:translateY(-1px);box-shadow:0 8px 24px rgba(0,0,0,.08)}
+    .figure picture{display:block}
+    .figure img{display:block;height:auto;width:min(100%,720px);max-width:100%}
+    .caption{margin-top:8px;color:var(--muted);font-size:13px;text-align:center}
+    a.inline{color:var(--accent);text-decoration:none;border-bottom:1px dashed rgba(30,136,229,.4)}
+    a.inline:hover{border-bottom-color:var(--accent)}
+    @media print{ :root{--bg:#fff} .figure a{box-shadow:none!important} }
+  </style>
+</head>
+<body>
+  <div class=\"container\">
+    <header>
+      <h1>Verhaal</h1>
+      <p>Tekst en afbeeldingen in volgorde — klik op een afbeelding om de gekoppelde href te volgen.</p>
+    </header>
+    <main>
+"""
+
+PRETTY_TAIL = """
+    </main>
+  </div>
+</body>
+</html>
+"""
+
+
+class _Figure(NamedTuple):
+    href: str
+    src: str
+    alt: str
+
+
+class _StoryRewriter(html.parser.HTMLParser):
+    """Geeft de HTML door en vervangt ``<a href><img></a>`` door een ``_Figure``."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self.parts: List[Union[str, _Figure]] = []
+        self._in_body = False
+        self._body_done = False
+        # Open <a href>: (href, ruwe tekst tot nu toe, attributen van de <img> of None)
+        self._anchor = None
+
+    def _emit(self, part) -> None:
+        if not self._body_done:
+            self.parts.append(part)
+
+    def _flush(self) -> None:
+        if self._anchor is not None:
+            self._emit(''.join(self._anchor[1]))
+            self._anchor = None
+
+    def handle_starttag(self, tag, attrs):
+        raw = self.get_starttag_text()
+        if tag == 'body' and not self._in_body:
+            # Alleen de inhoud van <body>; wat ervoor kwam vervalt
+            self._anchor = None
+            self.parts = []
+            self._in_body = True
+            return
+        attrs = dict(attrs)
+        if tag == 'a' and attrs.get('href'):
+            self._flush()
+            self._anchor = (attrs['href'], [raw], None)
+            return
+        if tag == 'img' and self._anchor is not None and self._anchor[2] is None and attrs.get('src'):
+            href, raws, _ = self._anchor
+            raws.append(raw)
+            self._anchor = (href, raws, attrs)
+            return
+        self._flush()
+        self._emit(raw)
+
+    handle_startendtag = handle_starttag
+
+    def handle_endtag(self, tag):
+        if tag == 'a' and self._anchor is not None and self._anchor[2] is not None:
+            href, _, img = self._anchor
+            self._anchor = None
+            self._emit(_Figure(href, img['src'], img.get('alt') or ''))
+            return
+        self._flush()
+        if tag == 'body' and self._in_body:
+            self._body_done = True
+            return
+        self._emit(f'</{tag}>')
+
+    def handle_data(self, data):
+        if self._anchor is not None and not data.strip():
+            self._anchor[1].append(data)
+            return
+        self._flush()
+        self._emit(data)
+
+    def handle_entityref(self, name):
+        self.handle_data(f'&{name};')
+
+    def handle_charref(self, name):
+        self.handle_data(f'&#{name};')
+
+    def handle_comment(self, data):
+        self._flush()
+        self._emit(f'<!--{data}-->')
+
+    def handle_decl(self, decl):
+        self._flush()
+        self._emit(f'<!{decl}>')
+
+    def handle_pi(self, data):
+        self._flush()
+        self._emit(f'<?{data}>')
+
+    def unknown_decl(self, data):
+        self._flush()
+        self._emit(f'<![{data}]>')
+
+    def close(self):
+        super().close()
+        self._flush()
+
+
+def figure_html(fig: _Figure, image: Optional[ResponsiveSet], href: Optional[str] = None) -> str:
+    """Figuur met onderschrift; met ``image`` (paden al relatief aan de pagina) via ``<picture>``."""
+    alt = html.escape(fig.alt or fig.src)
+    caption = html.escape(fig.alt or fig.href)
+    link = html.escape(href or fig.href)
+    if image is None:
+        img = f'<img src="{html.escape(fig.src)}" alt="{alt}" loading="lazy" decoding="async">'
+    else:
+        sources = "".join(f'<source type="image/{fmt}" srcset="{image.srcset(fmt)}" sizes="{FIGURE_SIZES}">'
+                          for fmt in ('webp',) if image.srcset(fmt))
+        img = (f'<picture>{sources}<img src="{image.fallback().path}" srcset="{image.srcset("jpeg")}" '
+               f'sizes="{FIGURE_SIZES}" width="{image.width}" height="{image.height}" '
+               f'loading="lazy" decoding="async" alt="{alt}"></picture>')
+    return f'<div class="figure"><a href="{link}">{img}</a><div class="caption">{caption}</div></div>'
+
+
+class BeautifiedStory(NamedTuple):
+    html: str
+    figures: int
+    # Figuren met verkleinde varianten
+    optimized: int
+    # Alleen met ``bundle``: naam in de zip -> bestand op schijf
+    files: Dict[str, str]
+
+
+def beautify_story(chunks: Iterable[Union[bytes, str]], index: PathIndex, base_dir: str, store: DerivativeStore,
+                   bundle: bool = False, workers: Optional[int] = None) -> BeautifiedStory:
+    """Lees het verhaal één keer, maak de varianten en geef de opgemaakte pagina terug."""
+    parser = _StoryRewriter()
+    for text in decode_chunks(chunks):
+        parser.feed(text)
+    parser.close()
+    figures = [part for part in parser.parts if isinstance(part, _Figure)]
+
+    sources: Dict[_Figure, Optional[str]] = {}
+    for fig in figures:
+        rel = index.resolve(fig.src) or index.resolve(fig.href)
+        sources[fig] = os.path.join(base_dir, rel) if rel else None
+
+    def render(path: str) -> Optional[ResponsiveSet]:
+        try:
+            return store.get_responsive(path, STORY_WIDTHS)
+        except Exception:
+            return None
+    unique = sorted({path for path in sources.values() if path})
+    with ThreadPoolExecutor(max_workers=workers or min(8, os.cpu_count() or 1)) as pool:
+        rendered = dict(zip(unique, pool.map(render, unique)))
+
+    files: Dict[str, str] = {}
+
+    def local(path: str) -> str:
+        if bundle:
+            name = f"{BUNDLE_IMG_DIR}/{os.path.basename(path)}"
+            files[name] = path
+            return name
+        return quote(os.path.relpath(path, base_dir).replace(os.sep, '/'))
+
+    out: List[str] = []
+    optimized = 0
+    for part in parser.parts:
+        if not isinstance(part, _Figure):
+            out.append(part)
+            continue
+        image = rendered.get(sources[part]) if sources[part] else None
+        href = None
+        if image is not None:
+            optimized += 1
+            image = image._replace(renditions=tuple(r._replace(path=local(r.path)) for r in image.renditions))
+            if bundle:
+                # Het origineel zit niet in de bundel; de grootste JPEG wel
+                href = [r.path for r in image.renditions if r.fmt == 'jpeg'][-1]
+        out.append(figure_html(part, image, href))
+    return BeautifiedStory(PRETTY_HEAD + ''.join(out) + PRETTY_TAIL, len(figures), optimized, files)
+
+
+def write_bundle(story: BeautifiedStory, html_name: str = BUNDLE_HTML_NAME) -> bytes:
+    """Zip met de pagina en elke variant één keer; afbeeldingen zijn al gecomprimeerd en gaan er los in."""
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w') as zf:
+        zf.writestr(html_name, story.html.encode('utf-8'), compress_type=zipfile.ZIP_DEFLATED)
+        for name, path in sorted(story.files.items()):
+            zf.write(path, name, compress_type=zipfile.ZIP_STORED)
+    return buf.getvalue()
@@ -0,0 +1,172 @@
+"""Verhaal importeren: de volgorde van foto's uit verhaal.html.
+
+Het verhaal is een HTML-pagina met ``<a href=...>`` naar de echte fotopaden.
+De links worden in volgorde gelezen; alle foto's uit dezelfde plaatsmap
+(``pool/<plaats>``) vormen samen één stap van het spel.
+
+Het bestand wordt in stukken door een ``html.parser``-lezer gehaald, zodat
+ook exports van meerdere MB niet eerst als één string in het geheugen
+hoeven. Links worden via een ``PathIndex`` aan foto's gekoppeld: naast het
+exacte pad ook ``./pool/...``, URL-gecodeerde namen, absolute paden,
+``file://``-URL's en backslashes, en als laatste een unieke bestandsnaam.
+"""
+import codecs
+import html.parser
+import os
+import posixpath
+import re
+from collections import OrderedDict
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Mapping, NamedTuple, Optional, Tuple, Union
+from urllib.parse import unquote, urlsplit
+
+CHUNK_SIZE = 1 << 16
+# Windows-schijfletter, ook als 'file:///C:/...'
+_DRIVE_RE = re.compile(r'^/?[A-Za-z]:/')
+# Achterstuk dat bij meer dan één foto hoort
+_AMBIGUOUS = ''
+
+
+class _LinkParser(html.parser.HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.hrefs: List[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'a':
+            for name, value in attrs:
+                if name == 'href' and value:
+                    self.hrefs.append(value)
+                    break
+
+    handle_startendtag = handle_starttag
+
+
+def iter_chunks(f: BinaryIO, size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    return iter(lambda: f.read(size), b'')
+
+
+def decode_chunks(chunks: Iterable[Union[bytes, str]]) -> Iterator[str]:
+    """Stukken als tekst; bytes als UTF-8, ook als een teken over twee stukken valt."""
+    decoder = codecs.getincrementaldecoder('utf-8-sig')(errors='ignore')
+    for chunk in chunks:
+        yield decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+    yield decoder.decode(b'', final=True)
+
+
+def read_hrefs(chunks: Iterable[Union[bytes, str]]) -> List[str]:
+    """Alle ``<a href>`` in volgorde van voorkomen, uit een reeks stukken (bytes als UTF-8)."""
+    parser = _LinkParser()
+    for text in decode_chunks(chunks):
+        parser.feed(text)
+    parser.close()
+    return parser.hrefs
+
+
+def extract_hrefs(html_text: str) -> List[str]:
+    """Href's uit ``<a ... href="...">``, in volgorde van voorkomen."""
+    return read_hrefs([html_text])
+
+
+def normalize_href(href: str) -> Optional[str]:
+    """Href als pad met '/' zonder '.', '..', query of fragment; None voor links naar buiten."""
+    href = href.strip().replace('\\', '/')
+    drive = _DRIVE_RE.match(href)
+    if drive:
+        href = href[drive.end() - 1:]
+    split = urlsplit(href)
+    # Links naar een website of e-mailadres zijn nooit een foto uit de pool
+    if split.scheme not in ('', 'file') or (split.netloc and split.scheme != 'file'):
+        return None
+    path = unquote(split.path)
+    drive = _DRIVE_RE.match(path)
+    if drive:
+        path = path[drive.end() - 1:]
+    parts = [p for p in posixpath.normpath(path).split('/') if p not in ('', '.', '..')]
+    return '/'.join(parts) or None
+
+
+class PathIndex:
+    """Zoekt bij een href de foto uit de pool (paden relatief aan de fotomap).
+
+    Eerst het genormaliseerde pad exact, daarna het langste achterstuk van
+    het pad dat bij precies één foto hoort (hoofdletterongevoelig); zo vindt
+    ``C:/Users/x/bingo/pool/a/b.jpg`` nog ``pool/a/b.jpg``, en ``b.jpg`` alleen
+    als er maar één ``b.jpg`` is.
+    """
+
+    def __init__(self, rel_paths: Iterable[str]):
+        self.exact: Dict[str, str] = {}
+        self.suffixes: Dict[str, str] = {}
+        for rel in rel_paths:
+            key = rel.replace(os.sep, '/')
+            self.exact[key] = rel
+            parts = key.casefold().split('/')
+            for i in range(len(parts)):
+                suffix = '/'.join(parts[i:])
+                self.suffixes[suffix] = rel if self.suffixes.get(suffix, rel) == rel else _AMBIGUOUS
+
+    def resolve(self, href: str) -> Optional[str]:
+        key = normalize_href(href)
+        if key is None:
+            return None
+        if key in self.exact:
+            return self.exact[key]
+        parts = key.casefold().split('/')
+        for i in range(len(parts)):
+            hit = self.suffixes.get('/'.join(parts[i:]))
+            if hit is not None:
+                return hit or None
+        return None
+
+
+class StoryImport(NamedTuple):
+    links: int
+    # Foto's uit de pool in verhaalvolgorde
+    sequence: List[str]
+    # (staplabel, foto's) zoals ``group_steps`` ze geeft
+    steps: List[Tuple[str, List[str]]]
+    # Links zonder foto in de pool
+    invalid: List[str]
+    # (href, foto) voor links die pas na normaliseren een foto vonden
+    normalized: List[Tuple[str, str]]
+
+
+def compile_story(chunks: Iterable[Union[bytes, str]], index: PathIndex,
+                  canonical: Optional[Mapping[str, str]] = None) -> StoryImport:
+    """Lees het verhaal en zet het om naar stappen; de app bewaart het resultaat per bestandshash."""
+    hrefs = read_hrefs(chunks)
+    sequence: List[str] = []
+    invalid: List[str] = []
+    normalized: List[Tuple[str, str]] = []
+    resolved: Dict[str, Optional[str]] = {}
+    for href in hrefs:
+        if href not in resolved:
+            resolved[href] = index.resolve(href)
+        rel = resolved[href]
+        if rel is None:
+            invalid.append(href)
+            continue
+        sequence.append(rel)
+        if rel != href:
+            normalized.append((href, rel))
+    return StoryImport(len(hrefs), sequence, group_steps(sequence, canonical), invalid, normalized)
+
+
+def group_steps(sequence: Iterable[str], canonical: Optional[Mapping[str, str]] = None) -> List[Tuple[str, List[str]]]:
+    """Groepeer paden per submap van 'pool' (1 stap = alle foto's in die submap).
+
+    We nemen de eerste mapcomponent als staplabel, bijvoorbeeld
+    'pool/Apeldoorn/...' => staplabel = 'pool/Apeldoorn'. Paden buiten 'pool'
+    krijgen hun eigen map (of zichzelf) als staplabel. Met ``canonical``
+    (zie photo_hashes.py) komt in de stap de vertegenwoordiger van een
+    dubbele foto te staan; het staplabel blijft de map van het origineel.
+    """
+    folder_map: "OrderedDict[str, List[str]]" = OrderedDict()
+    for h in sequence:
+        parts = h.split(os.sep)
+        if len(parts) >= 2 and parts[0] == 'pool':
+            step_label = os.path.join(parts[0], parts[1])
+        else:
+            step_label = os.path.dirname(h) or h
+        folder_map.setdefault(step_label, []).append(canonical.get(h, h) if canonical else h)
+    return list(folder_map.items())
@@ -0,0 +1,50 @@
+"""Thumbnails van site_build: foto's met dezelfde naam maar een andere extensie.
+
+    python -m unittest test_site_build
+"""
+import os
+import re
+import shutil
+import tempfile
+import unittest
+
+from PIL import Image
+
+from site_build import THUMB_BOXES, THUMB_DIRNAME, build_site, place_thumbs, scan_site
+
+
+class SameStemThumbsTest(unittest.TestCase):
+    def setUp(self):
+        self.base = tempfile.mkdtemp(prefix='bingo-test-')
+        self.place = os.path.join(self.base, 'pool', 'plaats')
+        os.makedirs(self.place)
+        Image.new('RGB', (1600, 1200), (255, 0, 0)).save(os.path.join(self.place, 'x.jpg'))
+        Image.new('RGB', (1600, 1200), (0, 0, 255)).save(os.path.join(self.place, 'x.png'))
+
+    def tearDown(self):
+        shutil.rmtree(self.base, ignore_errors=True)
+
+    def test_each_source_has_its_own_thumbnails(self):
+        thumbs, missing = place_thumbs(self.place, ['x.jpg', 'x.png'])
+        self.assertEqual(missing, 2 * len(THUMB_BOXES))
+        self.assertFalse(set(thumbs['x.jpg'].srcs) & set(thumbs['x.png'].srcs))
+        for rel, colour in (('x.jpg', (255, 0, 0)), ('x.png', (0, 0, 255))):
+            for src in thumbs[rel].srcs:
+                self.assertTrue(src.startswith(THUMB_DIRNAME + '/'))
+                with Image.open(os.path.join(self.place, src)) as im:
+                    pixel = im.convert('RGB').getpixel((im.width // 2, im.height // 2))
+                self.assertTrue(all(abs(a - b) < 16 for a, b in zip(pixel, colour)), (src, pixel))
+
+    def test_page_links_each_tile_to_its_own_thumbnail(self):
+        build_site(scan_site(self.base, workers=1), gallery=False, workers=1)
+        with open(os.path.join(self.place, 'index.html'), encoding='utf-8') as f:
+            page = f.read()
+        srcsets = re.findall(r'srcset="([^"]+)"', page)
+        self.assertEqual(len(srcsets), 2)
+        self.assertNotEqual(srcsets[0], srcsets[1])
+        report = build_site(scan_site(self.base, workers=1), gallery=False, check=True, workers=1)
+        self.assertEqual(report.stale, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
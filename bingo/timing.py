@@ -0,0 +1,212 @@
+"""Lichte tijdmetingen (spans) rond de drukke stukken van de app en de generators.
+
+Aan met de omgevingsvariabele ``BINGO_TIMING=1``. Staat hij uit, dan geeft
+``span`` steeds hetzelfde lege object terug en laat ``timed`` de functie
+ongemoeid: er wordt dan niets gemeten of bewaard.
+
+    with span('discovery'):
+        ...
+    s = span('card_html').start()
+    try:
+        ...
+    finally:
+        s.stop()
+
+Metingen komen in een ``Recorder``. In de app heeft elke sessie een eigen
+recorder (zie ``set_resolver``); daarbuiten is er één per proces. Een
+recorder exporteert naar JSON (``to_json``) of naar het Chrome
+trace-event-formaat (``to_chrome_trace``, te openen in chrome://tracing of
+Perfetto). De generatorscripts schrijven bij afsluiten naar
+``BINGO_TIMING_FILE`` als die gezet is: Chrome-formaat als de naam op
+``.trace.json`` eindigt, anders gewone JSON.
+"""
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+ENABLED = os.environ.get('BINGO_TIMING', '').lower() not in ('', '0', 'false', 'no')
+MAX_SPANS = 5000
+
+
+class SpanRecord(NamedTuple):
+    name: str
+    # Microseconden sinds het begin van de recorder
+    start_us: float
+    dur_us: float
+    tid: int
+    depth: int
+    args: dict
+
+
+class Recorder:
+    """Thread-safe ringbuffer met afgeronde spans (de oudste vallen eruit na ``max_spans``)."""
+
+    def __init__(self, max_spans: int = MAX_SPANS):
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter_ns()
+        self._depth = threading.local()
+        self.spans: "deque[SpanRecord]" = deque(maxlen=max_spans)
+
+    def _enter(self) -> int:
+        depth = getattr(self._depth, 'value', 0)
+        self._depth.value = depth + 1
+        return depth
+
+    def _exit(self, name: str, start_ns: int, end_ns: int, depth: int, args: dict) -> None:
+        self._depth.value = depth
+        record = SpanRecord(name, (start_ns - self._origin) / 1000, (end_ns - start_ns) / 1000,
+                            threading.get_ident(), depth, args)
+        with self._lock:
+            self.spans.append(record)
+
+    def records(self) -> List[SpanRecord]:
+        with self._lock:
+            return list(self.spans)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.spans.clear()
+
+    def summary(self) -> List[dict]:
+        """Per naam: aantal, totaal, gemiddelde en maximum in milliseconden; traagste totaal eerst."""
+        totals: Dict[str, List[float]] = {}
+        for r in self.records():
+            totals.setdefault(r.name, []).append(r.dur_us)
+        rows = [{
+            'span': name,
+            'aantal': len(durs),
+            'totaal_ms': round(sum(durs) / 1000, 2),
+            'gemiddeld_ms': round(sum(durs) / len(durs) / 1000, 2),
+            'max_ms': round(max(durs) / 1000, 2),
+        } for name, durs in totals.items()]
+        return sorted(rows, key=lambda row: -row['totaal_ms'])
+
+    def to_json(self) -> str:
+        return json.dumps({
+            'pid': os.getpid(),
+            'spans': [r._asdict() for r in self.records()],
+            'summary': self.summary(),
+        }, ensure_ascii=False, indent=2, default=str)
+
+    def to_chrome_trace(self) -> str:
+        pid = os.getpid()
+        events = [{
+            'name': r.name, 'cat': 'bingo', 'ph': 'X', 'ts': r.start_us, 'dur': r.dur_us,
+            'pid': pid, 'tid': r.tid, 'args': r.args,
+        } for r in self.records()]
+        return json.dumps({'traceEvents': events, 'displayTimeUnit': 'ms'}, ensure_ascii=False, default=str)
+
+    def write(self, path: str) -> None:
+        text = self.to_chrome_trace() if path.endswith('.trace.json') else self.to_json()
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+
+_process_recorder = Recorder()
+_resolver: Optional[Callable[[], Optional[Recorder]]] = None
+
+
+def set_resolver(resolver: Optional[Callable[[], Optional[Recorder]]]) -> None:
+    """Laat ``resolver()`` de recorder van de huidige context kiezen (bijv. die van de Streamlit-sessie)."""
+    global _resolver
+    _resolver = resolver
+
+
+def current_recorder() -> Recorder:
+    if _resolver is not None:
+        try:
+            recorder = _resolver()
+        except Exception:
+            recorder = None
+        if recorder is not None:
+            return recorder
+    return _process_recorder
+
+
+class Span:
+    __slots__ = ('name', 'args', '_recorder', '_start', '_depth')
+
+    def __init__(self, name: str, args: dict):
+        self.name = name
+        self.args = args
+        self._recorder = None
+        self._start = 0
+        self._depth = 0
+
+    def start(self) -> "Span":
+        self._recorder = current_recorder()
+        self._depth = self._recorder._enter()
+        self._start = time.perf_counter_ns()
+        return self
+
+    def stop(self) -> None:
+        if self._recorder is not None:
+            self._recorder._exit(self.name, self._start, time.perf_counter_ns(), self._depth, self.args)
+            self._recorder = None
+
+    def __enter__(self) -> "Span":
+        return self.start()
+
+    def __exit__(self, *exc) -> bool:
+        self.stop()
+        return False
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def start(self) -> "_NoSpan":
+        return self
+
+    def stop(self) -> None:
+        pass
+
+    def __enter__(self) -> "_NoSpan":
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+def span(name: str, **args):
+    """Meet een stuk code; zonder ``BINGO_TIMING`` een leeg object zonder kosten."""
+    if not ENABLED:
+        return _NO_SPAN
+    return Span(name, args)
+
+
+def timed(name: Optional[str] = None):
+    """Decorator: meet elke aanroep als span (standaard met de functienaam)."""
+    def decorate(fn):
+        if not ENABLED:
+            return fn
+        label = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*a, **kw):
+            with Span(label, {}):
+                return fn(*a, **kw)
+        return wrapper
+    return decorate
+
+
+def report_at_exit() -> None:
+    """Voor scripts: druk een samenvatting af op stderr en schrijf ``BINGO_TIMING_FILE`` als die gezet is."""
+    if not ENABLED:
+        return
+    recorder = _process_recorder
+    for row in recorder.summary():
+        print(f"[timing] {row['span']:<28} {row['aantal']:>5}x  {row['totaal_ms']:>10.1f} ms "
+              f"(max {row['max_ms']:.1f} ms)", file=sys.stderr)
+    path = os.environ.get('BINGO_TIMING_FILE')
+    if path:
+        recorder.write(path)
+        print(f"[timing] Geschreven naar {path}", file=sys.stderr)